@@ -0,0 +1,36 @@
+"""Add election_snapshots for completed elections
+
+Revision ID: 0a8d5c3e7b42
+Revises: f27c4d8e9a13
+Create Date: 2026-10-16 21:12:40.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a8d5c3e7b42'
+down_revision: Union[str, None] = 'f27c4d8e9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Snapshots are computed by the application (EndElectionHandler). Elections completed before
+    # this revision are served live until PUT /elections/{id}/end/ is called for them again.
+    op.create_table(
+        'election_snapshots',
+        sa.Column('election_id', sa.Integer(), sa.ForeignKey('elections.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('sections', sa.JSON(), nullable=False),
+        sa.Column('etags', sa.JSON(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('election_snapshots')
@@ -0,0 +1,86 @@
+"""Add election_tallies and backfill from elections.candidates/votes
+
+Revision ID: 3c7d1e5a9f20
+Revises: 9b2f0eb61d74
+Create Date: 2026-10-16 09:12:31.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7d1e5a9f20'
+down_revision: Union[str, None] = '9b2f0eb61d74'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('election_tallies',
+    sa.Column('election_id', sa.Integer(), nullable=False),
+    sa.Column('candidate_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['election_id'], ['elections.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['candidate_id'], ['candidates.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('election_id', 'candidate_id')
+    )
+
+    # Backfill: every name in elections.candidates becomes (or reuses) a candidates row
+    # for that election, and its position in elections.votes becomes the tally.
+    connection = op.get_bind()
+    elections = connection.execute(
+        sa.text("SELECT id, candidates, votes FROM elections WHERE candidates IS NOT NULL AND candidates <> ''")
+    ).fetchall()
+    for election_id, candidates, votes in elections:
+        names = candidates.split(",")
+        counts = [int(vote) for vote in votes.split(",")] if votes else []
+        for position, name in enumerate(names):
+            candidate_id = connection.execute(
+                sa.text("SELECT min(id) FROM candidates WHERE election_id = :election_id AND name = :name"),
+                {"election_id": election_id, "name": name},
+            ).scalar()
+            if candidate_id is None:
+                candidate_id = connection.execute(
+                    sa.text("INSERT INTO candidates (name, election_id) VALUES (:name, :election_id) RETURNING id"),
+                    {"election_id": election_id, "name": name},
+                ).scalar()
+            connection.execute(
+                sa.text(
+                    "INSERT INTO election_tallies (election_id, candidate_id, count) "
+                    "VALUES (:election_id, :candidate_id, :count) "
+                    "ON CONFLICT (election_id, candidate_id) DO UPDATE SET count = election_tallies.count + EXCLUDED.count"
+                ),
+                {"election_id": election_id, "candidate_id": candidate_id, "count": counts[position] if position < len(counts) else 0},
+            )
+
+    op.drop_column('elections', 'votes')
+    op.drop_column('elections', 'candidates')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('elections', sa.Column('candidates', sa.VARCHAR(), autoincrement=False, nullable=True))
+    op.add_column('elections', sa.Column('votes', sa.VARCHAR(), autoincrement=False, nullable=True))
+
+    # Rebuild the comma-separated strings in ballot (candidate id) order
+    op.execute(
+        """
+        UPDATE elections SET
+            candidates = tallies.candidates,
+            votes = tallies.votes
+        FROM (
+            SELECT t.election_id,
+                   string_agg(c.name, ',' ORDER BY c.id) AS candidates,
+                   string_agg(t.count::text, ',' ORDER BY c.id) AS votes
+            FROM election_tallies t
+            JOIN candidates c ON c.id = t.candidate_id
+            GROUP BY t.election_id
+        ) AS tallies
+        WHERE elections.id = tallies.election_id
+        """
+    )
+    op.drop_table('election_tallies')
@@ -0,0 +1,75 @@
+"""Make candidate names unique within an election
+
+Revision ID: 5d2e8c4b7a19
+Revises: 0a8d5c3e7b42
+Create Date: 2026-10-17 09:14:27.603118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8c4b7a19'
+down_revision: Union[str, None] = '0a8d5c3e7b42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Fold every duplicate candidate into the oldest row with the same name, so its votes,
+    # tallies and rollups are counted once before the constraint goes on
+    op.execute(
+        """
+        CREATE TEMPORARY TABLE candidate_merges ON COMMIT DROP AS
+        SELECT id, keeper FROM (
+            SELECT id, min(id) OVER (PARTITION BY election_id, name) AS keeper FROM candidates
+        ) AS ranked
+        WHERE id <> keeper
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO election_tallies (election_id, candidate_id, shard, count)
+        SELECT t.election_id, m.keeper, t.shard, sum(t.count)
+        FROM election_tallies AS t JOIN candidate_merges AS m ON t.candidate_id = m.id
+        GROUP BY t.election_id, m.keeper, t.shard
+        ON CONFLICT (election_id, candidate_id, shard)
+        DO UPDATE SET count = election_tallies.count + EXCLUDED.count
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO vote_rollup_hourly (election_id, bucket, candidate_id, region, polling_station_id, count, first_vote_at, last_vote_at)
+        SELECT r.election_id, r.bucket, m.keeper, r.region, r.polling_station_id, sum(r.count), min(r.first_vote_at), max(r.last_vote_at)
+        FROM vote_rollup_hourly AS r JOIN candidate_merges AS m ON r.candidate_id = m.id
+        GROUP BY r.election_id, r.bucket, m.keeper, r.region, r.polling_station_id
+        ON CONFLICT (election_id, bucket, candidate_id, region, polling_station_id)
+        DO UPDATE SET count = vote_rollup_hourly.count + EXCLUDED.count,
+                      first_vote_at = least(vote_rollup_hourly.first_vote_at, EXCLUDED.first_vote_at),
+                      last_vote_at = greatest(vote_rollup_hourly.last_vote_at, EXCLUDED.last_vote_at)
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO vote_rollup_daily (election_id, bucket, candidate_id, region, polling_station_id, count)
+        SELECT r.election_id, r.bucket, m.keeper, r.region, r.polling_station_id, sum(r.count)
+        FROM vote_rollup_daily AS r JOIN candidate_merges AS m ON r.candidate_id = m.id
+        GROUP BY r.election_id, r.bucket, m.keeper, r.region, r.polling_station_id
+        ON CONFLICT (election_id, bucket, candidate_id, region, polling_station_id)
+        DO UPDATE SET count = vote_rollup_daily.count + EXCLUDED.count
+        """
+    )
+    op.execute("UPDATE votes SET candidate_id = m.keeper FROM candidate_merges AS m WHERE votes.candidate_id = m.id")
+    # The merged rows' tallies and rollups go with them (ON DELETE CASCADE)
+    op.execute("DELETE FROM candidates WHERE id IN (SELECT id FROM candidate_merges)")
+    op.create_unique_constraint('uq_candidates_election_name', 'candidates', ['election_id', 'name'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Merged duplicates are not restored
+    op.drop_constraint('uq_candidates_election_name', 'candidates', type_='unique')
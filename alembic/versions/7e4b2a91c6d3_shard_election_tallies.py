@@ -0,0 +1,55 @@
+"""Add shard to the election_tallies primary key
+
+Revision ID: 7e4b2a91c6d3
+Revises: 3c7d1e5a9f20
+Create Date: 2026-10-16 11:40:05.271964
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7e4b2a91c6d3'
+down_revision: Union[str, None] = '3c7d1e5a9f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing tallies become shard 0
+    op.add_column('election_tallies', sa.Column('shard', sa.Integer(), server_default='0', nullable=False))
+    op.drop_constraint('election_tallies_pkey', 'election_tallies', type_='primary')
+    op.create_primary_key('election_tallies_pkey', 'election_tallies', ['election_id', 'candidate_id', 'shard'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Fold every shard back into shard 0 before restoring the one-row-per-candidate key
+    op.execute(
+        """
+        UPDATE election_tallies AS t SET count = totals.count
+        FROM (
+            SELECT election_id, candidate_id, sum(count) AS count
+            FROM election_tallies
+            GROUP BY election_id, candidate_id
+        ) AS totals
+        WHERE t.election_id = totals.election_id AND t.candidate_id = totals.candidate_id AND t.shard = 0
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO election_tallies (election_id, candidate_id, shard, count)
+        SELECT election_id, candidate_id, 0, sum(count)
+        FROM election_tallies
+        GROUP BY election_id, candidate_id
+        HAVING bool_and(shard <> 0)
+        """
+    )
+    op.execute("DELETE FROM election_tallies WHERE shard <> 0")
+    op.drop_constraint('election_tallies_pkey', 'election_tallies', type_='primary')
+    op.drop_column('election_tallies', 'shard')
+    op.create_primary_key('election_tallies_pkey', 'election_tallies', ['election_id', 'candidate_id'])
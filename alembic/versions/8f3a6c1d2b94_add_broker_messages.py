@@ -0,0 +1,35 @@
+"""Add broker_messages for messages too large for NOTIFY
+
+Revision ID: 8f3a6c1d2b94
+Revises: 5d2e8c4b7a19
+Create Date: 2026-10-17 11:02:51.384210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f3a6c1d2b94'
+down_revision: Union[str, None] = '5d2e8c4b7a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Written and pruned by PostgresBroker; the NOTIFY payload carries the row id
+    op.create_table(
+        'broker_messages',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('channel', sa.String(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('broker_messages')
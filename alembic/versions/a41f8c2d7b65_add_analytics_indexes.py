@@ -0,0 +1,44 @@
+"""Add composite indexes for the analytics access paths
+
+Revision ID: a41f8c2d7b65
+Revises: 7e4b2a91c6d3
+Create Date: 2026-10-16 13:02:47.906114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f8c2d7b65'
+down_revision: Union[str, None] = '7e4b2a91c6d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_votes_election_candidate', 'votes', ['election_id', 'candidate_id']),
+    ('ix_votes_election_timestamp', 'votes', ['election_id', 'timestamp']),
+    ('ix_votes_election_region', 'votes', ['election_id', 'region']),
+    ('ix_observer_feedback_election_timestamp', 'observer_feedback', ['election_id', 'timestamp']),
+    ('ix_notifications_user_read_created', 'notifications', ['user_id', 'is_read', 'created_at']),
+    ('ix_subscription_events_user_type_created', 'subscription_events', ['user_id', 'alert_type', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CREATE INDEX CONCURRENTLY doesn't block writes but can't run inside a transaction.
+    # if_not_exists lets a rerun skip indexes that were already built; a build that failed
+    # part-way leaves an INVALID index behind that has to be dropped before rerunning.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,106 @@
+"""Partition votes by election_id
+
+Revision ID: c58e0d3f1a47
+Revises: a41f8c2d7b65
+Create Date: 2026-10-16 15:21:09.664530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e0d3f1a47'
+down_revision: Union[str, None] = 'a41f8c2d7b65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+VOTE_INDEXES = [
+    ('ix_votes_election_candidate', 'election_id, candidate_id'),
+    ('ix_votes_election_timestamp', 'election_id, timestamp'),
+    ('ix_votes_election_region', 'election_id, region'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rebuild votes as a LIST-partitioned table: one partition per existing election plus a
+    # default partition. Rows are copied over, ids keep coming from the same sequence.
+    # This holds an exclusive lock on votes for the duration of the copy.
+    op.execute("ALTER TABLE votes RENAME TO votes_unpartitioned")
+    op.execute("ALTER TABLE votes_unpartitioned RENAME CONSTRAINT votes_pkey TO votes_unpartitioned_pkey")
+    for name, _ in VOTE_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    op.execute(
+        """
+        CREATE TABLE votes (
+            id INTEGER NOT NULL DEFAULT nextval('votes_id_seq'),
+            voter_id INTEGER NOT NULL REFERENCES voters (id),
+            candidate_id INTEGER NOT NULL REFERENCES candidates (id),
+            election_id INTEGER NOT NULL REFERENCES elections (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            region VARCHAR,
+            polling_station_id INTEGER REFERENCES polling_stations (id),
+            PRIMARY KEY (id, election_id)
+        ) PARTITION BY LIST (election_id)
+        """
+    )
+    op.execute("ALTER SEQUENCE votes_id_seq OWNED BY votes.id")
+    op.execute("CREATE TABLE votes_default PARTITION OF votes DEFAULT")
+    op.execute(
+        """
+        DO $$
+        DECLARE election_id integer;
+        BEGIN
+            FOR election_id IN SELECT id FROM elections LOOP
+                EXECUTE format('CREATE TABLE votes_e%s PARTITION OF votes FOR VALUES IN (%s)', election_id, election_id);
+            END LOOP;
+        END $$
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO votes (id, voter_id, candidate_id, election_id, timestamp, region, polling_station_id)
+        SELECT id, voter_id, candidate_id, election_id, timestamp, region, polling_station_id
+        FROM votes_unpartitioned
+        """
+    )
+    op.execute("DROP TABLE votes_unpartitioned")
+    for name, columns in VOTE_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON votes ({columns})")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Detached (archived) partitions are not brought back
+    op.execute("ALTER TABLE votes RENAME TO votes_partitioned")
+    op.execute("ALTER TABLE votes_partitioned RENAME CONSTRAINT votes_pkey TO votes_partitioned_pkey")
+    for name, _ in VOTE_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+
+    op.execute(
+        """
+        CREATE TABLE votes (
+            id INTEGER NOT NULL DEFAULT nextval('votes_id_seq') PRIMARY KEY,
+            voter_id INTEGER NOT NULL REFERENCES voters (id),
+            candidate_id INTEGER NOT NULL REFERENCES candidates (id),
+            election_id INTEGER NOT NULL REFERENCES elections (id),
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            region VARCHAR,
+            polling_station_id INTEGER REFERENCES polling_stations (id)
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE votes_id_seq OWNED BY votes.id")
+    op.execute(
+        """
+        INSERT INTO votes (id, voter_id, candidate_id, election_id, timestamp, region, polling_station_id)
+        SELECT id, voter_id, candidate_id, election_id, timestamp, region, polling_station_id
+        FROM votes_partitioned
+        """
+    )
+    op.execute("DROP TABLE votes_partitioned")
+    for name, columns in VOTE_INDEXES:
+        op.execute(f"CREATE INDEX {name} ON votes ({columns})")
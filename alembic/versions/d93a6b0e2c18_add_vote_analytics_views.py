@@ -0,0 +1,60 @@
+"""Add materialized views for vote analytics
+
+Revision ID: d93a6b0e2c18
+Revises: c58e0d3f1a47
+Create Date: 2026-10-16 17:48:22.105376
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd93a6b0e2c18'
+down_revision: Union[str, None] = 'c58e0d3f1a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Each view needs a unique index on plain columns for REFRESH ... CONCURRENTLY
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_votes_by_candidate AS
+        SELECT election_id, candidate_id, count(*) AS vote_count
+        FROM votes
+        GROUP BY election_id, candidate_id
+        """
+    )
+    op.execute("CREATE UNIQUE INDEX ux_mv_votes_by_candidate ON mv_votes_by_candidate (election_id, candidate_id)")
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_votes_by_hour AS
+        SELECT election_id, date_trunc('hour', timestamp) AS hour, count(*) AS vote_count
+        FROM votes
+        GROUP BY election_id, date_trunc('hour', timestamp)
+        """
+    )
+    op.execute("CREATE UNIQUE INDEX ux_mv_votes_by_hour ON mv_votes_by_hour (election_id, hour)")
+
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_votes_by_region_candidate AS
+        SELECT election_id, region, candidate_id, count(*) AS vote_count
+        FROM votes
+        GROUP BY election_id, region, candidate_id
+        """
+    )
+    op.execute(
+        "CREATE UNIQUE INDEX ux_mv_votes_by_region_candidate ON mv_votes_by_region_candidate (election_id, region, candidate_id)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_votes_by_region_candidate")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_votes_by_hour")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_votes_by_candidate")
@@ -0,0 +1,77 @@
+"""Add hourly and daily vote rollup tables
+
+Revision ID: e6f19a3b5d07
+Revises: d93a6b0e2c18
+Create Date: 2026-10-16 19:12:40.583217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f19a3b5d07'
+down_revision: Union[str, None] = 'd93a6b0e2c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def rollup_columns():
+    return [
+        sa.Column('election_id', sa.Integer(), sa.ForeignKey('elections.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('bucket', sa.DateTime(), primary_key=True),
+        sa.Column('candidate_id', sa.Integer(), sa.ForeignKey('candidates.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('region', sa.String(), primary_key=True, server_default=''),
+        sa.Column('polling_station_id', sa.Integer(), primary_key=True, server_default='0'),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+    ]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'vote_rollup_hourly',
+        *rollup_columns(),
+        sa.Column('first_vote_at', sa.DateTime(), nullable=False),
+        sa.Column('last_vote_at', sa.DateTime(), nullable=False),
+    )
+    op.create_table('vote_rollup_daily', *rollup_columns())
+
+    # Backfill from the votes cast so far
+    op.execute(
+        """
+        INSERT INTO vote_rollup_hourly (election_id, bucket, candidate_id, region, polling_station_id, count, first_vote_at, last_vote_at)
+        SELECT election_id, date_trunc('hour', timestamp), candidate_id, coalesce(region, ''), coalesce(polling_station_id, 0),
+               count(*), min(timestamp), max(timestamp)
+        FROM votes
+        GROUP BY election_id, date_trunc('hour', timestamp), candidate_id, coalesce(region, ''), coalesce(polling_station_id, 0)
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO vote_rollup_daily (election_id, bucket, candidate_id, region, polling_station_id, count)
+        SELECT election_id, date_trunc('day', bucket), candidate_id, region, polling_station_id, sum(count)
+        FROM vote_rollup_hourly
+        GROUP BY election_id, date_trunc('day', bucket), candidate_id, region, polling_station_id
+        """
+    )
+
+    # The rollups replace the hourly materialized view
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_votes_by_hour")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        """
+        CREATE MATERIALIZED VIEW mv_votes_by_hour AS
+        SELECT election_id, date_trunc('hour', timestamp) AS hour, count(*) AS vote_count
+        FROM votes
+        GROUP BY election_id, date_trunc('hour', timestamp)
+        """
+    )
+    op.execute("CREATE UNIQUE INDEX ux_mv_votes_by_hour ON mv_votes_by_hour (election_id, hour)")
+    op.drop_table('vote_rollup_daily')
+    op.drop_table('vote_rollup_hourly')
@@ -0,0 +1,32 @@
+"""Store sentiment score and category with observer feedback
+
+Revision ID: f27c4d8e9a13
+Revises: e6f19a3b5d07
+Create Date: 2026-10-16 20:03:51.274906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f27c4d8e9a13'
+down_revision: Union[str, None] = 'e6f19a3b5d07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing rows are scored by POST /observer_feedback/sentiment_analysis/backfill
+    # (TextBlob runs in the application, not in SQL)
+    op.add_column('observer_feedback', sa.Column('sentiment_score', sa.Float(), nullable=True))
+    op.add_column('observer_feedback', sa.Column('sentiment_category', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('observer_feedback', 'sentiment_category')
+    op.drop_column('observer_feedback', 'sentiment_score')
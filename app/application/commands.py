@@ -1,5 +1,6 @@
+from datetime import datetime
 from pydantic import BaseModel, EmailStr
-from typing import List, Optional
+from typing import Any, ClassVar, List, Optional
 
 class RegisterVoterCommand(BaseModel):
     voter_id: int
@@ -13,10 +14,20 @@ class CastVoteCommand(BaseModel):
     election_id: int
     candidate: str
 
+    def invalidates(self):
+        return ["elections:all", f"election:{self.election_id}:*"]
+
+    def changes_elections(self):
+        return [self.election_id]
+
 
 class CreateElectionCommand(BaseModel):
     name: str
     candidates: List[str]
+    changes_reference_data: ClassVar[bool] = True
+
+    def invalidates(self):
+        return ["elections:all"]
 
 class CheckVoterExistsQuery:
     def __init__(self, voter_id: int):
@@ -24,6 +35,22 @@ class CheckVoterExistsQuery:
 
 class EndElectionCommand(BaseModel):
     election_id: int
+    changes_reference_data: ClassVar[bool] = True
+
+    def invalidates(self):
+        return ["elections:all", f"election:{self.election_id}:*"]
+
+    def changes_elections(self):
+        return [self.election_id]
+
+class ArchiveElectionVotesCommand(BaseModel):
+    election_id: int
+
+    def invalidates(self):
+        return [f"election:{self.election_id}:*"]
+
+    def changes_elections(self):
+        return [self.election_id]
 
 class UserSignUp(BaseModel):
     name: str
@@ -48,15 +75,18 @@ class CreatePollingStationCommand(BaseModel):
     location: str
     election_id: int
     capacity: int
+    changes_reference_data: ClassVar[bool] = True
 
 class UpdatePollingStationCommand(BaseModel):
     station_id: int
     name: str = None
     location: str = None
     capacity: int = None
+    changes_reference_data: ClassVar[bool] = True
 
 class DeletePollingStationCommand(BaseModel):
     station_id: int
+    changes_reference_data: ClassVar[bool] = True
 
 class CreateAuditLogCommand(BaseModel):
     election_id: int
@@ -84,36 +114,116 @@ class CreateCandidateCommand(BaseModel):
     party: Optional[str] = None
     bio: Optional[str] = None
     election_id: int
+    changes_reference_data: ClassVar[bool] = True
+
+    def invalidates(self):
+        return ["elections:all", f"election:{self.election_id}:*"]
+
+    def changes_elections(self):
+        return [self.election_id]
 
 class UpdateCandidateCommand(BaseModel):
     candidate_id: int
     name: Optional[str] = None
     party: Optional[str] = None
     bio: Optional[str] = None
+    changes_reference_data: ClassVar[bool] = True
+
+    def invalidates(self):
+        # The election isn't part of the command
+        return ["elections:all", "election:*"]
+
+    def changes_elections(self):
+        return None
 
 class DeleteCandidateCommand(BaseModel):
     candidate_id: int
+    changes_reference_data: ClassVar[bool] = True
+
+    def invalidates(self):
+        return ["elections:all", "election:*"]
+
+    def changes_elections(self):
+        return None
 
 class CastVoteCommandv2(BaseModel):
     voter_id: int
     candidate_id: int
     election_id: int
 
+    def invalidates(self):
+        return ["elections:all", f"election:{self.election_id}:*"]
+
+    def changes_elections(self):
+        return [self.election_id]
+
+class BulkVoteRow(BaseModel):
+    voter_id: int
+    candidate_id: int
+    election_id: int
+    region: Optional[str] = None
+    polling_station_id: Optional[int] = None
+    timestamp: Optional[datetime] = None  # When the vote was cast offline; defaults to now
+
+class BulkCastVotesCommand(BaseModel):
+    # Raw rows, validated one by one by the handler so a bad row doesn't reject the batch
+    rows: List[Any]
+    # Number reported for each row, e.g. its NDJSON line (blank lines included); defaults to the row's index
+    row_numbers: Optional[List[int]] = None
+
+    def invalidates(self):
+        # A batch can span any number of elections
+        return ["elections:all", "election:*"]
+
+    def changes_elections(self):
+        election_ids = set()
+        for row in self.rows:
+            if not isinstance(row, dict):
+                continue
+            try:
+                election_ids.add(int(row.get("election_id")))
+            except (TypeError, ValueError):
+                continue
+        return election_ids
+
 class SubmitFeedbackCommand(BaseModel):
     observer_id: int
     election_id: int
     description: str
     severity: str  # "LOW", "MEDIUM", "HIGH"
 
+    def invalidates(self):
+        return [f"election:{self.election_id}:summary"]
+
+    def changes_elections(self):
+        return [self.election_id]
+
+class BackfillFeedbackSentimentCommand(BaseModel):
+    # Scores feedback written before sentiment was stored with it
+    batch_size: int = 500
+
+    def invalidates(self):
+        return ["election:*"]
+
+    def changes_elections(self):
+        return None
+
 class CreateAlertCommand(BaseModel):
     election_id: int
     alert_type: str
     message: str
 
+    def changes_elections(self):
+        return [self.election_id]
+
 class UpdateAlertCommand(BaseModel):
     alert_id: int
     status: str   # e.g., "acknowledged", "resolved"
 
+    def changes_elections(self):
+        # Only the alert id is known here
+        return None
+
 class MarkNotificationReadCommand(BaseModel):
     notification_id: int
 
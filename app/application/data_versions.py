@@ -0,0 +1,98 @@
+import logging
+import threading
+
+from app.config import DATA_VERSION_BACKEND, DATA_VERSION_REDIS_URL, ELECTION_CHANGES_COALESCE_SECONDS
+from app.infrastructure.broker import broker
+from app.infrastructure.version_store import build_version_store
+
+logger = logging.getLogger(__name__)
+
+ALL_ELECTIONS = "all"
+
+# Broker channel announcing changed elections to every worker
+ELECTION_CHANGES_CHANNEL = "election_changes"
+
+
+class ElectionVersions:
+    """
+    A version per election that goes up whenever a command changes its votes, feedback or
+    alerts. Polled endpoints turn it into a weak ETag, so an unchanged election is answered
+    with 304 without running a query.
+
+    A command lists the elections it changes in `changes_elections()`; returning None means
+    it may have changed any of them, which bumps a version shared by all elections.
+
+    Bumps are also announced on the broker's "election_changes" channel, so real-time streams
+    in other workers refresh even when versions are kept per process. The command has committed
+    by the time it bumps; its elections are queued and announced from a timer thread, together
+    with every other election changed within coalesce_seconds, so a burst of votes costs one
+    broker message (and, with the postgres broker, one connection) instead of one per vote.
+
+    Commands that change reference data are announced the same way, flagged with
+    "reference_data", so every worker's ReferenceCatalog reloads right away.
+    """
+    def __init__(self, store, broker=broker, coalesce_seconds: float = ELECTION_CHANGES_COALESCE_SECONDS):
+        self.store = store
+        self.broker = broker
+        self.coalesce_seconds = coalesce_seconds
+        self._pending = set()  # Election ids changed since the last announcement
+        self._pending_all = False  # Whether a command may have changed any election
+        self._pending_reference_data = False  # Whether a command changed reference data
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def current(self, election_id: int) -> str:
+        return f"{self.store.get(ALL_ELECTIONS)}.{self.store.get(str(election_id))}"
+
+    def etag(self, election_id: int) -> str:
+        return f'W/"{self.current(election_id)}"'
+
+    def bump(self, election_ids=None, announce: bool = True):
+        if election_ids is None:
+            self.store.bump(ALL_ELECTIONS)
+        else:
+            election_ids = set(election_ids)
+            for election_id in election_ids:
+                self.store.bump(str(election_id))
+        if announce:
+            self._queue(election_ids)
+
+    def announce_reference_data(self):
+        """Announces, with the next batch of elections, that elections, candidates or polling stations changed."""
+        self._queue(set(), reference_data=True)
+
+    def _queue(self, election_ids, reference_data: bool = False):
+        with self._lock:
+            if election_ids is None:
+                self._pending_all = True
+            else:
+                self._pending.update(election_ids)
+            self._pending_reference_data = self._pending_reference_data or reference_data
+            if self._timer is None:
+                self._timer = threading.Timer(self.coalesce_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Announces the elections changed since the last announcement."""
+        with self._lock:
+            election_ids = None if self._pending_all else sorted(self._pending)
+            reference_data = self._pending_reference_data
+            self._pending, self._pending_all, self._pending_reference_data, self._timer = set(), False, False, None
+        if election_ids == [] and not reference_data:
+            return
+        message = {"election_ids": election_ids}
+        if reference_data:
+            message["reference_data"] = True
+        try:
+            self.broker.publish(ELECTION_CHANGES_CHANNEL, message)
+        except Exception as e:
+            logger.warning("Could not publish election changes: %s", e)
+
+    def bump_for(self, command, announce: bool = True):
+        if hasattr(command, "changes_elections"):
+            self.bump(command.changes_elections(), announce)
+        if announce and getattr(command, "changes_reference_data", False):
+            self.announce_reference_data()
+
+election_versions = ElectionVersions(build_version_store(DATA_VERSION_BACKEND, DATA_VERSION_REDIS_URL))
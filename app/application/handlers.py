@@ -1,39 +1,56 @@
+from collections import Counter
 import csv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import io
 import math
 import traceback
 
 from fastapi import HTTPException
 from fastapi.responses import StreamingResponse
-import numpy as np
-import pandas as pd
-from app.application.queries import AnomalyDetectionQuery, CandidateSupportQuery, CorrelationAnalyticsQuery, DashboardAnalyticsQuery, ElectionSummaryQuery, ElectionTurnoutQuery, EnhancedNeuralNetworkPredictiveAnalyticsQuery, EnhancedPredictiveSubscriptionAnalyticsQuery, ExportElectionResultsQuery, GeolocationAnalyticsQuery, GeolocationTrendsQuery, GetAlertsQuery, GetAlertsWSQuery, GetAllElectionsQuery, GetAuditLogsQuery, GetCandidateByIdQuery, GetCandidateVoteDistributionQuery, GetCandidatesQuery, GetDetailedHistoricalComparisonsQuery, GetDetailedHistoricalComparisonsWithExternalQuery, GetElectionDetailsQuery, GetElectionResultsQuery, GetElectionSummaryQuery, GetFeedbackByElectionQuery, GetFeedbackBySeverityQuery, GetFeedbackCategoryAnalyticsQuery, GetFeedbackExportQuery, GetHistoricalTurnoutTrendsQuery, GetIntegrityScoreQuery, GetNotificationsQuery, GetNotificationsSummaryQuery, GetObserverByIdQuery, GetObserverTrustScoresQuery, GetObserversQuery, GetPollingStationQuery, GetPollingStationsByElectionQuery, GetSeasonalTurnoutPredictionQuery, GetSentimentAnalysisQuery, GetSentimentTrendQuery, GetSeverityDistributionQuery, GetSubscriptionAnalyticsQuery, GetSubscriptionsQuery, GetTimeBasedVotingPatternsQuery, GetTimePatternsQuery, GetTopObserversQuery, GetTurnoutConfidenceQuery, GetTurnoutPredictionQuery, GetUserByEmailQuery, GetUserByIdQuery, GetUserProfileQuery, GetVotesByElectionQuery, GetVotesByVoterQuery, GetVotingPageDataQuery, HasVotedQuery, HistoricalPollingStationTrendsQuery, InactiveVotersQuery, ListAdminsQuery, ListUsersQuery, ParticipationByRoleQuery, PollingStationAnalyticsQuery, PredictiveSubscriptionAnalyticsQuery, PredictiveVoterTurnoutQuery, RealTimeElectionSummaryQuery, ResultsBreakdownQuery, SegmentSubscriptionAnalyticsQuery, SubscriptionConversionMetricsQuery, TimeSeriesSubscriptionAnalyticsQuery, TopCandidateQuery, UserStatisticsQuery, UsersByRoleQuery, VoterDetailsQuery, VotingStatusQuery
+from pydantic import ValidationError
+from app.application.queries import AnomalyDetectionQuery, CandidateSupportQuery, CorrelationAnalyticsQuery, DashboardAnalyticsQuery, ElectionSummaryQuery, ElectionTurnoutQuery, EnhancedNeuralNetworkPredictiveAnalyticsQuery, EnhancedPredictiveSubscriptionAnalyticsQuery, ExportElectionResultsQuery, GeolocationAnalyticsQuery, GeolocationTrendsQuery, GetAlertsQuery, GetAlertsWSQuery, GetAllElectionsQuery, GetAuditLogsQuery, GetCandidateByIdQuery, GetCandidateVoteDistributionQuery, GetCandidatesQuery, GetDetailedHistoricalComparisonsQuery, GetDetailedHistoricalComparisonsWithExternalQuery, GetElectionDetailsQuery, GetElectionResultsQuery, GetElectionSnapshotQuery, GetElectionSummaryQuery, GetFeedbackByElectionQuery, GetFeedbackBySeverityQuery, GetFeedbackCategoryAnalyticsQuery, GetFeedbackExportQuery, GetHistoricalTurnoutTrendsQuery, GetIntegrityScoreQuery, GetNotificationsQuery, GetNotificationsSummaryQuery, GetObserverByIdQuery, GetObserverTrustScoresQuery, GetObserversQuery, GetPollingStationQuery, GetPollingStationsByElectionQuery, GetSeasonalTurnoutPredictionQuery, GetSentimentAnalysisQuery, GetSentimentTrendQuery, GetSeverityDistributionQuery, GetSubscriptionAnalyticsQuery, GetSubscriptionsQuery, GetTimeBasedVotingPatternsQuery, GetTimePatternsQuery, GetTopObserversQuery, GetTurnoutConfidenceQuery, GetTurnoutPredictionQuery, GetUserByEmailQuery, GetUserByIdQuery, GetUserProfileQuery, GetVotesByElectionQuery, GetVotesByVoterQuery, GetVotingPageDataQuery, HasVotedQuery, HistoricalPollingStationTrendsQuery, InactiveVotersQuery, ListAdminsQuery, ListUsersQuery, ParticipationByRoleQuery, PollingStationAnalyticsQuery, PredictiveSubscriptionAnalyticsQuery, PredictiveVoterTurnoutQuery, RealTimeElectionSummaryQuery, ResultsBreakdownQuery, SegmentSubscriptionAnalyticsQuery, SubscriptionConversionMetricsQuery, TimeSeriesSubscriptionAnalyticsQuery, TopCandidateQuery, UserStatisticsQuery, UsersByRoleQuery, VoterDetailsQuery, VotingStatusQuery
 from app.application.query_bus import query_bus
-from app.application.commands import BulkUpdateSubscriptionsCommand, CastVoteCommand, CastVoteCommandv2, CheckVoterExistsQuery, CreateAlertCommand, CreateAuditLogCommand, CreateCandidateCommand, CreateElectionCommand, CreateObserverCommand, CreatePollingStationCommand, DeleteCandidateCommand, DeleteObserverCommand, DeletePollingStationCommand, EditUserCommand, EndElectionCommand, LoginUserCommand, MarkAllNotificationsReadCommand, MarkNotificationReadCommand, RegisterVoterCommand, SubmitFeedbackCommand, UpdateAlertCommand, UpdateCandidateCommand, UpdateObserverCommand, UpdatePollingStationCommand, UpdateSubscriptionCommand, UpdateUserRoleCommand, UserSignUp
-from app.config import ACCESS_TOKEN_EXPIRE_MINUTES
+from app.application.query_cache import query_cache
+from app.application.data_versions import election_versions
+from app.application.commands import ArchiveElectionVotesCommand, BackfillFeedbackSentimentCommand, BulkCastVotesCommand, BulkUpdateSubscriptionsCommand, BulkVoteRow, CastVoteCommand, CastVoteCommandv2, CheckVoterExistsQuery, CreateAlertCommand, CreateAuditLogCommand, CreateCandidateCommand, CreateElectionCommand, CreateObserverCommand, CreatePollingStationCommand, DeleteCandidateCommand, DeleteObserverCommand, DeletePollingStationCommand, EditUserCommand, EndElectionCommand, LoginUserCommand, MarkAllNotificationsReadCommand, MarkNotificationReadCommand, RegisterVoterCommand, SubmitFeedbackCommand, UpdateAlertCommand, UpdateCandidateCommand, UpdateObserverCommand, UpdatePollingStationCommand, UpdateSubscriptionCommand, UpdateUserRoleCommand, UserSignUp
+from app.config import ACCESS_TOKEN_EXPIRE_MINUTES, BULK_VOTE_CHUNK_SIZE, BULK_VOTE_MAX_ROWS, FORECAST_WARM_START_DAYS, FORECAST_WARM_START_EPOCHS
 from app.infrastructure.alert_repo import AlertRepository
+from app.infrastructure.analytics_views import analytics_refresher
 from app.infrastructure.audit_log_repo import AuditLogRepository
 from app.infrastructure.candidate_repo import CandidateRepository
 from app.infrastructure.election_repo import ElectionRepository
-from app.infrastructure.models import Election, User, VoterUploadQuery
-from app.infrastructure.database import SessionLocal
+from app.infrastructure.model_registry import forecast_models, series_fingerprint
+from app.infrastructure.models import Candidate, Election, User, VoterUploadQuery
+from app.infrastructure.database import AsyncSessionLocal, SessionLocal
 from app.infrastructure.models import Voter
 from app.infrastructure.notification_repo import NotificationRepository
 from app.infrastructure.observer_feedback_repo import ObserverFeedbackRepository
 from app.infrastructure.observer_repo import ObserverRepository
 from app.infrastructure.polling_station_repo import PollingStationRepository
+from app.infrastructure.reference_catalog import reference_catalog
+from app.infrastructure.rollup_repo import RollupRepository, as_stored_timestamp
+from app.infrastructure.snapshot_repo import SnapshotRepository, snapshot_body
 from app.infrastructure.subscription_event_repo import SubscriptionEventRepository
 from app.infrastructure.subscription_repo import SubscriptionRepository
+from app.infrastructure.tally_repo import TallyRepository
+from app.infrastructure.token_cache import token_cache
 from app.infrastructure.user_repo import UserRepository
+from app.infrastructure.vote_partition_repo import VotePartitionRepository
 from app.infrastructure.vote_repo import VoteRepository
 from app.infrastructure.voter_repo import VoterRepository
+from app.infrastructure.replica_routing import mark_write, primary_only
 from app.security import create_access_token
 from app.utils.password_utils import hash_password, verify_password
 from datetime import timedelta
-from keras.models import Sequential
-from keras.layers import LSTM, Dense, Dropout
-from keras.optimizers import Adam
+from starlette.concurrency import run_in_threadpool
+from app.utils.lazy_imports import lazy_import
+
+# Imported on first use (see app/utils/lazy_imports.py)
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+keras_models = lazy_import("keras.models")
+keras_layers = lazy_import("keras.layers")
+keras_optimizers = lazy_import("keras.optimizers")
 
 class CheckVoterExistsHandler:
     def handle(self, query: CheckVoterExistsQuery):
@@ -50,63 +67,91 @@ class CheckVoterExistsHandler:
 class GetAllElectionsHandler:
     def handle(self, query: GetAllElectionsQuery):
         with SessionLocal() as db:
-            repo = ElectionRepository(db)
-            elections = repo.get_all_elections()
+            return self.execute(db, query)
 
-            if not elections:  # No elections in the database
-                return []  # Return an empty list instead of None
+    async def handle_async(self, query: GetAllElectionsQuery):
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(self.execute, query)
 
-            return [
-                {
-                    "election_id": election.id,
-                    "name": election.name,
-                    "candidates": election.candidates.split(","),
-                    "votes": list(map(int, election.votes.split(","))),
-                    "status": election.status
-                }
-                for election in elections
-            ]
+    def execute(self, db, query: GetAllElectionsQuery):
+        elections = reference_catalog.elections(db)
+
+        if not elections:  # No elections in the database
+            return []  # Return an empty list instead of None
+
+        # One query for the tallies of every election
+        tallies = TallyRepository(db).get_results_for_elections([election.id for election in elections])
+
+        return [
+            {
+                "election_id": election.id,
+                "name": election.name,
+                "candidates": [candidate for candidate, _ in tallies[election.id]],
+                "votes": [votes for _, votes in tallies[election.id]],
+                "status": election.status
+            }
+            for election in elections
+        ]
 
 
 
 class GetElectionDetailsHandler:
     def handle(self, query: GetElectionDetailsQuery):
         with SessionLocal() as db:
-            repo = ElectionRepository(db)
-            election = repo.get_election_by_id(query.election_id)
+            return self.execute(db, query)
 
-            if not election:
-                raise ValueError("Election not found")
+    async def handle_async(self, query: GetElectionDetailsQuery):
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(self.execute, query)
 
-            return {
-                "election_id": election.id,
-                "name": election.name,
-                "candidates": election.candidates.split(","),
-                "votes": list(map(int, election.votes.split(",")))
-            }
+    def execute(self, db, query: GetElectionDetailsQuery):
+        election = reference_catalog.election(query.election_id, db)
+
+        if not election:
+            raise ValueError("Election not found")
+
+        tallies = TallyRepository(db).get_results(election.id)
+        return {
+            "election_id": election.id,
+            "name": election.name,
+            "candidates": [candidate for candidate, _ in tallies],
+            "votes": [votes for _, votes in tallies]
+        }
 
 class CreateElectionHandler:
     def handle(self, command: CreateElectionCommand):
+        if len(set(command.candidates)) != len(command.candidates):
+            raise ValueError("Candidate names must be unique within an election")
+
         with SessionLocal() as db:
             repo = ElectionRepository(db)
+            partitions = VotePartitionRepository(db)
 
             # Create the election object
-            new_election = Election(
-                name=command.name,
-                candidates=",".join(command.candidates),
-                votes=",".join(["0"] * len(command.candidates))  # Initialize all votes to 0
-            )
+            new_election = Election(name=command.name)
+            if partitions.is_partitioned():
+                # Give the election its own votes partition so its analytics only scan its own rows.
+                # It is created before the election exists, so no vote can reach the default partition first.
+                new_election.id = partitions.reserve_election_id()
+                partitions.ensure_partition(new_election.id)
 
             # Save the election using the repository
             created_election = repo.create_election(new_election)
             print(f"Created election with ID: {created_election.id}")
+
+            # One candidate row per ballot entry, each starting with a zero tally
+            candidates = [Candidate(name=name, election_id=created_election.id) for name in command.candidates]
+            db.add_all(candidates)
+            db.flush()
+            TallyRepository(db).create_tallies(created_election.id, [candidate.id for candidate in candidates])
+            db.commit()
             
             # Return the object as a dictionary
             created_election_dict = {
                 "election_id": created_election.id,
                 "name": created_election.name,
-                "candidates": created_election.candidates.split(","),
-                "votes": list(map(int, created_election.votes.split(",")))
+                "candidates": list(command.candidates),
+                "votes": [0] * len(command.candidates)
             }
             print(f"Election created: {created_election_dict}")
             return created_election_dict
@@ -139,95 +184,150 @@ class RegisterVoterHandler:
 class GetElectionResultsHandler:
     def handle(self, query: GetElectionResultsQuery):
         with SessionLocal() as db:
-            repo = ElectionRepository(db)
-            election = repo.get_election_by_id(query.election_id)
+            return self.execute(db, query)
 
-            if not election:
-                raise ValueError("Election not found")
+    async def handle_async(self, query: GetElectionResultsQuery):
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(self.execute, query)
 
-            # Process results
-            results = {
-                candidate: int(vote)
-                for candidate, vote in zip(election.candidates.split(","), election.votes.split(","))
-            }
+    def execute(self, db, query: GetElectionResultsQuery):
+        election = reference_catalog.election(query.election_id, db)
+
+        if not election:
+            raise ValueError("Election not found")
 
-            return results
+        # Process results
+        results = {
+            candidate: votes
+            for candidate, votes in TallyRepository(db).get_results(election.id)
+        }
+
+        return results
         
 class GetVotingPageDataHandler:
     def handle(self, query: GetVotingPageDataQuery):
         with SessionLocal() as db:
-            voter_repo = VoterRepository(db)
-            election_repo = ElectionRepository(db)
+            return self.execute(db, query)
 
-            # Fetch voters (joining User and Voter tables)
-            voters = voter_repo.get_all_voters()  # Returns a list of (User, Voter) tuples
-            elections = election_repo.get_all_elections()
+    async def handle_async(self, query: GetVotingPageDataQuery):
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(self.execute, query)
 
-            # Convert election objects to dictionaries
-            election_data = [
-                {
-                    "election_id": election.id,
-                    "name": election.name,
-                    "candidates": election.candidates.split(",")  # Ensure candidates are in a list
-                }
-                for election in elections
-            ]
+    def execute(self, db, query: GetVotingPageDataQuery):
+        voter_repo = VoterRepository(db)
 
-            # Convert voter tuples to dictionaries
-            voter_data = [
-                {
-                    "voter_id": user.id,
-                    "name": user.name,
-                    "has_voted": voter.has_voted
-                }
-                for user, voter in voters if not voter.has_voted  # Only include unvoted voters
-            ]
+        # Fetch voters (joining User and Voter tables)
+        voters = voter_repo.get_all_voters()  # Returns a list of (User, Voter) tuples
+
+        # The ballot needs names only, which the reference catalog already holds
+        election_data = [
+            {
+                "election_id": election.id,
+                "name": election.name,
+                "candidates": [candidate.name for candidate in reference_catalog.candidates(election.id, db)]
+            }
+            for election in reference_catalog.elections(db)
+        ]
+
+        # Convert voter tuples to dictionaries
+        voter_data = [
+            {
+                "voter_id": user.id,
+                "name": user.name,
+                "has_voted": voter.has_voted
+            }
+            for user, voter in voters if not voter.has_voted  # Only include unvoted voters
+        ]
 
-            return {"voters": voter_data, "elections": election_data}
+        return {"voters": voter_data, "elections": election_data}
 
 
 class CastVoteHandler:
     def handle(self, command: CastVoteCommand):
         with SessionLocal() as db:
-            voter_repo = VoterRepository(db)
-            election_repo = ElectionRepository(db)
+            return self.execute(db, command)
 
-            # Fetch the voter
-            voter = voter_repo.get_voter_by_id(command.voter_id)
-            if not voter:
-                raise ValueError("Voter not found")
-            if voter.has_voted:
-                raise ValueError("Voter has already voted")
+    async def handle_async(self, command: CastVoteCommand):
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(self.execute, command)
 
-            # Fetch the election dynamically using election_id
-            election = election_repo.get_election_by_id(command.election_id)
-            if not election:
-                raise ValueError("Election not found")
+    def execute(self, db, command: CastVoteCommand):
+        voter_repo = VoterRepository(db)
 
-            # Cast the vote
-            election.increment_vote(command.candidate)
-            voter.has_voted = True
-            db.commit()
+        # Fetch the voter
+        voter = voter_repo.get_voter_by_id(command.voter_id)
+        if not voter:
+            raise ValueError("Voter not found")
+        if voter.has_voted:
+            raise ValueError("Voter has already voted")
 
-            return {
-                "candidate": command.candidate,
-                "election_name": election.name,
-            }
+        # The election and the candidate's id come from the in-memory reference catalog
+        election = reference_catalog.election(command.election_id, db)
+        if not election:
+            raise ValueError("Election not found")
+
+        candidate_id = reference_catalog.candidate_id(election.id, command.candidate, db)
+        if candidate_id is None:
+            raise ValueError("Candidate not found")
+
+        # Record the vote like POST /votes does, so the vote analytics (and the snapshot taken
+        # when the election ends) count it too; the tally is bumped in the same transaction
+        voter.has_voted = True
+        VoteRepository(db).cast_vote(voter.id, candidate_id, election.id)
+        analytics_refresher.record_votes()
+
+        return {
+            "candidate": command.candidate,
+            "election_name": election.name,
+        }
 
 class EndElectionHandler:
     def handle(self, command: EndElectionCommand):
         with SessionLocal() as db:
             repo = ElectionRepository(db)
-            election = repo.get_election_by_id(command.election_id)
+            election = repo.get_election_by_id(command.election_id, for_update=True)
 
             if not election:
                 raise ValueError("Election not found")
 
             election.status = "completed"
+            # Results and analytics can't change any more; compute them once, in the same transaction
+            SnapshotRepository(db).save_snapshot(election.id)
             db.commit()
 
             return {"message": f"Election {command.election_id} has been ended successfully."}
 
+class GetElectionSnapshotHandler:
+    def handle(self, query: GetElectionSnapshotQuery):
+        with SessionLocal() as db:
+            snapshot = SnapshotRepository(db).get_section(query.election_id, query.section)
+        if snapshot is None:
+            return None
+        # The serialized body is what gets cached and served, so it's built once
+        etag, data = snapshot
+        return etag, snapshot_body(data)
+
+class ArchiveElectionVotesHandler:
+    def handle(self, command: ArchiveElectionVotesCommand):
+        with SessionLocal() as db:
+            repo = ElectionRepository(db)
+            election = repo.get_election_by_id(command.election_id)
+
+            if not election:
+                raise ValueError("Election not found")
+            if election.status != "completed":
+                raise ValueError("Only completed elections can be archived")
+
+            # Nothing to write here; end the read transaction so the detach doesn't wait on it
+            db.rollback()
+            # The partition becomes a standalone table; the tallies keep serving the results
+            table = VotePartitionRepository(db).detach_partition(command.election_id)
+
+            return {
+                "message": f"Votes of election {command.election_id} have been archived.",
+                "table": table
+            }
+
 class RegisterUserHandler:
     def handle(self, command: UserSignUp):
         with SessionLocal() as db:
@@ -287,8 +387,11 @@ class EditUserHandler:
             if not existing_user:
                 raise HTTPException(status_code=404, detail="User not found")
             # Update the user
+            # Tokens issued for the old email must reload the user
+            old_email = existing_user.email
             try:
                 updated_user = user_repository.update_user(user_id, update_data.model_dump())
+                token_cache.invalidate_user(user_id=user_id, email=old_email)
                 return updated_user
             except ValueError as e:
                 raise HTTPException(status_code=400, detail=str(e))
@@ -309,23 +412,24 @@ class ListUsersHandler:
     def handle(self, query: ListUsersQuery):
         with SessionLocal() as db:  # Initialize database session inside handler
             user_repository = UserRepository(db)
-        # Call the repository method
-        users = user_repository.get_users(query.page, query.page_size)
-        return users
+            # Call the repository method
+            users = user_repository.get_users(query.page, query.page_size)
+            return users
     
 class UpdateUserRoleHandler:
     def handle(self, command: UpdateUserRoleCommand):
         with SessionLocal() as db:
             user_repository = UserRepository(db)
         
-        # Retrieve the user
-        user = user_repository.get_user_by_id(command.user_id)
-        if not user:
-            raise ValueError(f"User with ID {command.user_id} not found.")
+            # Retrieve the user
+            user = user_repository.get_user_by_id(command.user_id)
+            if not user:
+                raise ValueError(f"User with ID {command.user_id} not found.")
 
-        # Update the role
-        user_repository.update_role(user, command.role)
-        return {"message": f"Role for user {command.user_id} updated to {command.role}"}
+            # Update the role
+            user_repository.update_role(user, command.role)
+            token_cache.invalidate_user(user_id=user.id, email=user.email)
+            return {"message": f"Role for user {command.user_id} updated to {command.role}"}
 
 class HasVotedHandler:
     def handle(self, query: HasVotedQuery):
@@ -503,7 +607,7 @@ class ElectionSummaryHandler:
                 print(f"Turnout data for election {election.id}: {turnout_data}")
                 turnout_percentage = turnout_data["turnout_percentage"]
 
-                total_votes = sum(map(int, election.votes.split(","))) if election.votes else 0
+                total_votes = TallyRepository(db).get_total_votes(election.id)
 
                 summary.append({
                     "election_id": election.id,
@@ -524,14 +628,12 @@ class TopCandidateHandler:
             if not election:
                 raise ValueError(f"Election with ID {query.election_id} not found.")
 
-            # Parse candidates and votes
-            candidates = election.candidates.split(",")
-            votes = list(map(int, election.votes.split(",")))
+            tallies = TallyRepository(db).get_results(election.id)
+            if not tallies:
+                raise ValueError(f"Election with ID {query.election_id} has no candidates.")
 
-            # Determine the top candidate
-            max_votes = max(votes)
-            max_index = votes.index(max_votes)
-            top_candidate = candidates[max_index]
+            # Determine the top candidate (the first one listed wins a tie)
+            top_candidate, max_votes = max(tallies, key=lambda tally: tally[1])
 
             # Return the result
             return {
@@ -604,19 +706,17 @@ class ResultsBreakdownHandler:
             if not election:
                 raise ValueError(f"Election with ID {query.election_id} not found.")
 
-            # Parse candidates and votes
-            candidates = election.candidates.split(",")
-            votes = list(map(int, election.votes.split(",")))
+            tallies = TallyRepository(db).get_results(election.id)
 
             # Calculate percentage breakdown
-            total_votes = sum(votes)
+            total_votes = sum(votes for _, votes in tallies)
             results = [
                 {
                     "candidate": candidate,
                     "votes": vote,
                     "percentage": math.floor(vote / total_votes * 100) if total_votes > 0 else 0
                 }
-                for candidate, vote in zip(candidates, votes)
+                for candidate, vote in tallies
             ]
 
             return {
@@ -679,7 +779,7 @@ class BulkVoterUploadHandler:
     def handle(self, query: VoterUploadQuery):
         with SessionLocal() as db:
             repository = VoterRepository(db)
-        return repository.bulk_insert_voters(query.voters)
+            return repository.bulk_insert_voters(query.voters)
     
 class ExportElectionResultsHandler:
     def handle(self, query: ExportElectionResultsQuery):
@@ -710,53 +810,53 @@ class CreateObserverHandler:
     def handle(self, query: CreateObserverCommand):
         with SessionLocal() as db:
             repository = ObserverRepository(db)
-        return repository.create_observer(query.name, query.email, query.election_id, query.organization)
+            return repository.create_observer(query.name, query.email, query.election_id, query.organization)
     
 class GetObserversHandler:
     def handle(self, query: GetObserversQuery):
         with SessionLocal() as db:
             repository = ObserverRepository(db)
-        return repository.get_observers_by_election(query.election_id)
+            return repository.get_observers_by_election(query.election_id)
     
 class UpdateObserverHandler:
     def handle(self, query: UpdateObserverCommand):
         with SessionLocal() as db:
             repository = ObserverRepository(db)
-        observer = repository.update_observer(query.observer_id, query.name, query.email, query.organization)
-        if not observer:
-            raise ValueError(f"Observer with ID {query.observer_id} not found.")
-        print(f"Observer updated successfully: {observer.name}, {observer.email}, {observer.organization}")
-        return observer
+            observer = repository.update_observer(query.observer_id, query.name, query.email, query.organization)
+            if not observer:
+                raise ValueError(f"Observer with ID {query.observer_id} not found.")
+            print(f"Observer updated successfully: {observer.name}, {observer.email}, {observer.organization}")
+            return observer
     
 class DeleteObserverHandler:
     def handle(self, query: DeleteObserverCommand):
         with SessionLocal() as db:
             repository = ObserverRepository(db)
-        success = repository.delete_observer(query.observer_id)
-        if not success:
-            raise ValueError(f"Observer with ID {query.observer_id} not found.")
-        return {"message": "Observer deleted successfully"}
+            success = repository.delete_observer(query.observer_id)
+            if not success:
+                raise ValueError(f"Observer with ID {query.observer_id} not found.")
+            return {"message": "Observer deleted successfully"}
     
 class GetObserverByIdHandler:
     def handle(self, query: GetObserverByIdQuery):
         with SessionLocal() as db:
             repository = ObserverRepository(db)
-        observer = repository.get_observer_by_id(query.observer_id)
-        if not observer:
-            raise ValueError(f"Observer with ID {query.observer_id} not found.")
-        return observer
+            observer = repository.get_observer_by_id(query.observer_id)
+            if not observer:
+                raise ValueError(f"Observer with ID {query.observer_id} not found.")
+            return observer
     
 class CreateCandidateHandler:
     def handle(self, query: CreateCandidateCommand):
         with SessionLocal() as db:
             repository = CandidateRepository(db)
-        return repository.create_candidate(query.name, query.party, query.bio, query.election_id)
+            return repository.create_candidate(query.name, query.party, query.bio, query.election_id)
     
 class GetCandidatesHandler:
     def handle(self, query: GetCandidatesQuery):
         with SessionLocal() as db:
             repository = CandidateRepository(db)
-        return repository.get_candidates_by_election(query.election_id)
+            return repository.get_candidates_by_election(query.election_id)
     
 class UpdateCandidateHandler:
     def handle(self, query: UpdateCandidateCommand):
@@ -772,10 +872,10 @@ class DeleteCandidateHandler:
     def handle(self, query: DeleteCandidateCommand):
         with SessionLocal() as db:
             repository = CandidateRepository(db)
-        success = repository.delete_candidate(query.candidate_id)
-        if not success:
-            raise ValueError(f"Candidate with ID {query.candidate_id} not found.")
-        return {"message": "Candidate deleted successfully"}
+            success = repository.delete_candidate(query.candidate_id)
+            if not success:
+                raise ValueError(f"Candidate with ID {query.candidate_id} not found.")
+            return {"message": "Candidate deleted successfully"}
     
 class GetCandidateByIdHandler:
     def handle(self, query: GetCandidateByIdQuery):
@@ -789,9 +889,110 @@ class GetCandidateByIdHandler:
 class CastVoteHandlerv2:
     def handle(self, query: CastVoteCommandv2):
         with SessionLocal() as db:
-            repository = VoteRepository(db)
-            print(f"Voter ID: {query.voter_id}, Candidate ID: {query.candidate_id}, Election ID: {query.election_id}")
-            return repository.cast_vote(query.voter_id, query.candidate_id, query.election_id)
+            return self.execute(db, query)
+
+    async def handle_async(self, query: CastVoteCommandv2):
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(self.execute, query)
+
+    def execute(self, db, query: CastVoteCommandv2):
+        repository = VoteRepository(db)
+        vote = repository.cast_vote(query.voter_id, query.candidate_id, query.election_id)
+        analytics_refresher.record_votes()
+        return vote
+
+class BulkCastVotesHandler:
+    """
+    Ingests a batch of votes (e.g. an offline polling station sync) chunk by chunk.
+    Each chunk is validated, checked against the database with one query per table,
+    inserted with multi-row INSERT ... RETURNING and committed together with a single
+    tally update. Invalid rows are reported by index and don't block the others.
+    """
+    def __init__(self, chunk_size: int = BULK_VOTE_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+
+    def handle(self, command: BulkCastVotesCommand):
+        with SessionLocal() as db:
+            return self.execute(db, command)
+
+    async def handle_async(self, command: BulkCastVotesCommand):
+        async with AsyncSessionLocal() as db:
+            return await db.run_sync(self.execute, command)
+
+    def execute(self, db, command: BulkCastVotesCommand):
+        if len(command.rows) > BULK_VOTE_MAX_ROWS:
+            raise ValueError(f"Too many votes in one request ({len(command.rows)}), the limit is {BULK_VOTE_MAX_ROWS}.")
+
+        repository = VoteRepository(db)
+        tally_repository = TallyRepository(db)
+        rollup_repository = RollupRepository(db)
+        inserted = []
+        errors = []
+        seen_voters = set()  # (voter_id, election_id) already accepted in this request
+
+        for start in range(0, len(command.rows), self.chunk_size):
+            valid = []
+            for position, raw_row in enumerate(command.rows[start:start + self.chunk_size], start=start):
+                index = command.row_numbers[position] if command.row_numbers else position
+                if isinstance(raw_row, str):
+                    # NDJSON lines that could not be parsed are passed through as text
+                    errors.append({"row": index, "errors": [f"Invalid JSON: {raw_row}"]})
+                    continue
+                try:
+                    row = BulkVoteRow.model_validate(raw_row)
+                except ValidationError as e:
+                    errors.append({"row": index, "errors": [f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors()]})
+                    continue
+                valid.append((index, row.model_dump()))
+
+            if not valid:
+                continue
+
+            reference = repository.get_bulk_reference_data([row for _, row in valid])
+            to_insert = []
+            for index, row in valid:
+                row_errors = []
+                if row["voter_id"] not in reference["voters"]:
+                    row_errors.append(f"Voter {row['voter_id']} not found")
+                if row["election_id"] not in reference["elections"]:
+                    row_errors.append(f"Election {row['election_id']} not found")
+                elif row["election_id"] in reference["ended_elections"]:
+                    row_errors.append(f"Election {row['election_id']} has ended")
+                if reference["candidates"].get(row["candidate_id"]) != row["election_id"]:
+                    row_errors.append(f"Candidate {row['candidate_id']} is not standing in election {row['election_id']}")
+                if row["polling_station_id"] is not None and reference["polling_stations"].get(row["polling_station_id"]) != row["election_id"]:
+                    row_errors.append(f"Polling station {row['polling_station_id']} does not belong to election {row['election_id']}")
+                voter_election = (row["voter_id"], row["election_id"])
+                if voter_election in reference["already_voted"] or voter_election in seen_voters:
+                    row_errors.append("Voter has already voted in this election")
+
+                if row_errors:
+                    errors.append({"row": index, "errors": row_errors})
+                    continue
+                seen_voters.add(voter_election)
+                # Stored like single votes: naive UTC, which asyncpg accepts for the column
+                row["timestamp"] = as_stored_timestamp(row["timestamp"])
+                to_insert.append((index, row))
+
+            if not to_insert:
+                continue
+
+            vote_ids = repository.bulk_insert_votes([row for _, row in to_insert])
+            tally_repository.increment_many(Counter((row["election_id"], row["candidate_id"]) for _, row in to_insert))
+            # Core inserts skip the ORM hook that maintains the rollups for single votes
+            rollup_repository.record_votes([row for _, row in to_insert])
+            db.commit()
+            analytics_refresher.record_votes(len(to_insert))
+            inserted.extend({"row": index, "vote_id": vote_id} for (index, _), vote_id in zip(to_insert, vote_ids))
+
+        errors.sort(key=lambda error: error["row"])
+        return {
+            "received": len(command.rows),
+            "inserted": len(inserted),
+            "failed": len(errors),
+            "votes": inserted,
+            "errors": errors,
+        }
         
 class GetVotesByElectionHandler:
     def handle(self, query: GetVotesByElectionQuery):
@@ -809,25 +1010,31 @@ class SubmitFeedbackHandler:
     def handle(self, query: SubmitFeedbackCommand):
         with SessionLocal() as db:
             repository = ObserverFeedbackRepository(db)
-        return repository.submit_feedback(query.observer_id, query.election_id, query.description, query.severity)
+            return repository.submit_feedback(query.observer_id, query.election_id, query.description, query.severity)
     
+class BackfillFeedbackSentimentHandler:
+    def handle(self, command: BackfillFeedbackSentimentCommand):
+        with SessionLocal() as db:
+            repository = ObserverFeedbackRepository(db)
+            return {"scored": repository.backfill_sentiment(command.batch_size)}
+
 class GetFeedbackByElectionHandler:
     def handle(self, query: GetFeedbackByElectionQuery):
         with SessionLocal() as db:
             repository = ObserverFeedbackRepository(db)
-        return repository.get_feedback_by_election(query.election_id)
+            return repository.get_feedback_by_election(query.election_id)
     
 class GetFeedbackBySeverityHandler:
     def handle(self, query: GetFeedbackBySeverityQuery):
         with SessionLocal() as db:
             repository = ObserverFeedbackRepository(db)
-        return repository.get_feedback_by_severity(query.severity)
+            return repository.get_feedback_by_severity(query.severity)
     
 class GetIntegrityScoreHandler:
     def handle(self, query: GetIntegrityScoreQuery):
         with SessionLocal() as db:
             repository = ObserverFeedbackRepository(db)
-        return repository.get_integrity_score(query.election_id)
+            return repository.get_integrity_score(query.election_id)
     
 class GetSeverityDistributionHandler:
     def handle(self, query: GetSeverityDistributionQuery):
@@ -839,7 +1046,7 @@ class GetTopObserversHandler:
     def handle(self, query: GetTopObserversQuery):
         with SessionLocal() as db:
             repository = ObserverFeedbackRepository(db)
-        return repository.get_top_observers(limit=query.limit)
+            return repository.get_top_observers(limit=query.limit)
     
 class GetTimePatternsHandler:
     def handle(self, query: GetTimePatternsQuery):
@@ -851,19 +1058,19 @@ class GetSentimentAnalysisHandler:
     def handle(self, query: GetSentimentAnalysisQuery):
         with SessionLocal() as db:
             repository = ObserverFeedbackRepository(db)
-        return repository.analyze_sentiment()
+            return repository.analyze_sentiment()
     
 class GetTurnoutPredictionHandler:
     def handle(self, query: GetTurnoutPredictionQuery):
         with SessionLocal() as db:
             repository = ElectionRepository(db)
-        return repository.predict_turnout(query.election_id)
+            return repository.predict_turnout(query.election_id)
     
 class GetObserverTrustScoresHandler:
     def handle(self, query: GetObserverTrustScoresQuery):
         with SessionLocal() as db:
             repository = ObserverRepository(db)
-        return repository.calculate_observer_trust_scores()
+            return repository.calculate_observer_trust_scores()
     
 class GetFeedbackExportHandler:
     def handle(self, query: GetFeedbackExportQuery):
@@ -875,43 +1082,43 @@ class GetElectionSummaryHandler:
     def handle(self, query: GetElectionSummaryQuery):
         with SessionLocal() as db:
             repository = VoteRepository(db)
-        return repository.get_election_summary(query.election_id)
+            return repository.get_election_summary(query.election_id)
     
 class GetSentimentTrendHandler:
     def handle(self, query: GetSentimentTrendQuery):
         with SessionLocal() as db:
             repository = VoteRepository(db)
-        return repository.get_sentiment_trend(query.election_id)
+            return repository.get_sentiment_trend(query.election_id)
     
 class GetFeedbackCategoryAnalyticsHandler:
     def handle(self, query: GetFeedbackCategoryAnalyticsQuery):
         with SessionLocal() as db:
             repository = ObserverFeedbackRepository(db)
-        return repository.get_feedback_category_analytics(query.election_id)
+            return repository.get_feedback_category_analytics(query.election_id)
     
 class GetCandidateVoteDistributionHandler:
     def handle(self, query: GetCandidateVoteDistributionQuery):
         with SessionLocal() as db:
             repository = VoteRepository(db)
-        return repository.get_candidate_vote_distribution(query.election_id)
+            return repository.get_candidate_vote_distribution(query.election_id, query.fresh)
     
 class GetTimeBasedVotingPatternsHandler:
     def handle(self, query: GetTimeBasedVotingPatternsQuery):
         with SessionLocal() as db:
             repository = VoteRepository(db)
-        return repository.get_time_based_voting_patterns(query.election_id, query.interval)
+            return repository.get_time_based_voting_patterns(query.election_id, query.interval, query.fresh)
     
 class GetHistoricalTurnoutTrendsHandler:
     def handle(self, query: GetHistoricalTurnoutTrendsQuery):
         with SessionLocal() as db:
             repository = VoteRepository(db)
-        return repository.get_turnout_trends(query.election_ids)
+            return repository.get_turnout_trends(query.election_ids)
     
 class GetTurnoutPredictionHandler:
     def handle(self, query: GetTurnoutPredictionQuery):
         with SessionLocal() as db:
             repository = VoteRepository(db)
-        return repository.predict_turnout(query.election_id, query.lookback)
+            return repository.predict_turnout(query.election_id, query.lookback)
 
 class GetSeasonalTurnoutPredictionHandler:
     def handle(self, query: GetSeasonalTurnoutPredictionQuery):
@@ -953,7 +1160,7 @@ class GeolocationAnalyticsHandler:
     def handle(self, query: GeolocationAnalyticsQuery):
         with SessionLocal() as db:
             repo = VoteRepository(db)
-            return repo.get_geolocation_metrics(query.election_id)
+            return repo.get_geolocation_metrics(query.election_id, query.fresh)
         
 class PollingStationAnalyticsHandler:
     def handle(self, query: PollingStationAnalyticsQuery):
@@ -983,7 +1190,7 @@ class GeolocationTrendsHandler:
     def handle(self, query: GeolocationTrendsQuery) -> list:
         with SessionLocal() as db:
             repo = VoteRepository(db)
-            return repo.get_votes_by_region(query.election_id, query.region)
+            return repo.get_votes_by_region(query.election_id, query.region, query.fresh)
         
 class GetAlertsHandler:
     def handle(self, query: GetAlertsQuery) -> list:
@@ -1007,8 +1214,8 @@ class GetAlertsWebSocketHandler:
     def handle(self, query: GetAlertsWSQuery) -> list:
         with SessionLocal() as db:
             repo = AlertRepository(db)
-            # Pass both election_id and status if provided.
-            return repo.get_alerts(query.election_id, query.status)
+            # Pass election_id, status and alert_type if provided.
+            return repo.get_alerts(query.election_id, query.status, query.alert_type)
         
 class GetNotificationsHandler:
     def handle(self, query: GetNotificationsQuery) -> list:
@@ -1098,8 +1305,13 @@ class PredictiveSubscriptionAnalyticsHandler:
         periods = np.array([t[0].toordinal() for t in time_series]).reshape(-1, 1)
         counts = np.array([t[1] for t in time_series])
         
-        model = LinearRegression()
-        model.fit(periods, counts)
+        fingerprint = series_fingerprint([t[0] for t in time_series], counts)
+        model = forecast_models.get("linear", query.user_id, query.alert_type, fingerprint)
+        if model is None:
+            # A least-squares fit is cheap enough to redo whenever the data changes
+            model = LinearRegression()
+            model.fit(periods, counts)
+            forecast_models.put("linear", query.user_id, query.alert_type, fingerprint, model)
         
         last_date = max(t[0] for t in time_series)
         forecast = []
@@ -1119,8 +1331,6 @@ class PredictiveSubscriptionAnalyticsHandler:
     
 class EnhancedPredictiveSubscriptionAnalyticsHandler:
     def handle(self, query: EnhancedPredictiveSubscriptionAnalyticsQuery) -> dict:
-        from statsmodels.tsa.arima.model import ARIMA
-        
         with SessionLocal() as db:
             repo = SubscriptionEventRepository(db)
             # Retrieve time series data grouped by day for the alert type
@@ -1143,12 +1353,16 @@ class EnhancedPredictiveSubscriptionAnalyticsHandler:
         # Use the 'count' column as our time series
         series = df['count']
         
-        # Fit the ARIMA model (using an order of (1, 1, 1) as a starting point)
-        try:
-            model = ARIMA(series, order=(1, 1, 1))
-            model_fit = model.fit()
-        except Exception as e:
-            return {"message": f"ARIMA model failed: {str(e)}"}
+        # Reuse the model fitted on exactly this data
+        fingerprint = series_fingerprint(series.index, series.values)
+        model_fit = forecast_models.get("arima", query.user_id, query.alert_type, fingerprint)
+        if model_fit is None:
+            try:
+                model_fit, fitted_days = self.fit(query, series)
+            except Exception as e:
+                return {"message": f"ARIMA model failed: {str(e)}"}
+            meta = {"start": series.index.min().isoformat(), "days": len(series), "fitted_days": fitted_days}
+            forecast_models.put("arima", query.user_id, query.alert_type, fingerprint, model_fit, meta)
         
         # Forecast future subscription event counts
         forecast_values = model_fit.forecast(steps=query.forecast_days)
@@ -1170,6 +1384,23 @@ class EnhancedPredictiveSubscriptionAnalyticsHandler:
             "forecast": forecast,
             "model": "ARIMA(1,1,1)"
         }
+
+    def fit(self, query: EnhancedPredictiveSubscriptionAnalyticsQuery, series):
+        """Returns the fitted model and the number of days its parameters were estimated on."""
+        from statsmodels.tsa.arima.model import ARIMA
+
+        previous = forecast_models.latest("arima", query.user_id, query.alert_type)
+        if previous is not None:
+            previous_fit, meta = previous
+            new_days = len(series) - meta["fitted_days"]
+            if meta["start"] == series.index.min().isoformat() and 0 <= new_days <= FORECAST_WARM_START_DAYS:
+                # The same series with a few more (or updated) days: keep the fitted
+                # parameters and only run the filter over the data again
+                return previous_fit.apply(series), meta["fitted_days"]
+
+        # Fit the ARIMA model (using an order of (1, 1, 1) as a starting point)
+        model = ARIMA(series, order=(1, 1, 1))
+        return model.fit(), len(series)
     
 class EnhancedNeuralNetworkPredictiveAnalyticsHandler:
     def handle(self, query: EnhancedNeuralNetworkPredictiveAnalyticsQuery) -> dict:
@@ -1208,16 +1439,13 @@ class EnhancedNeuralNetworkPredictiveAnalyticsHandler:
         # Reshape X for LSTM: (samples, time steps, features)
         X = X.reshape((X.shape[0], X.shape[1], 1))
         
-        # Build a simple LSTM model
-        model = Sequential([
-            LSTM(50, activation='relu', input_shape=(window_size, 1)),
-            Dropout(0.2),
-            Dense(1)
-        ])
-        model.compile(optimizer=Adam(learning_rate=0.001), loss='mse')
-        
-        # Train the model, using a small number of epochs for demonstration.
-        model.fit(X, y, epochs=50, verbose=0)
+        # Reuse the model trained on exactly this data
+        fingerprint = series_fingerprint(df.index, series)
+        model = forecast_models.get("lstm", query.user_id, query.alert_type, fingerprint, format="keras")
+        if model is None:
+            model, fitted_days = self.fit(query, X, y, window_size, df.index.min(), len(series))
+            meta = {"start": df.index.min().isoformat(), "days": len(series), "fitted_days": fitted_days}
+            forecast_models.put("lstm", query.user_id, query.alert_type, fingerprint, model, meta, format="keras")
         
         # Forecast for query.forecast_days using rolling predictions
         predictions = []
@@ -1225,7 +1453,8 @@ class EnhancedNeuralNetworkPredictiveAnalyticsHandler:
         for _ in range(query.forecast_days):
             # reshape last window to model input shape
             input_window = last_window.reshape((1, window_size, 1))
-            pred = model.predict(input_window, verbose=0)
+            # Calling the model directly skips predict()'s per-call batching setup
+            pred = np.asarray(model(input_window, training=False))
             predictions.append(float(pred[0, 0]))
             # update the window by appending the predicted value and removing the oldest
             last_window = np.append(last_window[1:], pred)
@@ -1248,6 +1477,33 @@ class EnhancedNeuralNetworkPredictiveAnalyticsHandler:
             "model": "LSTM Neural Network"
         }
 
+    def fit(self, query: EnhancedNeuralNetworkPredictiveAnalyticsQuery, X, y, window_size: int, start, days: int):
+        """Returns the trained model and the number of days it was last trained from scratch on."""
+        previous = forecast_models.latest("lstm", query.user_id, query.alert_type, format="keras")
+        if previous is not None:
+            previous_model, meta = previous
+            new_days = days - meta["fitted_days"]
+            if meta["start"] == start.isoformat() and 0 <= new_days <= FORECAST_WARM_START_DAYS:
+                # Warm start: a few more epochs from the previous weights. The cached model is
+                # shared with other requests, so train a copy of it.
+                model = keras_models.clone_model(previous_model)
+                model.set_weights(previous_model.get_weights())
+                model.compile(optimizer=keras_optimizers.Adam(learning_rate=0.001), loss='mse')
+                model.fit(X, y, epochs=FORECAST_WARM_START_EPOCHS, verbose=0)
+                return model, meta["fitted_days"]
+
+        # Build a simple LSTM model
+        model = keras_models.Sequential([
+            keras_layers.LSTM(50, activation='relu', input_shape=(window_size, 1)),
+            keras_layers.Dropout(0.2),
+            keras_layers.Dense(1)
+        ])
+        model.compile(optimizer=keras_optimizers.Adam(learning_rate=0.001), loss='mse')
+        
+        # Train the model, using a small number of epochs for demonstration.
+        model.fit(X, y, epochs=50, verbose=0)
+        return model, days
+
 class CorrelateFeedbackAnalyticsHandler:
     def handle(self, query: CorrelationAnalyticsQuery) -> dict:
         with SessionLocal() as db:
@@ -1306,14 +1562,55 @@ class CommandBus:
     def register_handler(self, command_type, handler):
         self.handlers[command_type] = handler
 
-    def handle(self, command):
+    def get_handler(self, command):
         command_type = type(command)
         if command_type not in self.handlers:
             raise ValueError(f"No handler registered for {command_type}")
-        handler = self.handlers[command_type]
+        return self.handlers[command_type]
+
+    def handle(self, command):
+        handler = self.get_handler(command)
         
+        # Commands always run against the primary, including any queries they dispatch
+        succeeded = False
+        try:
+            with primary_only():
+                result = handler.handle(command)
+            succeeded = True
+        finally:
+            # Also after a failure: the handler may have committed part of its work
+            self._announce(command, succeeded)
+        mark_write()
         # Return the result from the handler
-        return handler.handle(command)
+        return result
+
+    async def handle_async(self, command):
+        handler = self.get_handler(command)
+
+        # Await native async handlers; run the rest off the event loop
+        succeeded = False
+        try:
+            with primary_only():
+                if hasattr(handler, "handle_async"):
+                    result = await handler.handle_async(command)
+                else:
+                    result = await run_in_threadpool(handler.handle, command)
+            succeeded = True
+        finally:
+            # Bumping a redis version store waits on the network
+            await run_in_threadpool(self._announce, command, succeeded)
+        mark_write()
+        return result
+
+    @staticmethod
+    def _announce(command, succeeded: bool = True):
+        """
+        Drops cached reads the command made stale and moves the versions of what it changed.
+        Other workers' real-time streams are only told about commands that completed.
+        """
+        query_cache.invalidate(command)
+        election_versions.bump_for(command, announce=succeeded)
+        reference_catalog.bump_for(command)
 
 # Create and register the command handler
 command_bus = CommandBus()
@@ -1324,6 +1621,7 @@ command_bus.register_handler(EndElectionCommand, EndElectionHandler())
 command_bus.register_handler(UserSignUp, RegisterUserHandler())
 command_bus.register_handler(LoginUserCommand, AuthCommandHandler())
 command_bus.register_handler(EditUserCommand, EditUserHandler())
+command_bus.register_handler(UpdateUserRoleCommand, UpdateUserRoleHandler())
 command_bus.register_handler(CreatePollingStationCommand, CreatePollingStationHandler())
 command_bus.register_handler(UpdatePollingStationCommand, UpdatePollingStationHandler())
 command_bus.register_handler(DeletePollingStationCommand, DeletePollingStationHandler())
@@ -1336,7 +1634,10 @@ command_bus.register_handler(CreateCandidateCommand, CreateCandidateHandler())
 command_bus.register_handler(UpdateCandidateCommand, UpdateCandidateHandler())
 command_bus.register_handler(DeleteCandidateCommand, DeleteCandidateHandler())
 command_bus.register_handler(CastVoteCommandv2, CastVoteHandlerv2())
+command_bus.register_handler(ArchiveElectionVotesCommand, ArchiveElectionVotesHandler())
+command_bus.register_handler(BulkCastVotesCommand, BulkCastVotesHandler())
 command_bus.register_handler(SubmitFeedbackCommand, SubmitFeedbackHandler())
+command_bus.register_handler(BackfillFeedbackSentimentCommand, BackfillFeedbackSentimentHandler())
 command_bus.register_handler(CreateAlertCommand, CreateAlertHandler())
 command_bus.register_handler(UpdateAlertCommand, UpdateAlertHandler())
 command_bus.register_handler(MarkNotificationReadCommand, MarkNotificationReadHandler())
@@ -1350,6 +1651,7 @@ query_bus.register_handler(CheckVoterExistsQuery, CheckVoterExistsHandler())
 query_bus.register_handler(GetAllElectionsQuery, GetAllElectionsHandler())
 query_bus.register_handler(GetElectionDetailsQuery, GetElectionDetailsHandler())
 query_bus.register_handler(GetElectionResultsQuery, GetElectionResultsHandler())
+query_bus.register_handler(GetElectionSnapshotQuery, GetElectionSnapshotHandler())
 query_bus.register_handler(GetVotingPageDataQuery, GetVotingPageDataHandler())
 query_bus.register_handler(GetUserByEmailQuery, UserQueryHandler())
 query_bus.register_handler(GetUserProfileQuery, GetUserProfileHandler())
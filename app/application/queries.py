@@ -1,12 +1,17 @@
 from datetime import datetime
-from typing import List, Optional
+from typing import ClassVar, List, Optional
 from pydantic import BaseModel
 
 
 class GetElectionResultsQuery:
+    cache_ttl = 10
+
     def __init__(self, election_id: int):
         self.election_id = election_id
 
+    def cache_key(self):
+        return f"election:{self.election_id}:results"
+
 class GetVoterDetailsQuery:
     def __init__(self, voter_id: int):
         self.voter_id = voter_id
@@ -16,12 +21,21 @@ class CheckVoterExistsQuery:
         self.voter_id = voter_id
 
 class GetAllElectionsQuery:
-    pass  # No parameters are required for fetching all elections
+    # No parameters are required for fetching all elections
+    cache_ttl = 10
+
+    def cache_key(self):
+        return "elections:all"
 
 class GetElectionDetailsQuery:
+    cache_ttl = 10
+
     def __init__(self, election_id: int):
         self.election_id = election_id
 
+    def cache_key(self):
+        return f"election:{self.election_id}:details"
+
 class GetVotingPageDataQuery:
     pass  # No parameters needed since we fetch all voters and elections
 
@@ -146,6 +160,10 @@ class GetFeedbackExportQuery(BaseModel):
 
 class GetElectionSummaryQuery(BaseModel):
     election_id: int
+    cache_ttl: ClassVar[float] = 30
+
+    def cache_key(self):
+        return f"election:{self.election_id}:summary"
 
 class GetSentimentTrendQuery(BaseModel):
     election_id: int
@@ -155,10 +173,16 @@ class GetFeedbackCategoryAnalyticsQuery(BaseModel):
 
 class GetCandidateVoteDistributionQuery(BaseModel):
     election_id: int
+    fresh: bool = False  # Aggregate raw votes instead of the materialized view
+    cache_ttl: ClassVar[float] = 30
+
+    def cache_key(self):
+        return None if self.fresh else f"election:{self.election_id}:distribution"
 
 class GetTimeBasedVotingPatternsQuery(BaseModel):
     election_id: int
     interval: str = "hourly"  # Supports "hourly" or "daily"
+    fresh: bool = False
 
 class GetHistoricalTurnoutTrendsQuery(BaseModel):
     election_ids: list[int]
@@ -184,15 +208,22 @@ class GetDetailedHistoricalComparisonsWithExternalQuery(BaseModel):
 
 class DashboardAnalyticsQuery(BaseModel):
     election_id: int
+    cache_ttl: ClassVar[float] = 30
+    coalesce: ClassVar[bool] = True
+
+    def cache_key(self):
+        return f"election:{self.election_id}:dashboard"
 
 class RealTimeElectionSummaryQuery(BaseModel):
     election_id: int
 
 class GeolocationAnalyticsQuery(BaseModel):
     election_id: int
+    fresh: bool = False
 
 class PollingStationAnalyticsQuery(BaseModel):
     election_id: int
+    coalesce: ClassVar[bool] = True
 
 class HistoricalPollingStationTrendsQuery(BaseModel):
     election_ids: List[int]
@@ -203,10 +234,12 @@ class PredictiveVoterTurnoutQuery(BaseModel):
 
 class AnomalyDetectionQuery(BaseModel):
     election_id: int
+    coalesce: ClassVar[bool] = True
 
 class GeolocationTrendsQuery(BaseModel):
     election_id: int
     region: Optional[str] = None  # Optional filter to restrict to a specific region.
+    fresh: bool = False
 
 class GetAlertsQuery(BaseModel):
     election_id: Optional[int] = None
@@ -214,6 +247,7 @@ class GetAlertsQuery(BaseModel):
 class GetAlertsWSQuery(BaseModel):
     election_id: Optional[int] = None
     status: Optional[str] = None  # e.g., "new", "acknowledged", "resolved"
+    alert_type: Optional[str] = None
 
 class GetNotificationsQuery(BaseModel):
     user_id: int
@@ -259,4 +293,13 @@ class CorrelationAnalyticsQuery(BaseModel):
     user_id: int
     start_date: Optional[datetime] = None
     end_date: Optional[datetime] = None
-    alert_type: Optional[str] = None
\ No newline at end of file
+    alert_type: Optional[str] = None
+
+class GetElectionSnapshotQuery(BaseModel):
+    election_id: int
+    section: str  # One of SNAPSHOT_SECTIONS
+    # Only EndElectionCommand creates a snapshot, and it invalidates election:{id}:*
+    cache_ttl: ClassVar[float] = 300
+
+    def cache_key(self):
+        return f"election:{self.election_id}:snapshot:{self.section}"
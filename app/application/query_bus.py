@@ -1,3 +1,8 @@
+from starlette.concurrency import run_in_threadpool
+from app.application.query_cache import query_cache
+from app.application.single_flight import single_flight
+from app.infrastructure.replica_routing import replica_reads
+
 
 class QueryBus:
     def __init__(self):
@@ -11,17 +16,72 @@ class QueryBus:
         """
         self.handlers[query_type] = handler
 
+    def get_handler(self, query):
+        query_type = type(query)
+        if query_type not in self.handlers:
+            raise ValueError(f"No handler registered for query type: {query_type}")
+        return self.handlers[query_type]
+
     def handle(self, query):
         """
-        Dispatches the query to its appropriate handler.
+        Dispatches the query to its appropriate handler, or answers it from the
+        query cache when the query defines a cache key (see QueryCache). Queries
+        with `coalesce = True` share one execution with identical queries already
+        running (see SingleFlight).
         :param query: The query object.
         :return: The result from the handler.
         """
-        query_type = type(query)
-        if query_type not in self.handlers:
-            raise ValueError(f"No handler registered for query type: {query_type}")
-        handler = self.handlers[query_type]
-        return handler.handle(query)
+        handler = self.get_handler(query)
+        cache_key = query_cache.key_for(query)
+        if cache_key is not None:
+            hit, result = query_cache.get(query, cache_key)
+            if hit:
+                return result
+
+        def run():
+            generation = query_cache.generation()
+            # Queries may be served by a read replica
+            with replica_reads():
+                result = handler.handle(query)
+            if cache_key is not None:
+                query_cache.set(query, cache_key, result, generation)
+            return result
+
+        flight_key = single_flight.key_for(query)
+        if flight_key is not None:
+            return single_flight.do(flight_key, run)
+        return run()
+
+    async def handle_async(self, query):
+        """
+        Dispatches the query from async code without blocking the event loop.
+        Handlers that implement `handle_async` are awaited directly on the async
+        engine; the rest run their synchronous `handle` in the threadpool.
+        :param query: The query object.
+        :return: The result from the handler.
+        """
+        handler = self.get_handler(query)
+        cache_key = query_cache.key_for(query)
+        if cache_key is not None:
+            hit, result = query_cache.get(query, cache_key)
+            if hit:
+                return result
+
+        async def run():
+            generation = query_cache.generation()
+            with replica_reads():
+                if hasattr(handler, "handle_async"):
+                    result = await handler.handle_async(query)
+                else:
+                    result = await run_in_threadpool(handler.handle, query)
+            if cache_key is not None:
+                query_cache.set(query, cache_key, result, generation)
+            return result
+
+        flight_key = single_flight.key_for(query)
+        if flight_key is not None:
+            return await single_flight.do_async(flight_key, run)
+        return await run()
 
 query_bus = QueryBus()
 
@@ -0,0 +1,100 @@
+import pickle
+import threading
+from collections import defaultdict
+
+from app.config import QUERY_CACHE_BACKEND, QUERY_CACHE_ENABLED, QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_REDIS_URL
+from app.infrastructure.cache import build_cache
+from app.infrastructure.replica_routing import reads_pinned_to_primary
+
+
+class QueryCache:
+    """
+    Result cache in front of the QueryBus, invalidated by the CommandBus.
+
+    A query opts in by defining `cache_key()` (returning None skips the cache for that
+    instance) and `cache_ttl` in seconds. A command lists the keys it makes stale in
+    `invalidates()`; a key ending in "*" drops every key starting with what comes before it.
+    Results are pickled, so callers never share (and mutate) the cached object.
+
+    Every invalidation moves a generation counter. The QueryBus takes it before running a
+    query and passes it to `set()`, so a result read before a command committed is not cached
+    once that command has invalidated the cache.
+    """
+    def __init__(self, backend, enabled: bool = True):
+        self.backend = backend
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = defaultdict(lambda: {"hits": 0, "misses": 0})
+        self._invalidations = 0
+        self._generation = 0
+
+    def key_for(self, query):
+        if not self.enabled or not hasattr(query, "cache_key"):
+            return None
+        return query.cache_key()
+
+    def get(self, query, key: str):
+        """Returns (hit, result)."""
+        # Commands and clients in their read-your-writes window read the database directly,
+        # and store what they read for everyone else
+        value = None if reads_pinned_to_primary() else self.backend.get(key)
+        with self._lock:
+            self._counters[type(query).__name__]["hits" if value is not None else "misses"] += 1
+        if value is None:
+            return False, None
+        return True, pickle.loads(value)
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def set(self, query, key: str, result, generation: int = None):
+        """Stores `result`, unless the cache was invalidated since `generation` was taken."""
+        if generation is not None and generation != self.generation():
+            return
+        self.backend.set(key, pickle.dumps(result), query.cache_ttl)
+        if generation is not None and generation != self.generation():
+            # Invalidated while it was being written, possibly before the write landed
+            self.backend.delete(key)
+
+    def invalidate(self, command):
+        if not self.enabled or not hasattr(command, "invalidates"):
+            return
+        # Moved before anything is deleted, so a set() racing with the deletes undoes itself
+        with self._lock:
+            self._generation += 1
+        for key in command.invalidates():
+            if key.endswith("*"):
+                self.backend.delete_prefix(key[:-1])
+            else:
+                self.backend.delete(key)
+            with self._lock:
+                self._invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._counters.clear()
+            self._invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            queries = {name: dict(counts) for name, counts in self._counters.items()}
+            invalidations = self._invalidations
+        hits = sum(counts["hits"] for counts in queries.values())
+        misses = sum(counts["misses"] for counts in queries.values())
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "invalidations": invalidations,
+            "queries": queries,
+        }
+
+query_cache = QueryCache(
+    build_cache(QUERY_CACHE_BACKEND, QUERY_CACHE_MAX_ENTRIES, QUERY_CACHE_REDIS_URL),
+    enabled=QUERY_CACHE_ENABLED,
+)
@@ -0,0 +1,106 @@
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+
+from app.config import QUERY_COALESCING_ENABLED
+from app.infrastructure.replica_routing import reads_pinned_to_primary
+
+
+def on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical queries: the first caller (the leader) runs the query,
+    callers arriving while it runs wait for it and get a copy of its result (or its error).
+    Works across threads (sync callers) and event loops (async callers) alike, since the
+    in-flight call is a concurrent.futures.Future.
+
+    A query opts in with `coalesce = True`. Two queries are identical when they have the
+    same type and the same field values.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls = {}  # key -> Future of the running call
+        self._tasks = set()  # async calls in progress, referenced so they aren't collected
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def key_for(self, query):
+        if not self.enabled or not getattr(query, "coalesce", False):
+            return None
+        fields = query.model_dump() if hasattr(query, "model_dump") else vars(query)
+        # Clients in their read-your-writes window must not share a replica read
+        return type(query), repr(sorted(fields.items())), reads_pinned_to_primary()
+
+    def _join(self, key):
+        """Returns (future, is_leader)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["followers"] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self.stats["leaders"] += 1
+            return future, True
+
+    def _finish(self, key, future, result=None, error=None):
+        # Later callers start a new call rather than get this (possibly outdated) result
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn):
+        if on_event_loop():
+            # Waiting here would block the loop an async leader may be running on
+            return fn()
+        future, leader = self._join(key)
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key, fn):
+        future, leader = self._join(key)
+        if not leader:
+            # Shielded: a follower that is cancelled must not cancel the call the others wait for
+            return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(future)))
+        # The query runs in a task of its own, so a leader that is cancelled (e.g. its client
+        # went away) only stops waiting, and the followers still get the result
+        task = asyncio.ensure_future(fn())
+        self._tasks.add(task)
+        task.add_done_callback(lambda done: self._settle(key, future, done))
+        return await asyncio.shield(task)
+
+    def _settle(self, key, future, task):
+        self._tasks.discard(task)
+        if task.cancelled():
+            with self._lock:
+                self._calls.pop(key, None)
+            future.cancel()
+        elif task.exception() is not None:
+            self._finish(key, future, error=task.exception())
+        else:
+            self._finish(key, future, task.result())
+
+    def status(self) -> dict:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {"enabled": self.enabled, "in_flight": in_flight, **self.stats}
+
+single_flight = SingleFlight(enabled=QUERY_COALESCING_ENABLED)
@@ -0,0 +1,74 @@
+import logging
+import threading
+from sqlalchemy.orm import Session
+
+from app.infrastructure.broker import broker
+from app.infrastructure.database import engine
+
+logger = logging.getLogger(__name__)
+
+ALERTS_CHANNEL = "alerts"
+
+
+class AlertEvents:
+    """
+    Tells listeners which alerts were created or changed, once the change is committed.
+
+    AlertRepository publishes the id of every alert a transaction touches on the broker's
+    "alerts" channel when it commits (nothing is published if it rolls back). With the postgres
+    broker this is a NOTIFY in the transaction itself. Every process subscribed to the channel
+    loads the alerts once and hands them to its callbacks, so with the postgres or redis broker
+    clients of every worker hear about the change.
+
+    Callbacks get a list of alert dicts and may be called from any thread.
+    """
+    def __init__(self, broker=broker):
+        self.broker = broker
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._subscribed = False
+        self.stats = {"published": 0, "delivered": 0}
+
+    def add_listener(self, callback):
+        with self._lock:
+            self._callbacks.append(callback)
+            subscribe = not self._subscribed
+            self._subscribed = True
+        if subscribe:
+            self.broker.subscribe(ALERTS_CHANNEL, self._on_message)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def publish(self, db: Session, alert: dict):
+        """Announces `alert` when `db`'s transaction commits. Call it before the commit."""
+        self.broker.publish_on_commit(db, ALERTS_CHANNEL, {"ids": [alert["id"]]})
+        self.stats["published"] += 1
+
+    def _on_message(self, channel: str, message: dict):
+        with self._lock:
+            callbacks = list(self._callbacks)
+        if not callbacks:
+            return
+        alerts = self._load(message["ids"])
+        for callback in callbacks:
+            try:
+                callback(alerts)
+            except Exception as e:
+                logger.warning("Alert listener failed: %s", e)
+        self.stats["delivered"] += len(alerts)
+
+    def _load(self, alert_ids: list) -> list:
+        # Imported here because alert_repo publishes through this module
+        from app.infrastructure.alert_repo import AlertRepository
+        with Session(engine) as db:
+            return AlertRepository(db).get_alerts_by_ids(alert_ids)
+
+    def status(self) -> dict:
+        with self._lock:
+            listeners = len(self._callbacks)
+        return {"channel": ALERTS_CHANNEL, "broker": self.broker.status(), "listeners": listeners, **self.stats}
+
+alert_events = AlertEvents()
@@ -2,30 +2,38 @@ from datetime import datetime, timezone
 import math
 from sqlalchemy import func
 from sqlalchemy.orm import Session
+from app.infrastructure.alert_events import alert_events
 from app.infrastructure.models import Alert
 
 class AlertRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_alerts(self, election_id: int = None, status: str = None) -> list:
+    @staticmethod
+    def to_dict(alert: Alert) -> dict:
+        return {
+            "id": alert.id,
+            "election_id": alert.election_id,
+            "alert_type": alert.alert_type,
+            "message": alert.message,
+            "status": alert.status,
+            "created_at": alert.created_at.isoformat(),
+        }
+
+    def get_alerts(self, election_id: int = None, status: str = None, alert_type: str = None) -> list:
         query = self.db.query(Alert)
         if election_id:
             query = query.filter(Alert.election_id == election_id)
         if status:
             query = query.filter(Alert.status == status)
+        if alert_type:
+            query = query.filter(Alert.alert_type == alert_type)
         alerts = query.all()
-        return [
-            {
-                "id": alert.id,
-                "election_id": alert.election_id,
-                "alert_type": alert.alert_type,
-                "message": alert.message,
-                "status": alert.status,
-                "created_at": alert.created_at.isoformat(),
-            }
-            for alert in alerts
-        ]
+        return [self.to_dict(alert) for alert in alerts]
+
+    def get_alerts_by_ids(self, alert_ids: list) -> list:
+        alerts = self.db.query(Alert).filter(Alert.id.in_(alert_ids)).order_by(Alert.id).all()
+        return [self.to_dict(alert) for alert in alerts]
     
     def create_alert(self, election_id: int, alert_type: str, message: str) -> dict:
         alert = Alert(
@@ -36,29 +44,19 @@ class AlertRepository:
             created_at=datetime.now(timezone.utc)
         )
         self.db.add(alert)
+        self.db.flush()
+        # Sent with the commit, so listeners never hear about an alert that was rolled back
+        alert_events.publish(self.db, self.to_dict(alert))
         self.db.commit()
         self.db.refresh(alert)
-        return {
-            "id": alert.id,
-            "election_id": alert.election_id,
-            "alert_type": alert.alert_type,
-            "message": alert.message,
-            "status": alert.status,
-            "created_at": alert.created_at.isoformat(),
-        }
+        return self.to_dict(alert)
     
     def update_alert(self, alert_id: int, status: str) -> dict:
         alert = self.db.query(Alert).filter(Alert.id == alert_id).first()
         if not alert:
             raise Exception("Alert not found")
         alert.status = status
+        alert_events.publish(self.db, self.to_dict(alert))
         self.db.commit()
         self.db.refresh(alert)
-        return {
-            "id": alert.id,
-            "election_id": alert.election_id,
-            "alert_type": alert.alert_type,
-            "message": alert.message,
-            "status": alert.status,
-            "created_at": alert.created_at.isoformat(),
-        }
\ No newline at end of file
+        return self.to_dict(alert)
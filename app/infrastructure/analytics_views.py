@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from sqlalchemy import BigInteger, Column, Integer, MetaData, String, Table, text
+from sqlalchemy.orm import Session
+
+from app.config import ANALYTICS_VIEW_REFRESH_AFTER_VOTES, ANALYTICS_VIEW_REFRESH_SECONDS
+from app.infrastructure.database import engine
+
+logger = logging.getLogger(__name__)
+
+# The views are created by an Alembic migration, not by Base.metadata.create_all,
+# so they are described on their own MetaData.
+analytics_metadata = MetaData()
+
+votes_by_candidate = Table(
+    "mv_votes_by_candidate", analytics_metadata,
+    Column("election_id", Integer),
+    Column("candidate_id", Integer),
+    Column("vote_count", BigInteger),
+)
+
+votes_by_region = Table(
+    "mv_votes_by_region_candidate", analytics_metadata,
+    Column("election_id", Integer),
+    Column("region", String),
+    Column("candidate_id", Integer),
+    Column("vote_count", BigInteger),
+)
+
+# Time-based patterns read the vote_rollup_* tables instead (see RollupRepository)
+VIEWS = [votes_by_candidate.name, votes_by_region.name]
+
+# How long a "do the views exist?" answer is trusted before asking the database again
+AVAILABILITY_CHECK_SECONDS = 60
+_availability = {"value": None, "checked_at": 0.0}
+
+def views_available(db: Session) -> bool:
+    now = time.monotonic()
+    if _availability["value"] is None or now - _availability["checked_at"] > AVAILABILITY_CHECK_SECONDS:
+        if db.get_bind().dialect.name != "postgresql":
+            available = False
+        else:
+            available = all(
+                db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+                for name in VIEWS
+            )
+        _availability.update(value=available, checked_at=now)
+    return _availability["value"]
+
+class AnalyticsViewRefresher:
+    """
+    Keeps the materialized analytics views reasonably fresh with
+    REFRESH MATERIALIZED VIEW CONCURRENTLY (readers are never blocked), either every
+    `interval_seconds` or once `refresh_after_votes` votes were recorded since the last refresh.
+    """
+    def __init__(self, interval_seconds: float = ANALYTICS_VIEW_REFRESH_SECONDS, refresh_after_votes: int = ANALYTICS_VIEW_REFRESH_AFTER_VOTES):
+        self.interval_seconds = interval_seconds
+        self.refresh_after_votes = refresh_after_votes
+        self.pending_votes = 0
+        self.last_refresh = None
+        self.last_duration_ms = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self) -> bool:
+        """Refreshes every view. Returns False if the views don't exist or a refresh is already running."""
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            with Session(engine) as db:
+                if not views_available(db):
+                    return False
+            start = time.perf_counter()
+            with self._lock:
+                self.pending_votes = 0
+            with engine.begin() as connection:
+                for name in VIEWS:
+                    connection.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+            self.last_duration_ms = round((time.perf_counter() - start) * 1000, 3)
+            self.last_refresh = time.time()
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def record_votes(self, count: int = 1):
+        """Called after votes are committed; starts a background refresh once enough have piled up."""
+        if self.refresh_after_votes <= 0:
+            return
+        with self._lock:
+            self.pending_votes += count
+            due = self.pending_votes >= self.refresh_after_votes
+        if due:
+            threading.Thread(target=self._refresh_quietly, daemon=True).start()
+
+    def _refresh_quietly(self):
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Analytics view refresh failed")
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            self._refresh_quietly()
+
+    def start(self):
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="analytics-view-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def status(self) -> dict:
+        return {
+            "views": VIEWS,
+            "available": _availability["value"],
+            "pending_votes": self.pending_votes,
+            "refresh_after_votes": self.refresh_after_votes,
+            "interval_seconds": self.interval_seconds,
+            "last_refresh": self.last_refresh,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+analytics_refresher = AnalyticsViewRefresher()
@@ -0,0 +1,346 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+import re
+import select
+import threading
+from datetime import timedelta
+from sqlalchemy import delete, event, func, insert, select as select_rows, text
+from sqlalchemy.orm import Session
+
+from app.config import BROKER_BACKEND, BROKER_REDIS_URL
+from app.infrastructure.database import engine
+from app.infrastructure.models import BrokerMessage
+
+logger = logging.getLogger(__name__)
+
+# Channel names go into LISTEN statements and Redis keys as they are
+CHANNEL_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Postgres refuses NOTIFY payloads of 8000 bytes or more
+NOTIFY_MAX_BYTES = 7999
+
+# Larger messages are stored in broker_messages and notified as "@<id>" (never valid JSON);
+# listeners have this long to read them
+BROKER_MESSAGE_RETENTION = timedelta(minutes=5)
+
+
+def check_channel(channel: str):
+    if not CHANNEL_NAME.match(channel):
+        raise ValueError(f"Invalid broker channel name: {channel}")
+
+
+class InProcessBroker:
+    """
+    Publish/subscribe between the parts of one process. Messages are dicts; subscribers are
+    callbacks taking (channel, message), called on the publishing thread.
+
+    The other brokers deliver every message, including their own process's, through the
+    backend, so subscribers in every worker receive it exactly once.
+    """
+    def __init__(self):
+        self._subscribers = {}  # channel -> [callback]
+        self._lock = threading.Lock()
+        self.stats = {"published": 0, "delivered": 0, "failed": 0}
+
+    def subscribe(self, channel: str, callback):
+        check_channel(channel)
+        with self._lock:
+            new_channel = channel not in self._subscribers
+            self._subscribers.setdefault(channel, []).append(callback)
+        if new_channel:
+            self._listen(channel)
+
+    def unsubscribe(self, channel: str, callback):
+        with self._lock:
+            callbacks = self._subscribers.get(channel, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+
+    def publish(self, channel: str, message: dict):
+        check_channel(channel)
+        self.stats["published"] += 1
+        self._dispatch(channel, message)
+
+    def publish_on_commit(self, db: Session, channel: str, message: dict):
+        """Publishes `message` once `db`'s transaction commits; nothing is published if it rolls back."""
+        check_channel(channel)
+        if "pending_broker_messages" not in db.info:
+            db.info["pending_broker_messages"] = []
+            event.listen(db, "after_commit", self._publish_pending)
+            event.listen(db, "after_rollback", self._forget_pending)
+        db.info["pending_broker_messages"].append((channel, message))
+
+    def _publish_pending(self, session: Session):
+        messages = session.info.get("pending_broker_messages", [])
+        session.info["pending_broker_messages"] = []
+        for channel, message in messages:
+            try:
+                self.publish(channel, message)
+            except Exception as e:
+                # The change itself is committed; clients see it on their next connect
+                logger.warning("Could not publish to %s: %s", channel, e)
+
+    def _forget_pending(self, session: Session):
+        session.info["pending_broker_messages"] = []
+
+    def _listen(self, channel: str):
+        """Starts receiving `channel` from the backend. Nothing to do in-process."""
+
+    def _dispatch(self, channel: str, message: dict):
+        with self._lock:
+            callbacks = list(self._subscribers.get(channel, []))
+        for callback in callbacks:
+            try:
+                callback(channel, message)
+                self.stats["delivered"] += 1
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning("Broker subscriber of %s failed: %s", channel, e)
+
+    def channels(self) -> list:
+        with self._lock:
+            return sorted(self._subscribers)
+
+    def start(self):
+        pass
+
+    def close(self):
+        pass
+
+    def status(self) -> dict:
+        return {"backend": "memory", "channels": self.channels(), **self.stats}
+
+
+class _ListenerThreadBroker(InProcessBroker, ABC):
+    """
+    A broker whose messages arrive on a background thread reading from the backend. The thread
+    is started once, by the application's startup hook; subscribing never waits for it, and
+    channels subscribed before it connects are listened on as soon as it does.
+    """
+    backend = None
+
+    def __init__(self, poll_seconds: float = 1.0):
+        super().__init__()
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._ready = threading.Event()  # Set while the listener is connected
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def publish(self, channel: str, message: dict):
+        check_channel(channel)
+        self._send(channel, json.dumps(message, separators=(",", ":")))
+        self.stats["published"] += 1
+
+    def _receive(self, channel, payload):
+        if isinstance(channel, bytes):
+            channel = channel.decode()
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring a malformed message on %s", channel)
+            return
+        self._dispatch(channel, message)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._connect()
+                self._ready.set()
+                while not self._stop.is_set():
+                    self._poll()
+            except Exception as e:
+                self._ready.clear()
+                logger.warning("%s broker lost its connection: %s", self.backend, e)
+                self._stop.wait(self.poll_seconds)
+            finally:
+                self._disconnect()
+
+    def start(self):
+        """Starts the listener thread and waits (up to 5 seconds) for it to connect."""
+        with self._thread_lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name=f"{self.backend}-broker", daemon=True)
+                self._thread.start()
+        self._ready.wait(timeout=5)
+
+    def close(self):
+        self._stop.set()
+        self._ready.clear()
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def status(self) -> dict:
+        return {"backend": self.backend, "connected": self._ready.is_set(), "channels": self.channels(), **self.stats}
+
+    @abstractmethod
+    def _send(self, channel: str, payload: str):
+        """Publishes a serialized message to the backend."""
+
+    @abstractmethod
+    def _connect(self):
+        """Connects the listener and subscribes it to every channel with subscribers."""
+
+    @abstractmethod
+    def _poll(self):
+        """Waits up to poll_seconds for messages and dispatches them."""
+
+    def _disconnect(self):
+        pass
+
+
+class PostgresBroker(_ListenerThreadBroker):
+    """
+    Messages travel as NOTIFY payloads (JSON, under 8000 bytes) on the primary database, so no
+    extra service is needed. One listener connection per process, outside the pool, LISTENs
+    on every channel that has subscribers.
+
+    publish_on_commit() sends the NOTIFY inside the session's own transaction, so Postgres
+    delivers it exactly when the change commits and never if it rolls back. A message too large
+    for NOTIFY is written to broker_messages in the same transaction, and only its id is notified.
+    """
+    backend = "postgres"
+
+    def __init__(self, database_engine, poll_seconds: float = 1.0):
+        super().__init__(poll_seconds)
+        self.engine = database_engine
+        self._connection = None
+        self._listener = None
+        self._listener_lock = threading.Lock()
+
+    def publish_on_commit(self, db: Session, channel: str, message: dict):
+        check_channel(channel)
+        self._notify(db, channel, json.dumps(message, separators=(",", ":")))
+        self.stats["published"] += 1
+
+    def _send(self, channel: str, payload: str):
+        with self.engine.begin() as connection:
+            self._notify(connection, channel, payload)
+
+    def _notify(self, connection, channel: str, payload: str):
+        """NOTIFY through `connection` (a Connection or Session), in its current transaction."""
+        if len(payload.encode("utf-8")) > NOTIFY_MAX_BYTES:
+            connection.execute(
+                delete(BrokerMessage).where(BrokerMessage.created_at < func.now() - BROKER_MESSAGE_RETENTION),
+                execution_options={"synchronize_session": False},
+            )
+            message_id = connection.execute(
+                insert(BrokerMessage).values(channel=channel, payload=payload).returning(BrokerMessage.id)
+            ).scalar_one()
+            payload = f"@{message_id}"
+        connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": channel, "payload": payload})
+
+    def _receive(self, channel, payload):
+        if payload.startswith("@"):
+            with self.engine.connect() as connection:
+                payload = connection.execute(
+                    select_rows(BrokerMessage.payload).where(BrokerMessage.id == int(payload[1:]))
+                ).scalar_one_or_none()
+            if payload is None:
+                logger.warning("A stored message on %s expired before it was read", channel)
+                return
+        super()._receive(channel, payload)
+
+    def _listen(self, channel: str):
+        with self._listener_lock:
+            if self._listener is not None:
+                self._listener.cursor().execute(f"LISTEN {channel}")
+
+    def _connect(self):
+        connection = self.engine.raw_connection()
+        # Detached, the pool forgets it (and its driver connection)
+        listener = connection.driver_connection
+        connection.detach()
+        listener.autocommit = True
+        with self._listener_lock:
+            self._connection, self._listener = connection, listener
+            for channel in self.channels():
+                listener.cursor().execute(f"LISTEN {channel}")
+
+    def _poll(self):
+        if select.select([self._listener], [], [], self.poll_seconds) == ([], [], []):
+            return
+        with self._listener_lock:
+            self._listener.poll()
+            notifies = list(self._listener.notifies)
+            self._listener.notifies.clear()
+        for notify in notifies:
+            self._receive(notify.channel, notify.payload)
+
+    def _disconnect(self):
+        with self._listener_lock:
+            connection, self._connection, self._listener = self._connection, None, None
+        if connection is not None:
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+
+class RedisBroker(_ListenerThreadBroker):
+    """
+    Messages travel through Redis PUBLISH/SUBSCRIBE, which also reaches workers on other hosts.
+    Takes any client with redis-py's publish()/pubsub() interface; by default a redis.Redis
+    for `url`, which needs the optional `redis` package.
+    """
+    backend = "redis"
+
+    def __init__(self, url: str = None, client=None, poll_seconds: float = 1.0):
+        super().__init__(poll_seconds)
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("The redis broker backend needs the redis package (pip install redis)") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self._pubsub = None
+        self._pubsub_lock = threading.Lock()
+
+    def _send(self, channel: str, payload: str):
+        self.client.publish(channel, payload)
+
+    def _listen(self, channel: str):
+        with self._pubsub_lock:
+            if self._pubsub is not None:
+                self._pubsub.subscribe(channel)
+
+    def _connect(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        with self._pubsub_lock:
+            channels = self.channels()
+            if channels:
+                pubsub.subscribe(*channels)
+            self._pubsub = pubsub
+
+    def _poll(self):
+        with self._pubsub_lock:
+            pubsub = self._pubsub
+        message = pubsub.get_message(timeout=self.poll_seconds)
+        if message is not None and message.get("type") == "message":
+            self._receive(message["channel"], message["data"])
+
+    def _disconnect(self):
+        with self._pubsub_lock:
+            pubsub, self._pubsub = self._pubsub, None
+        if pubsub is not None:
+            try:
+                pubsub.close()
+            except Exception:
+                pass
+
+
+def build_broker(backend: str, database_engine=None, redis_url: str = None):
+    if backend == "memory":
+        return InProcessBroker()
+    if backend == "postgres":
+        return PostgresBroker(database_engine)
+    if backend == "redis":
+        return RedisBroker(redis_url)
+    raise ValueError(f"Unknown broker backend: {backend}")
+
+broker = build_broker(BROKER_BACKEND, engine, BROKER_REDIS_URL)
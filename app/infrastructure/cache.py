@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class InMemoryCache:
+    """
+    Least-recently-used cache local to this process, with an expiry time per entry.
+    Values are bytes; keys are strings.
+    """
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(max_entries, 1)
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCache:
+    """
+    Cache shared by every application process, so an invalidation in one worker is seen
+    by all of them. Needs the optional `redis` package.
+    """
+    def __init__(self, url: str, namespace: str = "query_cache:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis query cache backend needs the redis package (pip install redis)") from e
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+
+    def get(self, key: str):
+        return self.client.get(self.namespace + key)
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.client.set(self.namespace + key, value, px=max(int(ttl * 1000), 1))
+
+    def delete(self, key: str):
+        self.client.delete(self.namespace + key)
+
+    def delete_prefix(self, prefix: str):
+        keys = list(self.client.scan_iter(match=self.namespace + prefix + "*", count=500))
+        if keys:
+            self.client.unlink(*keys)
+
+    def clear(self):
+        self.delete_prefix("")
+
+    def size(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=self.namespace + "*", count=500))
+
+
+def build_cache(backend: str, max_entries: int = 1024, redis_url: str = None):
+    if backend == "memory":
+        return InMemoryCache(max_entries)
+    if backend == "redis":
+        return RedisCache(redis_url)
+    raise ValueError(f"Unknown query cache backend: {backend}")
@@ -1,3 +1,4 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app.infrastructure.models import Candidate
@@ -9,7 +10,12 @@ class CandidateRepository:
     def create_candidate(self, name: str, party: str, bio: str, election_id: int):
         candidate = Candidate(name=name, party=party, bio=bio, election_id=election_id)
         self.db.add(candidate)
-        self.db.commit()
+        try:
+            self.db.commit()
+        except IntegrityError as e:
+            # uq_candidates_election_name: a second row would split the candidate's tally
+            self.db.rollback()
+            raise ValueError(f"Candidate {name} is already standing in election {election_id}") from e
         self.db.refresh(candidate)
         return candidate
     
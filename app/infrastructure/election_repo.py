@@ -2,6 +2,8 @@ import math
 from sqlalchemy import func
 from sqlalchemy.orm import Session
 from app.infrastructure.models import Election, Vote, Voter
+from app.infrastructure.rollup_repo import RollupRepository
+from app.infrastructure.tally_repo import TallyRepository
 
 class ElectionRepository:
     def __init__(self, db: Session):
@@ -13,8 +15,12 @@ class ElectionRepository:
         self.db.refresh(election)
         return election
 
-    def get_election_by_id(self, election_id: int):
-        return self.db.query(Election).filter(Election.id == election_id).first()
+    def get_election_by_id(self, election_id: int, for_update: bool = False):
+        query = self.db.query(Election).filter(Election.id == election_id)
+        if for_update:
+            # Waits for votes in flight, which hold the row FOR SHARE (see VoteRepository)
+            query = query.with_for_update()
+        return query.first()
     
     def get_all_elections(self):
         return self.db.query(Election).all()
@@ -29,12 +35,9 @@ class ElectionRepository:
         if not election:
             raise ValueError(f"Election with ID {election_id} not found.")
 
-        # Parse candidates and votes
-        candidates = election.candidates.split(",")
-        votes = list(map(int, election.votes.split(",")))
-
         # Pair candidates with their respective vote counts
-        return [{"candidate_name": candidates[i], "votes": votes[i]} for i in range(len(candidates))]
+        tallies = TallyRepository(self.db).get_results(election_id)
+        return [{"candidate_name": candidate, "votes": votes} for candidate, votes in tallies]
 
     def get_election_results(self, election_id: int):
         """Retrieve election results."""
@@ -42,9 +45,8 @@ class ElectionRepository:
         if not election:
             return None
 
-        candidates = election.candidates.split(",")
-        votes = list(map(int, election.votes.split(",")))
-        total_votes = sum(votes)
+        tallies = TallyRepository(self.db).get_results(election_id)
+        total_votes = sum(votes for _, votes in tallies)
 
         results = [
             {
@@ -52,16 +54,16 @@ class ElectionRepository:
                 "votes": vote,
                 "percentage": math.floor(vote / total_votes * 100) if total_votes > 0 else 0
             }
-            for candidate, vote in zip(candidates, votes)
+            for candidate, vote in tallies
         ]
 
         return {"election_id": election.id, "results": results}
     
     def predict_turnout(self, election_id: int):
     # Retrieve past election voter turnout from actual votes
-        turnout_data = self.db.query(Election.id, func.count(Vote.voter_id).label("voter_count")) \
-                            .join(Vote, Vote.election_id == Election.id) \
-                            .group_by(Election.id) \
+        vote_counts = RollupRepository(self.db).vote_counts()
+        turnout_data = self.db.query(Election.id, vote_counts.c.vote_count.label("voter_count")) \
+                            .join(vote_counts, vote_counts.c.election_id == Election.id) \
                             .order_by(Election.id).all()
 
         # Ensure we only predict turnout when past data exists
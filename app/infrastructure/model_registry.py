@@ -0,0 +1,210 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import (
+    FORECAST_MODEL_DIR, FORECAST_MODEL_MAX_FILES, FORECAST_MODEL_MAX_LOADED, FORECAST_MODEL_SIGNING_KEY,
+)
+from app.utils.lazy_imports import lazy_import
+
+logger = logging.getLogger(__name__)
+
+keras_models = lazy_import("keras.models")
+
+def series_fingerprint(dates: list, counts: list) -> str:
+    """Identifies the exact data a model was fitted on."""
+    payload = json.dumps([[str(date), float(count)] for date, count in zip(dates, counts)])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+def file_signature(path: str) -> str:
+    """HMAC of a model file's bytes, recorded when it is written and checked before it is loaded."""
+    signature = hmac.new(FORECAST_MODEL_SIGNING_KEY.encode("utf-8"), digestmod=hashlib.sha256)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            signature.update(chunk)
+    return signature.hexdigest()
+
+def _save_pickle(model, path):
+    with open(path, "wb") as f:
+        pickle.dump(model, f)
+
+def _load_pickle(path):
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+def _save_keras(model, path):
+    model.save(path)
+
+def _load_keras(path):
+    return keras_models.load_model(path)
+
+# format -> (save, load, file extension)
+FORMATS = {
+    "pickle": (_save_pickle, _load_pickle, ".pkl"),
+    "keras": (_save_keras, _load_keras, ".keras"),
+}
+
+
+class ForecastModelRegistry:
+    """
+    Fitted forecast models, keyed by (kind, user_id, alert_type, data fingerprint).
+
+    Models are written to local disk so every worker on the host (and the next restart) can
+    reuse them, next to a small JSON file describing the data they were fitted on. The most
+    recently used FORECAST_MODEL_MAX_LOADED models stay loaded in memory; on disk, the least
+    recently used files beyond FORECAST_MODEL_MAX_FILES are deleted.
+
+    Loading a pickle runs code, so the directory is kept private to the service's user and a
+    file is only loaded if that user owns it and it matches the signature in its JSON file.
+
+    `latest()` returns the newest fit of a series whatever its fingerprint, so a handler can
+    bring a model up to date with new days instead of fitting from scratch.
+    """
+    def __init__(self, directory: str = FORECAST_MODEL_DIR, max_files: int = FORECAST_MODEL_MAX_FILES,
+                 max_loaded: int = FORECAST_MODEL_MAX_LOADED):
+        self.directory = os.path.abspath(directory)
+        self.max_files = max(max_files, 1)
+        self.max_loaded = max(max_loaded, 1)
+        self._loaded = OrderedDict()  # path -> model
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def _series_dir(self, kind: str, user_id: int, alert_type: str) -> str:
+        safe_alert_type = re.sub(r"[^A-Za-z0-9_-]", "_", alert_type)
+        return os.path.join(self.directory, kind, str(user_id), safe_alert_type)
+
+    def _load(self, path: str, format: str):
+        with self._lock:
+            if path in self._loaded:
+                self._loaded.move_to_end(path)
+                return self._loaded[path]
+        self._verify(path)
+        model = FORMATS[format][1](path)
+        self._remember(path, model)
+        return model
+
+    def _verify(self, path: str):
+        if hasattr(os, "getuid") and os.stat(path).st_uid != os.getuid():
+            raise ValueError("file is not owned by this service's user")
+        try:
+            with open(os.path.splitext(path)[0] + ".json") as f:
+                signature = json.load(f).get("signature")
+        except (OSError, ValueError):
+            signature = None
+        if not signature or not hmac.compare_digest(signature, file_signature(path)):
+            raise ValueError("file does not match its recorded signature")
+
+    def _make_private(self, directory: str):
+        """Creates directory, and every level of it below the registry root, as mode 0700."""
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        while True:
+            os.chmod(directory, 0o700)
+            if directory == self.directory or os.path.dirname(directory) == directory:
+                break
+            directory = os.path.dirname(directory)
+
+    def _remember(self, path: str, model):
+        with self._lock:
+            self._loaded[path] = model
+            self._loaded.move_to_end(path)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+
+    def get(self, kind: str, user_id: int, alert_type: str, fingerprint: str, format: str = "pickle"):
+        """The model fitted on exactly this data, or None."""
+        path = os.path.join(self._series_dir(kind, user_id, alert_type), fingerprint + FORMATS[format][2])
+        if not os.path.exists(path):
+            self.stats["misses"] += 1
+            return None
+        try:
+            model = self._load(path, format)
+        except Exception as e:
+            # A half-written, incompatible or untrusted file is refitted rather than served
+            logger.warning("Could not load forecast model %s: %s", path, e)
+            self.stats["misses"] += 1
+            return None
+        try:
+            os.utime(path)  # LRU order on disk is the file's modification time
+        except FileNotFoundError:
+            pass  # Evicted by another worker since; the loaded model is still good
+        self.stats["hits"] += 1
+        return model
+
+    def latest(self, kind: str, user_id: int, alert_type: str, format: str = "pickle"):
+        """(model, meta) of the most recent fit of this series, or None."""
+        directory = self._series_dir(kind, user_id, alert_type)
+        if not os.path.isdir(directory):
+            return None
+        newest = None
+        for name in os.listdir(directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, name)) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if newest is None or meta["fitted_at"] > newest["fitted_at"]:
+                newest = meta
+        if newest is None:
+            return None
+        model = self.get(kind, user_id, alert_type, newest["fingerprint"], format)
+        return (model, newest) if model is not None else None
+
+    def put(self, kind: str, user_id: int, alert_type: str, fingerprint: str, model, meta: dict = None,
+            format: str = "pickle"):
+        save, _, extension = FORMATS[format]
+        directory = self._series_dir(kind, user_id, alert_type)
+        path = os.path.join(directory, fingerprint + extension)
+        self._remember(path, model)
+        try:
+            self._make_private(directory)
+            # Written under a temporary name and renamed, so other workers never load half a file
+            temporary = os.path.join(directory, f".{fingerprint}.{os.getpid()}.{threading.get_ident()}{extension}")
+            save(model, temporary)
+            signature = file_signature(temporary)
+            os.replace(temporary, path)
+            with open(os.path.join(directory, fingerprint + ".json"), "w") as f:
+                json.dump({**(meta or {}), "fingerprint": fingerprint, "fitted_at": time.time(),
+                           "signature": signature}, f)
+        except OSError as e:
+            # Still served from memory by this process; other workers refit it
+            logger.warning("Could not store forecast model %s: %s", path, e)
+            return
+        self.stats["stored"] += 1
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json") and not name.startswith("."):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        continue
+        files.sort()
+        for _, path in files[:max(len(files) - self.max_files, 0)]:
+            for stale in (path, os.path.splitext(path)[0] + ".json"):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            with self._lock:
+                self._loaded.pop(path, None)
+            self.stats["evicted"] += 1
+
+    def status(self) -> dict:
+        with self._lock:
+            loaded = len(self._loaded)
+        return {"directory": self.directory, "loaded": loaded, **self.stats}
+
+forecast_models = ForecastModelRegistry()
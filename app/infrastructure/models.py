@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import List
 from pydantic import BaseModel, EmailStr
-from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey, Table, Enum
+from sqlalchemy import DDL, JSON, Column, DateTime, Float, Index, Integer, String, Boolean, ForeignKey, Table, Enum, Text, UniqueConstraint, event, func
 from sqlalchemy.orm import relationship
 from app.infrastructure.database import Base
 import enum
@@ -14,9 +14,7 @@ class Election(Base):
     __tablename__ = "elections"
     id = Column(Integer, primary_key=True)
     name = Column(String)
-    candidates = Column(String)
-    votes = Column(String)
-    status = Column(Enum(ElectionStatus), default=ElectionStatus.ACTIVE)  # Comma-separated votes count (e.g., "0,2,5")
+    status = Column(Enum(ElectionStatus), default=ElectionStatus.ACTIVE)
 
     polling_stations = relationship("PollingStation", back_populates="election")
     audit_logs = relationship("AuditLog", back_populates="election")
@@ -25,16 +23,25 @@ class Election(Base):
     vote = relationship("Vote", back_populates="election")
     observer_feedback = relationship("ObserverFeedback", back_populates="election")
     alerts = relationship("Alert", back_populates="election")
+    tallies = relationship("ElectionTally", back_populates="election")
 
-    def increment_vote(self, candidate_name: str):
-        candidate_list = self.candidates.split(",")
-        vote_counts = list(map(int, self.votes.split(",")))
-        try:
-            index = candidate_list.index(candidate_name)
-            vote_counts[index] += 1
-            self.votes = ",".join(map(str, vote_counts))
-        except ValueError:
-            raise ValueError("Candidate not found")
+
+class ElectionTally(Base):
+    """
+    Running vote count for one candidate in one election.
+    Rows are only ever changed with `count = count + 1` style updates (see TallyRepository),
+    so concurrent votes never overwrite each other. With VOTE_COUNTER_SHARDS > 1 a candidate's
+    count is spread over several `shard` rows and summed when read.
+    """
+    __tablename__ = "election_tallies"
+
+    election_id = Column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0, server_default="0")
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    election = relationship("Election", back_populates="tallies")
+    candidate = relationship("Candidate")
 
 
 class ElectionResponse(BaseModel):
@@ -105,6 +112,8 @@ class Observer(Base):
 
 class Candidate(Base):
     __tablename__ = "candidates"
+    # Votes and tallies are keyed by candidate row, so a name appears once per election
+    __table_args__ = (UniqueConstraint("election_id", "name", name="uq_candidates_election_name"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False)
@@ -116,12 +125,22 @@ class Candidate(Base):
 
 class Vote(Base):
     __tablename__ = "votes"
+    # Analytics filter by election and then group by candidate, time or region
+    __table_args__ = (
+        Index("ix_votes_election_candidate", "election_id", "candidate_id"),
+        Index("ix_votes_election_timestamp", "election_id", "timestamp"),
+        Index("ix_votes_election_region", "election_id", "region"),
+        # One partition per election (see VotePartitionRepository); election_id is
+        # therefore part of the primary key.
+        {"postgresql_partition_by": "LIST (election_id)"},
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     voter_id = Column(Integer, ForeignKey("voters.id"), nullable=False)  # Linked to Voter
     candidate_id = Column(Integer, ForeignKey("candidates.id"), nullable=False)
-    election_id = Column(Integer, ForeignKey("elections.id"), nullable=False)
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc), nullable=False)
+    election_id = Column(Integer, ForeignKey("elections.id"), primary_key=True, autoincrement=False)
+    # Taken per vote, as naive UTC: the column has no time zone and asyncpg (POST /votes) refuses aware values
+    timestamp = Column(DateTime, default=lambda: datetime.now(timezone.utc).replace(tzinfo=None), nullable=False)
     region = Column(String, nullable=True)  # Existing optional region field
 
     # New optional field to link to a polling station.
@@ -132,8 +151,60 @@ class Vote(Base):
     election = relationship("Election", back_populates="vote")
     polling_station = relationship("PollingStation", back_populates="votes")
 
+# Rows for elections without their own partition land here
+event.listen(
+    Vote.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS votes_default PARTITION OF votes DEFAULT").execute_if(dialect="postgresql"),
+)
+
+class VoteRollupHourly(Base):
+    """
+    Vote counts per hour, kept up to date in the same transaction as the votes
+    (see RollupRepository). Votes without a region or polling station are counted
+    under region '' and polling_station_id 0, since key columns can't be NULL.
+    """
+    __tablename__ = "vote_rollup_hourly"
+
+    election_id = Column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+    region = Column(String, primary_key=True, default="", server_default="")
+    polling_station_id = Column(Integer, primary_key=True, default=0, server_default="0")
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Earliest and latest vote in the bucket, for first-vote dates and vote intervals
+    first_vote_at = Column(DateTime, nullable=False)
+    last_vote_at = Column(DateTime, nullable=False)
+
+class VoteRollupDaily(Base):
+    """Same as VoteRollupHourly, one bucket per day."""
+    __tablename__ = "vote_rollup_daily"
+
+    election_id = Column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    candidate_id = Column(Integer, ForeignKey("candidates.id", ondelete="CASCADE"), primary_key=True)
+    region = Column(String, primary_key=True, default="", server_default="")
+    polling_station_id = Column(Integer, primary_key=True, default=0, server_default="0")
+    count = Column(Integer, nullable=False, default=0, server_default="0")
+
+class ElectionSnapshot(Base):
+    """
+    Results and analytics of a completed election, computed once when it ends (see
+    SnapshotRepository). A completed election takes no more votes, so the snapshot never
+    changes. `sections` maps a section name to its data and `etags` to the ETag of its body.
+    """
+    __tablename__ = "election_snapshots"
+
+    election_id = Column(Integer, ForeignKey("elections.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime, nullable=False)
+    sections = Column(JSON, nullable=False)
+    etags = Column(JSON, nullable=False)
+
 class ObserverFeedback(Base):
     __tablename__ = "observer_feedback"
+    __table_args__ = (
+        Index("ix_observer_feedback_election_timestamp", "election_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     observer_id = Column(Integer, ForeignKey("observers.id"), nullable=False)
@@ -141,6 +212,9 @@ class ObserverFeedback(Base):
     description = Column(String, nullable=False)
     severity = Column(String, nullable=False)  # e.g., "LOW", "MEDIUM", "HIGH"
     timestamp = Column(DateTime, default=datetime.now(timezone.utc), nullable=False)
+    # Scored from the description when the feedback is written (see app/infrastructure/sentiment.py)
+    sentiment_score = Column(Float, nullable=True)
+    sentiment_category = Column(String, nullable=True)  # "Positive", "Neutral" or "Negative"
 
     observer = relationship("Observer", back_populates="feedback")
     election = relationship("Election", back_populates="observer_feedback")
@@ -161,6 +235,9 @@ class Alert(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_read_created", "user_id", "is_read", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     alert_id = Column(Integer, ForeignKey("alerts.id"), nullable=False)
@@ -189,6 +266,9 @@ class NotificationSubscription(Base):
 
 class SubscriptionEvent(Base):
     __tablename__ = "subscription_events"
+    __table_args__ = (
+        Index("ix_subscription_events_user_type_created", "user_id", "alert_type", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
@@ -197,6 +277,18 @@ class SubscriptionEvent(Base):
     new_value = Column(Boolean, nullable=False)
     created_at = Column(DateTime, default=datetime.now(timezone.utc), nullable=False)
     
+class BrokerMessage(Base):
+    """
+    A broker message too large for a NOTIFY payload. The NOTIFY carries only its id and every
+    listener reads the message from here (see PostgresBroker). Rows are deleted after a few minutes.
+    """
+    __tablename__ = "broker_messages"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    channel = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
 class VoterData(BaseModel):
     name: str
     email: str
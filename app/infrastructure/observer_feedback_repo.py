@@ -6,7 +6,8 @@ from typing import List, Optional
 from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from app.infrastructure.models import ObserverFeedback
-from textblob import TextBlob
+from app.infrastructure.sentiment import apply_sentiment, apply_sentiment_batch, sentiment_category
+from app.infrastructure.sentiment_engine import sentiment_engine
 
 class ObserverFeedbackRepository:
     def __init__(self, db: Session):
@@ -19,6 +20,8 @@ class ObserverFeedbackRepository:
             description=description,
             severity=severity
         )
+        # Scored once here; the sentiment reads aggregate the stored score
+        apply_sentiment(feedback)
         self.db.add(feedback)
         self.db.commit()
         self.db.refresh(feedback)
@@ -83,50 +86,65 @@ class ObserverFeedbackRepository:
 
         return patterns
     
-    def analyze_sentiment(self):
-        feedbacks = self.db.query(ObserverFeedback.id, ObserverFeedback.description).all()
-
-        sentiments = []
-        for feedback in feedbacks:
-            sentiment_score = TextBlob(feedback.description).sentiment.polarity
-            sentiment_category = "Positive" if sentiment_score > 0.2 else "Neutral" if -0.2 <= sentiment_score <= 0.2 else "Negative"
-
-            sentiments.append({
-                "feedback_id": feedback.id,
-                "description": feedback.description,
-                "sentiment": sentiment_category,
-                "score": round(sentiment_score, 2)
-            })
+    SENTIMENT_COLUMNS = (
+        ObserverFeedback.id,
+        ObserverFeedback.description,
+        ObserverFeedback.sentiment_score,
+        ObserverFeedback.sentiment_category,
+    )
 
-        return sentiments
+    def analyze_sentiment(self):
+        return self._sentiments(self.db.query(*self.SENTIMENT_COLUMNS).all())
     
     def get_sentiment_by_election(self, election_id: int):
     # Retrieve only observer feedback associated with the specified election.
         feedbacks = (
-            self.db.query(ObserverFeedback.id, ObserverFeedback.description)
+            self.db.query(*self.SENTIMENT_COLUMNS)
             .filter(ObserverFeedback.election_id == election_id)
             .all()
         )
+        return self._sentiments(feedbacks)
+
+    def _sentiments(self, feedbacks) -> list:
+        # Rows written before scores were stored and not backfilled yet are scored in one batch
+        unscored = [feedback.description for feedback in feedbacks if feedback.sentiment_score is None]
+        computed = iter(sentiment_engine.score_batch(unscored)) if unscored else iter(())
 
         sentiments = []
         for feedback in feedbacks:
-            sentiment_score = TextBlob(feedback.description).sentiment.polarity
-            # Assign sentiment category based on score thresholds.
-            if sentiment_score > 0.2:
-                sentiment_category = "Positive"
-            elif -0.2 <= sentiment_score <= 0.2:
-                sentiment_category = "Neutral"
-            else:
-                sentiment_category = "Negative"
+            sentiment_score, category = feedback.sentiment_score, feedback.sentiment_category
+            if sentiment_score is None:
+                sentiment_score = next(computed)
+                category = sentiment_category(sentiment_score)
 
             sentiments.append({
                 "feedback_id": feedback.id,
                 "description": feedback.description,
-                "sentiment": sentiment_category,
+                "sentiment": category,
                 "score": round(sentiment_score, 2)
             })
 
         return sentiments
+
+    def backfill_sentiment(self, batch_size: int = 500) -> int:
+        """
+        Scores feedback saved before sentiment was stored, committing every `batch_size`
+        rows so a long backfill doesn't hold one big transaction. Returns the rows scored.
+        """
+        scored = 0
+        while True:
+            batch = (
+                self.db.query(ObserverFeedback)
+                .filter(ObserverFeedback.sentiment_score.is_(None))
+                .order_by(ObserverFeedback.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                return scored
+            apply_sentiment_batch(batch)
+            self.db.commit()
+            scored += len(batch)
     
     def export_observer_feedback(self, export_format: str = "json"):
         feedbacks = self.db.query(ObserverFeedback).all()
@@ -0,0 +1,108 @@
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+
+class PoolMetrics:
+    """
+    Counters and a checkout wait-time histogram for one connection pool.
+    Connect/checkout/checkin/invalidate counts are fed by SQLAlchemy pool events;
+    wait times and timeouts are recorded by the instrumented pool classes below.
+    """
+
+    # Upper bounds (in milliseconds) of the wait-time histogram buckets.
+    WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        # One extra slot for waits above the last bucket.
+        self.wait_buckets = [0] * (len(self.WAIT_BUCKETS_MS) + 1)
+
+    def record_wait(self, seconds: float):
+        ms = seconds * 1000
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total_ms += ms
+            self.wait_max_ms = max(self.wait_max_ms, ms)
+            self.wait_buckets[bisect_left(self.WAIT_BUCKETS_MS, ms)] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def _increment(self, counter: str):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def attach(self, engine):
+        """Registers the pool event listeners on a (sync) engine."""
+        event.listen(engine, "connect", lambda *args: self._increment("connects"))
+        event.listen(engine, "checkout", lambda *args: self._increment("checkouts"))
+        event.listen(engine, "checkin", lambda *args: self._increment("checkins"))
+        event.listen(engine, "invalidate", lambda *args: self._increment("invalidations"))
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            histogram = {
+                f"le_{bound}ms": count
+                for bound, count in zip(self.WAIT_BUCKETS_MS, self.wait_buckets)
+            }
+            histogram[f"gt_{self.WAIT_BUCKETS_MS[-1]}ms"] = self.wait_buckets[-1]
+            return {
+                "name": self.name,
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # QueuePool reports overflow relative to pool_size, so it is
+                # negative until the pool has opened all of its base connections.
+                "overflow_in_use": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "timeout_seconds": pool.timeout(),
+                "totals": {
+                    "connects": self.connects,
+                    "checkouts": self.checkouts,
+                    "checkins": self.checkins,
+                    "invalidations": self.invalidations,
+                    "timeouts": self.timeouts,
+                },
+                "wait_ms": {
+                    "count": self.wait_count,
+                    "avg": round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else None,
+                    "max": round(self.wait_max_ms, 3),
+                    "histogram": histogram,
+                },
+            }
+
+
+class _InstrumentedPoolMixin:
+    # Set on the per-engine subclass created by instrumented_pool_class, so the
+    # metrics survive Pool.recreate() (which instantiates self.__class__).
+    metrics: PoolMetrics = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        finally:
+            self.metrics.record_wait(time.perf_counter() - start)
+
+
+def instrumented_pool_class(metrics: PoolMetrics, is_async: bool = False):
+    """Returns a QueuePool subclass that records checkout waits into `metrics`."""
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return type(f"Instrumented{base.__name__}", (_InstrumentedPoolMixin, base), {"metrics": metrics})
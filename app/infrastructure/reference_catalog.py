@@ -0,0 +1,213 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+from app.config import DATA_VERSION_BACKEND, DATA_VERSION_REDIS_URL, REFERENCE_CATALOG_MAX_AGE_SECONDS
+from app.infrastructure.database import SessionLocal
+from app.infrastructure.models import Candidate, Election, PollingStation
+from app.infrastructure.replica_routing import primary_only
+from app.infrastructure.version_store import build_version_store
+
+VERSION_KEY = "reference_data"
+
+
+@dataclass(frozen=True)
+class ElectionRef:
+    id: int
+    name: str
+    status: str
+
+    @classmethod
+    def from_model(cls, election: Election):
+        return cls(id=election.id, name=election.name, status=election.status)
+
+
+@dataclass(frozen=True)
+class CandidateRef:
+    id: int
+    name: str
+    party: str
+    bio: str
+    election_id: int
+
+    @classmethod
+    def from_model(cls, candidate: Candidate):
+        return cls(id=candidate.id, name=candidate.name, party=candidate.party, bio=candidate.bio,
+                   election_id=candidate.election_id)
+
+
+@dataclass(frozen=True)
+class StationRef:
+    id: int
+    name: str
+    location: str
+    election_id: int
+    capacity: int
+
+    @classmethod
+    def from_model(cls, station: PollingStation):
+        return cls(id=station.id, name=station.name, location=station.location,
+                   election_id=station.election_id, capacity=station.capacity)
+
+
+@dataclass
+class _Tables:
+    version: int
+    loaded_at: float
+    elections: dict = field(default_factory=dict)   # election id -> ElectionRef
+    candidates: dict = field(default_factory=dict)   # election id -> [CandidateRef] in ballot (id) order
+    stations: dict = field(default_factory=dict)     # station id -> StationRef
+
+
+class ReferenceCatalog:
+    """
+    Elections, candidates and polling stations, loaded whole into process memory so hot
+    paths resolve them with a dict lookup instead of a query.
+
+    The catalog carries a version kept in the data version store. Commands that create,
+    update or delete any of these rows set `changes_reference_data = True`; the CommandBus
+    then bumps the version and every process reloads the tables on its next lookup. The version
+    store may be per process ("memory" backend), so the change is also announced on the broker
+    (see ElectionVersions) and `follow()` clears every other worker's catalog when it arrives.
+    Only with both the memory store and the memory broker do other workers wait for
+    REFERENCE_CATALOG_MAX_AGE_SECONDS.
+
+    An id the catalog doesn't know (e.g. a row written outside the CommandBus) is looked up in
+    the database instead, and the catalog is reloaded on the next lookup.
+    """
+    def __init__(self, store, max_age: float = REFERENCE_CATALOG_MAX_AGE_SECONDS):
+        self.store = store
+        self.max_age = max_age
+        self._tables = None
+        self._lock = threading.Lock()
+        self._following = False
+        self.stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+    def _is_current(self, tables, version) -> bool:
+        return (
+            tables is not None
+            and tables.version == version
+            and time.monotonic() - tables.loaded_at < self.max_age
+        )
+
+    def _current(self, db=None) -> _Tables:
+        version = self.store.get(VERSION_KEY)
+        tables = self._tables
+        if self._is_current(tables, version):
+            return tables
+        with self._lock:
+            tables = self._tables
+            if not self._is_current(tables, version):
+                tables = self._load(version, db)
+                self._tables = tables
+        return tables
+
+    def _load(self, version: int, db=None) -> _Tables:
+        # The caller's session is reused when there is one (on the async path it is the only
+        # kind of session that doesn't block the event loop)
+        if db is None:
+            with SessionLocal() as session:
+                return self._load(version, session)
+
+        tables = _Tables(version=version, loaded_at=time.monotonic())
+        with primary_only():
+            for election in db.query(Election).order_by(Election.id):
+                tables.elections[election.id] = ElectionRef.from_model(election)
+                tables.candidates[election.id] = []
+            for candidate in db.query(Candidate).order_by(Candidate.id):
+                tables.candidates.setdefault(candidate.election_id, []).append(CandidateRef.from_model(candidate))
+            for station in db.query(PollingStation).order_by(PollingStation.id):
+                tables.stations[station.id] = StationRef.from_model(station)
+        self.stats["reloads"] += 1
+        return tables
+
+    def _missed(self):
+        self.stats["misses"] += 1
+        # Something was written behind the catalog's back; start over on the next lookup
+        self._tables = None
+
+    def elections(self, db=None) -> list:
+        return list(self._current(db).elections.values())
+
+    def election(self, election_id: int, db=None):
+        """The election as an ElectionRef, or None."""
+        election = self._current(db).elections.get(election_id)
+        if election is not None:
+            self.stats["hits"] += 1
+            return election
+        if db is None:
+            return None
+        election = db.query(Election).filter(Election.id == election_id).first()
+        if election is None:
+            return None
+        self._missed()
+        return ElectionRef.from_model(election)
+
+    def candidates(self, election_id: int, db=None) -> list:
+        """The election's candidates in ballot order."""
+        self.stats["hits"] += 1
+        return list(self._current(db).candidates.get(election_id, []))
+
+    def candidate_id(self, election_id: int, name: str, db=None):
+        for candidate in self._current(db).candidates.get(election_id, []):
+            if candidate.name == name:
+                self.stats["hits"] += 1
+                return candidate.id
+        if db is None:
+            return None
+        candidate_id = (
+            db.query(Candidate.id)
+            .filter(Candidate.election_id == election_id, Candidate.name == name)
+            .order_by(Candidate.id)
+            .scalar()
+        )
+        if candidate_id is not None:
+            self._missed()
+        return candidate_id
+
+    def stations(self, station_ids, db=None) -> dict:
+        """{station_id: StationRef} for the requested ids that exist."""
+        known = self._current(db).stations
+        found = {station_id: known[station_id] for station_id in station_ids if station_id in known}
+        missing = [station_id for station_id in station_ids if station_id not in known]
+        self.stats["hits"] += len(found)
+        if missing and db is not None:
+            rows = db.query(PollingStation).filter(PollingStation.id.in_(missing)).all()
+            if rows:
+                self._missed()
+            found.update((station.id, StationRef.from_model(station)) for station in rows)
+        return found
+
+    def bump(self):
+        self.store.bump(VERSION_KEY)
+
+    def bump_for(self, command):
+        if getattr(command, "changes_reference_data", False):
+            self.bump()
+
+    def clear(self):
+        self._tables = None
+
+    def follow(self, broker, channel: str):
+        """Clears the catalog whenever a change of reference data is announced on `channel`."""
+        if self._following:
+            return
+        self._following = True
+        broker.subscribe(channel, self._on_announcement)
+
+    def _on_announcement(self, _channel: str, message: dict):
+        if message.get("reference_data"):
+            self.clear()
+
+    def status(self) -> dict:
+        tables = self._tables
+        return {
+            "loaded": tables is not None,
+            "version": tables.version if tables else None,
+            "elections": len(tables.elections) if tables else 0,
+            "candidates": sum(len(candidates) for candidates in tables.candidates.values()) if tables else 0,
+            "polling_stations": len(tables.stations) if tables else 0,
+            **self.stats,
+        }
+
+reference_catalog = ReferenceCatalog(build_version_store(DATA_VERSION_BACKEND, DATA_VERSION_REDIS_URL))
@@ -0,0 +1,122 @@
+import itertools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import Delete, Insert, Update, event
+from sqlalchemy.orm import Session
+
+# Which engine reads should use for the current unit of work:
+#   None      -> nobody decided, use the primary
+#   "replica" -> set by the QueryBus, reads may go to a replica
+#   "primary" -> set by the CommandBus or a read-your-writes window, stick to the primary
+_db_role: ContextVar = ContextVar("db_role", default=None)
+
+# Per-request marker the CommandBus flips when it runs a command, so the
+# read-your-writes middleware knows to pin the client to the primary.
+_request_writes: ContextVar = ContextVar("request_writes", default=None)
+
+
+@contextmanager
+def replica_reads():
+    """Lets reads go to a replica, unless an outer scope already pinned the primary."""
+    if _db_role.get() is not None:
+        yield
+        return
+    token = _db_role.set("replica")
+    try:
+        yield
+    finally:
+        _db_role.reset(token)
+
+
+@contextmanager
+def primary_only():
+    """Forces every statement in this scope onto the primary."""
+    token = _db_role.set("primary")
+    try:
+        yield
+    finally:
+        _db_role.reset(token)
+
+
+@contextmanager
+def track_request_writes():
+    """Collects whether any command ran while handling the current request."""
+    state = {"wrote": False}
+    token = _request_writes.set(state)
+    try:
+        yield state
+    finally:
+        _request_writes.reset(token)
+
+
+def reads_pinned_to_primary() -> bool:
+    """True inside a command or a read-your-writes window."""
+    return _db_role.get() == "primary"
+
+
+def mark_write():
+    state = _request_writes.get()
+    if state is not None:
+        state["wrote"] = True
+
+
+class ReplicaRouter:
+    """
+    Chooses the engine for a statement: the primary, or one of the read replicas. A session
+    reads from the same replica until it is closed, so all of its queries see one replica's
+    state even when the replicas lag by different amounts.
+    """
+
+    def __init__(self, primary, replicas=None, strategy: str = "round_robin"):
+        if strategy not in ("round_robin", "least_connections"):
+            raise ValueError(f"Unknown replica routing strategy: {strategy}")
+        self.primary = primary
+        self.replicas = list(replicas or [])
+        self.strategy = strategy
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def choose_replica(self):
+        if self.strategy == "least_connections":
+            return min(self.replicas, key=lambda replica: replica.pool.checkedout())
+        with self._lock:
+            index = next(self._counter)
+        return self.replicas[index % len(self.replicas)]
+
+    def get_bind(self, session: Session, clause=None):
+        if (
+            not self.replicas
+            or _db_role.get() != "replica"
+            or session.info.get("wrote")
+            or session.new
+            or session.dirty
+            or session.deleted
+            or isinstance(clause, (Insert, Update, Delete))
+        ):
+            return self.primary
+        replica = session.info.get("replica")
+        if replica is None:
+            replica = session.info["replica"] = self.choose_replica()
+        return replica
+
+
+def routing_session_class(router: ReplicaRouter):
+    """Returns a Session subclass whose statements are bound through `router`."""
+
+    class RoutingSession(Session):
+        def get_bind(self, mapper=None, clause=None, **kw):
+            return router.get_bind(self, clause)
+
+        def close(self):
+            # The next use of the session may read from another replica
+            self.info.pop("replica", None)
+            super().close()
+
+    @event.listens_for(RoutingSession, "before_flush")
+    def stick_to_primary(session, flush_context, instances):
+        # Once a session has written, its later reads must see that write
+        session.info["wrote"] = True
+
+    return RoutingSession
@@ -0,0 +1,167 @@
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from typing import Optional
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.infrastructure.models import Vote, VoteRollupDaily, VoteRollupHourly
+
+ROLLUP_COLUMNS = ["election_id", "timestamp", "candidate_id", "region", "polling_station_id"]
+
+def as_stored_timestamp(value) -> datetime:
+    """
+    A vote timestamp as it is stored: naive UTC, since the column is `timestamp without time
+    zone`. Votes are saved in this form, so the rollup buckets line up with them.
+    """
+    if value is None:
+        value = datetime.now(timezone.utc)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.replace(tzinfo=None)
+
+def rollup_rows(votes: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Aggregates votes (dicts keyed like the Vote columns) into hourly and daily rollup rows."""
+    hourly = {}
+    daily = {}
+    for vote in votes:
+        timestamp = as_stored_timestamp(vote.get("timestamp"))
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
+        key = (vote["election_id"], vote["candidate_id"], vote.get("region") or "", vote.get("polling_station_id") or 0)
+
+        row = hourly.setdefault((hour, *key), {
+            "election_id": key[0], "bucket": hour, "candidate_id": key[1], "region": key[2], "polling_station_id": key[3],
+            "count": 0, "first_vote_at": timestamp, "last_vote_at": timestamp,
+        })
+        row["count"] += 1
+        row["first_vote_at"] = min(row["first_vote_at"], timestamp)
+        row["last_vote_at"] = max(row["last_vote_at"], timestamp)
+
+        day = hour.replace(hour=0)
+        row = daily.setdefault((day, *key), {
+            "election_id": key[0], "bucket": day, "candidate_id": key[1], "region": key[2], "polling_station_id": key[3],
+            "count": 0,
+        })
+        row["count"] += 1
+    return list(hourly.values()), list(daily.values())
+
+def upsert_rollups(executor, votes: list[dict]):
+    """
+    Adds `votes` to both rollup tables with one INSERT ... ON CONFLICT per table.
+    `executor` is the Session or Connection the votes were written with, so the
+    rollups commit or roll back together with them.
+    """
+    hourly, daily = rollup_rows(votes)
+    if hourly:
+        statement = insert(VoteRollupHourly).values(hourly)
+        statement = statement.on_conflict_do_update(
+            index_elements=[VoteRollupHourly.election_id, VoteRollupHourly.bucket, VoteRollupHourly.candidate_id,
+                            VoteRollupHourly.region, VoteRollupHourly.polling_station_id],
+            set_={
+                "count": VoteRollupHourly.count + statement.excluded.count,
+                "first_vote_at": func.least(VoteRollupHourly.first_vote_at, statement.excluded.first_vote_at),
+                "last_vote_at": func.greatest(VoteRollupHourly.last_vote_at, statement.excluded.last_vote_at),
+            },
+        )
+        executor.execute(statement)
+    if daily:
+        statement = insert(VoteRollupDaily).values(daily)
+        statement = statement.on_conflict_do_update(
+            index_elements=[VoteRollupDaily.election_id, VoteRollupDaily.bucket, VoteRollupDaily.candidate_id,
+                            VoteRollupDaily.region, VoteRollupDaily.polling_station_id],
+            set_={"count": VoteRollupDaily.count + statement.excluded.count},
+        )
+        executor.execute(statement)
+
+# Every vote saved through the ORM (VoteRepository.cast_vote, fixtures, scripts) is rolled up
+# on the flush connection. Core inserts such as the bulk endpoint call RollupRepository themselves.
+@event.listens_for(Vote, "after_insert")
+def roll_up_inserted_vote(mapper, connection, target):
+    upsert_rollups(connection, [{column: getattr(target, column) for column in ROLLUP_COLUMNS}])
+
+class RollupRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_votes(self, votes: list[dict]):
+        """Rolls up votes that were inserted without the ORM. The caller commits."""
+        upsert_rollups(self.db, votes)
+
+    def get_voting_pattern(self, election_id: int, interval: str = "hourly") -> list:
+        """[(bucket, votes), ...] in time order, one row per hour or day with votes."""
+        rollup = VoteRollupHourly if interval == "hourly" else VoteRollupDaily
+        return (
+            self.db.query(rollup.bucket, func.sum(rollup.count))
+            .filter(rollup.election_id == election_id)
+            .group_by(rollup.bucket)
+            .order_by(rollup.bucket)
+            .all()
+        )
+
+    def vote_counts(self):
+        """Subquery of (election_id, vote_count) for every election with votes."""
+        return (
+            self.db.query(VoteRollupDaily.election_id, func.sum(VoteRollupDaily.count).label("vote_count"))
+            .group_by(VoteRollupDaily.election_id)
+            .subquery()
+        )
+
+    def first_votes(self):
+        """Subquery of (election_id, start_date): when each election received its first vote."""
+        return (
+            self.db.query(VoteRollupHourly.election_id, func.min(VoteRollupHourly.first_vote_at).label("start_date"))
+            .group_by(VoteRollupHourly.election_id)
+            .subquery()
+        )
+
+    def get_total_votes(self, election_id: int) -> int:
+        return (
+            self.db.query(func.coalesce(func.sum(VoteRollupDaily.count), 0))
+            .filter(VoteRollupDaily.election_id == election_id)
+            .scalar()
+        )
+
+    def get_station_activity(self, election_ids: list[int], polling_station_id: Optional[int] = None) -> dict:
+        """
+        Per (election_id, polling_station_id), from the hourly buckets:
+          total_votes, first_vote_at, last_vote_at and hours, a Counter of votes per hour of the day
+          (filled in time order, so ties go to the earliest hour like they did on raw votes).
+        Votes without a polling station are left out.
+        """
+        query = (
+            self.db.query(
+                VoteRollupHourly.election_id,
+                VoteRollupHourly.polling_station_id,
+                VoteRollupHourly.bucket,
+                func.sum(VoteRollupHourly.count),
+                func.min(VoteRollupHourly.first_vote_at),
+                func.max(VoteRollupHourly.last_vote_at),
+            )
+            .filter(VoteRollupHourly.election_id.in_(election_ids), VoteRollupHourly.polling_station_id != 0)
+        )
+        if polling_station_id is not None:
+            query = query.filter(VoteRollupHourly.polling_station_id == polling_station_id)
+        rows = (
+            query.group_by(VoteRollupHourly.election_id, VoteRollupHourly.polling_station_id, VoteRollupHourly.bucket)
+            .order_by(VoteRollupHourly.bucket)
+            .all()
+        )
+
+        activity = defaultdict(lambda: {"total_votes": 0, "first_vote_at": None, "last_vote_at": None, "hours": Counter()})
+        for election_id, station_id, bucket, votes, first_vote_at, last_vote_at in rows:
+            station = activity[(election_id, station_id)]
+            station["total_votes"] += votes
+            station["hours"][bucket.hour] += votes
+            if station["first_vote_at"] is None or first_vote_at < station["first_vote_at"]:
+                station["first_vote_at"] = first_vote_at
+            if station["last_vote_at"] is None or last_vote_at > station["last_vote_at"]:
+                station["last_vote_at"] = last_vote_at
+        return dict(activity)
+
+def average_interval_seconds(station: dict) -> Optional[float]:
+    """Mean gap between consecutive votes: the span from first to last vote over the number of gaps."""
+    if station["total_votes"] < 2:
+        return None
+    return (station["last_vote_at"] - station["first_vote_at"]).total_seconds() / (station["total_votes"] - 1)
@@ -0,0 +1,41 @@
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.infrastructure.models import ObserverFeedback
+from app.infrastructure.sentiment_engine import sentiment_engine
+
+# Polarity above POSITIVE_THRESHOLD is "Positive", below NEGATIVE_THRESHOLD "Negative"
+POSITIVE_THRESHOLD = 0.2
+NEGATIVE_THRESHOLD = -0.2
+
+def sentiment_category(score: float) -> str:
+    if score > POSITIVE_THRESHOLD:
+        return "Positive"
+    if score >= NEGATIVE_THRESHOLD:
+        return "Neutral"
+    return "Negative"
+
+def apply_sentiment(feedback: ObserverFeedback):
+    apply_sentiment_batch([feedback])
+
+def apply_sentiment_batch(feedbacks: list):
+    """Scores many feedback rows with one SentimentEngine batch."""
+    scores = sentiment_engine.score_batch([feedback.description for feedback in feedbacks])
+    for feedback, score in zip(feedbacks, scores):
+        feedback.sentiment_score = score
+        feedback.sentiment_category = sentiment_category(score)
+
+# Feedback is scored once, when it is written, so reads can aggregate the stored score.
+# ObserverFeedbackRepository.submit_feedback scores explicitly; this covers every other
+# insert and any edit of the description, one batch per flush.
+@event.listens_for(Session, "before_flush")
+def score_flushed_feedback(session, flush_context, instances):
+    feedbacks = [
+        obj for obj in session.new
+        if isinstance(obj, ObserverFeedback) and obj.sentiment_score is None
+    ] + [
+        obj for obj in session.dirty
+        if isinstance(obj, ObserverFeedback) and inspect(obj).attrs.description.history.has_changes()
+    ]
+    if feedbacks:
+        apply_sentiment_batch(feedbacks)
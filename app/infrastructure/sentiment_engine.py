@@ -0,0 +1,118 @@
+import hashlib
+import importlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.config import SENTIMENT_CHUNK_SIZE, SENTIMENT_MEMO_SIZE, SENTIMENT_SCORER, SENTIMENT_WORKERS
+
+# Kept free of database imports: worker processes import this module to run the scorer.
+
+def textblob_polarity(text: str) -> float:
+    from textblob import TextBlob
+    return TextBlob(text or "").sentiment.polarity
+
+SCORERS = {"textblob": textblob_polarity}
+
+def load_scorer(spec):
+    """A scorer is a callable text -> polarity in [-1, 1], named in SCORERS or given as "module:function"."""
+    if callable(spec):
+        return spec
+    if spec in SCORERS:
+        return SCORERS[spec]
+    module_name, _, function_name = spec.partition(":")
+    if not function_name:
+        raise ValueError(f"Unknown sentiment scorer: {spec}")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def score_chunk(scorer, texts: list) -> list:
+    return [scorer(text) for text in texts]
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).digest()
+
+
+class SentimentEngine:
+    """
+    Scores texts in batches. Identical texts are scored once (memo keyed by a content hash),
+    and batches with more than `chunk_size` new texts are split into chunks and scored by a
+    process pool, since TextBlob is CPU bound and holds the GIL.
+    Scorers used with workers > 1 must be module-level functions so they can be pickled.
+    """
+    def __init__(self, scorer=SENTIMENT_SCORER, workers: int = SENTIMENT_WORKERS,
+                 chunk_size: int = SENTIMENT_CHUNK_SIZE, memo_size: int = SENTIMENT_MEMO_SIZE):
+        self.scorer = load_scorer(scorer)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = max(chunk_size, 1)
+        self.memo_size = memo_size
+        self._memo = OrderedDict()  # content hash -> score
+        self._memo_lock = threading.Lock()
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.stats = {"scored": 0, "memo_hits": 0, "parallel_batches": 0}
+
+    def score(self, text: str) -> float:
+        return self.score_batch([text])[0]
+
+    def score_batch(self, texts: list) -> list:
+        """Polarity for every text, in the order given."""
+        keys = [content_hash(text) for text in texts]
+        scores = {}
+        pending = {}  # content hash -> text, one entry per distinct new text
+        with self._memo_lock:
+            for key, text in zip(keys, texts):
+                if key in scores or key in pending:
+                    continue
+                if key in self._memo:
+                    self._memo.move_to_end(key)
+                    scores[key] = self._memo[key]
+                    self.stats["memo_hits"] += 1
+                else:
+                    pending[key] = text
+
+        if pending:
+            new_scores = self._score_texts(list(pending.values()))
+            with self._memo_lock:
+                for key, score in zip(pending, new_scores):
+                    scores[key] = score
+                    self._memo[key] = score
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+                self.stats["scored"] += len(pending)
+
+        return [scores[key] for key in keys]
+
+    def _score_texts(self, texts: list) -> list:
+        if self.workers <= 1 or len(texts) <= self.chunk_size:
+            return score_chunk(self.scorer, texts)
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        try:
+            results = list(self._get_pool().map(score_chunk, [self.scorer] * len(chunks), chunks))
+        except BrokenProcessPool:
+            # A worker died; score here and start a fresh pool next time
+            self.shutdown()
+            return score_chunk(self.scorer, texts)
+        self.stats["parallel_batches"] += 1
+        return [score for chunk_scores in results for score in chunk_scores]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn, not fork: the web process holds threads and open database connections
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def clear_memo(self):
+        with self._memo_lock:
+            self._memo.clear()
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+sentiment_engine = SentimentEngine()
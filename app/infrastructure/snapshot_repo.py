@@ -0,0 +1,52 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+
+from app.infrastructure.models import ElectionSnapshot
+from app.infrastructure.tally_repo import TallyRepository
+from app.infrastructure.vote_repo import VoteRepository
+
+SNAPSHOT_SECTIONS = ("results", "candidate_distribution", "geolocation", "polling_station")
+
+def snapshot_body(data) -> bytes:
+    """The bytes a snapshot section is served as. Keys are sorted so the same data always gives the same body."""
+    return json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+def body_etag(body: bytes) -> str:
+    # A strong validator: equal ETags mean byte-identical bodies
+    return '"' + hashlib.sha256(body).hexdigest() + '"'
+
+
+class SnapshotRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def build_sections(self, election_id: int) -> dict:
+        """Computes every section from the votes, bypassing the materialized views so nothing is stale."""
+        vote_repo = VoteRepository(self.db)
+        return {
+            "results": {candidate: votes for candidate, votes in TallyRepository(self.db).get_results(election_id)},
+            "candidate_distribution": vote_repo.get_candidate_vote_distribution(election_id, fresh=True),
+            "geolocation": vote_repo.get_geolocation_metrics(election_id, fresh=True),
+            "polling_station": vote_repo.get_polling_station_insights(election_id),
+        }
+
+    def save_snapshot(self, election_id: int) -> ElectionSnapshot:
+        """Builds and stores the snapshot of an election (replacing an earlier one). The caller commits."""
+        sections = self.build_sections(election_id)
+        snapshot = self.db.get(ElectionSnapshot, election_id) or ElectionSnapshot(election_id=election_id)
+        snapshot.created_at = datetime.now(timezone.utc)
+        snapshot.sections = sections
+        snapshot.etags = {name: body_etag(snapshot_body(data)) for name, data in sections.items()}
+        self.db.add(snapshot)
+        return snapshot
+
+    def get_section(self, election_id: int, section: str):
+        """Returns (etag, data) for one section, or None when the election has no snapshot."""
+        if section not in SNAPSHOT_SECTIONS:
+            raise ValueError(f"Unknown snapshot section: {section}")
+        snapshot = self.db.get(ElectionSnapshot, election_id)
+        if snapshot is None:
+            return None
+        return snapshot.etags[section], snapshot.sections[section]
@@ -1,7 +1,6 @@
 from datetime import datetime
 import math
 from typing import Optional
-import pandas as pd
 from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 from app.infrastructure.models import SubscriptionEvent, User
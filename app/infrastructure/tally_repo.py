@@ -0,0 +1,160 @@
+import random
+import threading
+import time
+import zlib
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import VOTE_COUNTER_SHARD_STRATEGY, VOTE_COUNTER_SHARDS, VOTE_RESULTS_CACHE_SECONDS
+from app.infrastructure.models import Candidate, ElectionTally
+
+if VOTE_COUNTER_SHARD_STRATEGY not in ("random", "hash"):
+    raise ValueError(f"Unknown vote counter shard strategy: {VOTE_COUNTER_SHARD_STRATEGY}")
+
+# Summed results per election, reused for VOTE_RESULTS_CACHE_SECONDS while sharding is on:
+# {election_id: (expires_at, [(candidate_name, votes), ...])}
+_results_cache = {}
+_results_cache_lock = threading.Lock()
+
+def clear_results_cache(election_id: int = None):
+    with _results_cache_lock:
+        if election_id is None:
+            _results_cache.clear()
+        else:
+            _results_cache.pop(election_id, None)
+
+def _clear_after_commit(session: Session):
+    for election_id in session.info.pop("changed_tally_elections", ()):
+        clear_results_cache(election_id)
+
+def _forget_changes(session: Session):
+    session.info.pop("changed_tally_elections", None)
+
+class TallyRepository:
+    def __init__(self, db: Session, shards: int = VOTE_COUNTER_SHARDS, strategy: str = VOTE_COUNTER_SHARD_STRATEGY):
+        self.db = db
+        self.shards = max(shards, 1)
+        self.strategy = strategy
+
+    @property
+    def caches_results(self) -> bool:
+        return self.shards > 1 and VOTE_RESULTS_CACHE_SECONDS > 0
+
+    def choose_shard(self, shard_key=None) -> int:
+        """Picks the counter row a vote goes to. `hash` keeps one voter on one shard."""
+        if self.shards == 1:
+            return 0
+        if self.strategy == "hash" and shard_key is not None:
+            return zlib.crc32(str(shard_key).encode()) % self.shards
+        return random.randrange(self.shards)
+
+    def create_tallies(self, election_id: int, candidate_ids: list[int]):
+        """Adds a zero tally for each candidate. The caller commits."""
+        self.db.add_all(
+            ElectionTally(election_id=election_id, candidate_id=candidate_id, shard=0, count=0)
+            for candidate_id in candidate_ids
+        )
+        self._invalidate_on_commit([election_id])
+
+    def increment(self, election_id: int, candidate_id: int, amount: int = 1, shard_key=None):
+        """
+        Atomically adds `amount` votes to a candidate's tally. The row (or shard row) is
+        created on first use. The caller commits.
+        """
+        self._upsert([{
+            "election_id": election_id,
+            "candidate_id": candidate_id,
+            "shard": self.choose_shard(shard_key),
+            "count": amount,
+        }])
+
+    def increment_many(self, counts: dict):
+        """
+        Applies {(election_id, candidate_id): amount} in a single upsert statement,
+        e.g. once per bulk-ingested chunk of votes. The caller commits.
+        """
+        self._upsert([
+            {"election_id": election_id, "candidate_id": candidate_id, "shard": self.choose_shard(), "count": amount}
+            for (election_id, candidate_id), amount in counts.items()
+        ])
+
+    def _upsert(self, values: list[dict]):
+        if not values:
+            return
+        statement = insert(ElectionTally).values(values)
+        statement = statement.on_conflict_do_update(
+            index_elements=[ElectionTally.election_id, ElectionTally.candidate_id, ElectionTally.shard],
+            set_={"count": ElectionTally.count + statement.excluded.count},
+        )
+        self.db.execute(statement)
+        self._invalidate_on_commit(value["election_id"] for value in values)
+
+    def _invalidate_on_commit(self, election_ids):
+        """
+        Drops the cached results of `election_ids` once the caller commits. Clearing them
+        earlier would let a concurrent read cache the pre-commit counts again.
+        """
+        if not self.db.info.get("tally_listeners"):
+            self.db.info["tally_listeners"] = True
+            event.listen(self.db, "after_commit", _clear_after_commit)
+            event.listen(self.db, "after_rollback", _forget_changes)
+        self.db.info.setdefault("changed_tally_elections", set()).update(election_ids)
+
+    def get_candidate_id(self, election_id: int, candidate_name: str):
+        return (
+            self.db.query(Candidate.id)
+            .filter(Candidate.election_id == election_id, Candidate.name == candidate_name)
+            .order_by(Candidate.id)
+            .scalar()
+        )
+
+    def get_results_for_elections(self, election_ids: list[int]) -> dict:
+        """
+        Returns {election_id: [(candidate_name, votes), ...]} in ballot order for every
+        requested election, using one query. Candidates without a tally count as 0 votes.
+        """
+        results = {}
+        missing = []
+        now = time.monotonic()
+        if self.caches_results:
+            with _results_cache_lock:
+                for election_id in election_ids:
+                    cached = _results_cache.get(election_id)
+                    if cached and cached[0] > now:
+                        results[election_id] = cached[1]
+                    else:
+                        missing.append(election_id)
+        else:
+            missing = list(election_ids)
+
+        if not missing:
+            return results
+        for election_id in missing:
+            results[election_id] = []
+
+        rows = (
+            self.db.query(Candidate.election_id, Candidate.name, func.coalesce(func.sum(ElectionTally.count), 0))
+            .outerjoin(
+                ElectionTally,
+                (ElectionTally.candidate_id == Candidate.id) & (ElectionTally.election_id == Candidate.election_id),
+            )
+            .filter(Candidate.election_id.in_(missing))
+            .group_by(Candidate.election_id, Candidate.id, Candidate.name)
+            .order_by(Candidate.election_id, Candidate.id)
+            .all()
+        )
+        for election_id, name, votes in rows:
+            results[election_id].append((name, votes))
+
+        if self.caches_results:
+            with _results_cache_lock:
+                for election_id in missing:
+                    _results_cache[election_id] = (now + VOTE_RESULTS_CACHE_SECONDS, results[election_id])
+        return results
+
+    def get_results(self, election_id: int) -> list[tuple[str, int]]:
+        return self.get_results_for_elections([election_id])[election_id]
+
+    def get_total_votes(self, election_id: int) -> int:
+        return sum(votes for _, votes in self.get_results(election_id))
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_SECONDS
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """The user columns authenticated endpoints read, detached from any session."""
+    id: int
+    name: str
+    email: str
+    role: str
+    region: str = None
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(id=user.id, name=user.name, email=user.email, role=user.role, region=user.region)
+
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class TokenCache:
+    """
+    Verified tokens, so a token is decoded and its user loaded once rather than on every request.
+    Keyed by a digest of the token (the token itself is never stored). An entry lives until the
+    token's `exp` or for `ttl` seconds, whichever comes first; the ttl bounds how long another
+    process can serve a user after they were edited here, since invalidation is per process.
+    """
+    def __init__(self, max_entries: int = AUTH_CACHE_MAX_ENTRIES, ttl: float = AUTH_CACHE_SECONDS):
+        self.max_entries = max(max_entries, 1)
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> [expires_at, claims, CachedUser or None]
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, token: str):
+        """Returns (claims, user) for a verified token; (None, None) when it has to be decoded."""
+        if not self.enabled:
+            return None, None
+        digest = token_digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[digest]
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None, None
+            self._entries.move_to_end(digest)
+            self.stats["hits"] += 1
+            return entry[1], entry[2]
+
+    def set(self, token: str, claims: dict, user: CachedUser = None):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        if claims.get("exp") is not None:
+            expires_at = min(expires_at, float(claims["exp"]))
+        digest = token_digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            # get_current_user caches claims only; keep a user already loaded for the same token
+            if user is None and entry is not None:
+                user = entry[2]
+            self._entries[digest] = [expires_at, claims, user]
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int = None, email: str = None):
+        """Drops every token of a user whose name, email or role changed."""
+        with self._lock:
+            stale = [
+                digest for digest, (_, claims, user) in self._entries.items()
+                if (email is not None and claims.get("sub") == email)
+                or (user_id is not None and user is not None and user.id == user_id)
+            ]
+            for digest in stale:
+                del self._entries[digest]
+            self.stats["invalidations"] += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+token_cache = TokenCache()
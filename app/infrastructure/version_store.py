@@ -0,0 +1,53 @@
+import threading
+import time
+
+
+class InMemoryVersionStore:
+    """
+    Counters local to this process. A counter starts at the current time in nanoseconds, not 0,
+    so after a restart no key hands out a version that was already given to a client.
+    """
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._versions.setdefault(key, time.time_ns())
+
+    def bump(self, key: str) -> int:
+        with self._lock:
+            version = max(self._versions.get(key, 0) + 1, time.time_ns())
+            self._versions[key] = version
+            return version
+
+
+class RedisVersionStore:
+    """Counters shared by every application process. Needs the optional `redis` package."""
+    def __init__(self, url: str, namespace: str = "data_version:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("The redis data version backend needs the redis package (pip install redis)") from e
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+
+    def get(self, key: str) -> int:
+        value = self.client.get(self.namespace + key)
+        if value is None:
+            # Seeded from the clock like the in-memory store, so a lost key never repeats a version
+            self.client.set(self.namespace + key, time.time_ns(), nx=True)
+            value = self.client.get(self.namespace + key)
+        return int(value)
+
+    def bump(self, key: str) -> int:
+        self.client.set(self.namespace + key, time.time_ns(), nx=True)
+        return self.client.incr(self.namespace + key)
+
+
+def build_version_store(backend: str, redis_url: str = None):
+    if backend == "memory":
+        return InMemoryVersionStore()
+    if backend == "redis":
+        return RedisVersionStore(redis_url)
+    raise ValueError(f"Unknown data version backend: {backend}")
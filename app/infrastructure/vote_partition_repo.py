@@ -0,0 +1,72 @@
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+def partition_name(election_id: int) -> str:
+    return f"votes_e{int(election_id)}"
+
+class VotePartitionRepository:
+    """
+    Manages the per-election LIST partitions of the `votes` table.
+    Everything is a no-op when `votes` is a plain table (e.g. a database that hasn't run
+    the partitioning migration yet, or a non-Postgres test database).
+    """
+    def __init__(self, db: Session):
+        self.db = db
+
+    def is_partitioned(self) -> bool:
+        if self.db.get_bind().dialect.name != "postgresql":
+            return False
+        return self.db.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('votes')")
+        ).scalar() or False
+
+    def partition_exists(self, election_id: int) -> bool:
+        return self.db.execute(
+            text("SELECT to_regclass(:name) IS NOT NULL"), {"name": partition_name(election_id)}
+        ).scalar()
+
+    def reserve_election_id(self) -> int:
+        """Takes the next election id, so its partition can be created before the election row exists."""
+        return self.db.execute(text("SELECT nextval(pg_get_serial_sequence('elections', 'id'))")).scalar()
+
+    def ensure_partition(self, election_id: int) -> bool:
+        """
+        Creates the election's partition if needed. Returns True if one was created.
+
+        Runs in its own short transaction, outside the caller's. The table is created on its
+        own and then attached: ATTACH PARTITION only takes a SHARE UPDATE EXCLUSIVE lock on
+        `votes`, where CREATE TABLE ... PARTITION OF would take an ACCESS EXCLUSIVE one and
+        stall every vote being cast meanwhile.
+        """
+        if not self.is_partitioned() or self.partition_exists(election_id):
+            return False
+        name = partition_name(election_id)
+        with self.db.get_bind().begin() as connection:
+            connection.execute(text(f"CREATE TABLE {name} (LIKE votes INCLUDING DEFAULTS)"))
+            connection.execute(text(f"ALTER TABLE votes ATTACH PARTITION {name} FOR VALUES IN ({int(election_id)})"))
+        return True
+
+    def detach_partition(self, election_id: int) -> str:
+        """
+        Detaches the election's partition into a standalone table that can be dumped
+        and dropped independently. Returns the table name.
+
+        Runs on its own autocommit connection, outside the caller's transaction, so the
+        exclusive lock it takes on `votes` is released as soon as the detach is done.
+        `votes` always has a DEFAULT partition, which rules out DETACH ... CONCURRENTLY.
+        """
+        name = partition_name(election_id)
+        bind = self.db.get_bind()
+        if bind.dialect.name != "postgresql":
+            raise ValueError("The votes table is not partitioned.")
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            if not connection.execute(text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass('votes')")).scalar():
+                raise ValueError("The votes table is not partitioned.")
+            attached = connection.execute(
+                text("SELECT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:name) AND inhparent = to_regclass('votes'))"),
+                {"name": name},
+            ).scalar()
+            if not attached:
+                raise ValueError(f"Election {election_id} has no attached vote partition.")
+            connection.execute(text(f"ALTER TABLE votes DETACH PARTITION {name}"))
+        return name
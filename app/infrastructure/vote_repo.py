@@ -1,24 +1,78 @@
-from collections import defaultdict
-from typing import Counter, List, Optional
-from sqlalchemy import func
+from typing import List, Optional
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
-from textblob import TextBlob
-from app.infrastructure.models import Candidate, Election, ObserverFeedback, Vote
-import numpy as np
+from app.infrastructure.models import Candidate, Election, ElectionStatus, ObserverFeedback, PollingStation, Vote, Voter
 
+from app.infrastructure.analytics_views import views_available, votes_by_candidate, votes_by_region
 from app.infrastructure.observer_feedback_repo import ObserverFeedbackRepository
+from app.infrastructure.reference_catalog import reference_catalog
+from app.infrastructure.rollup_repo import RollupRepository, average_interval_seconds
+from app.infrastructure.tally_repo import TallyRepository
+from app.utils.lazy_imports import lazy_import
+
+np = lazy_import("numpy")
 
 class VoteRepository:
     def __init__(self, db: Session):
         self.db = db
 
     def cast_vote(self, voter_id: int, candidate_id: int, election_id: int):
+        if self._lock_election_status(election_id) == ElectionStatus.COMPLETED:
+            raise ValueError(f"Election {election_id} has ended")
         vote = Vote(voter_id=voter_id, candidate_id=candidate_id, election_id=election_id)
         self.db.add(vote)
+        self.db.flush()
+        # Keep the election tally in step with the vote, in the same transaction
+        TallyRepository(self.db).increment(election_id, candidate_id, shard_key=voter_id)
         self.db.commit()
         self.db.refresh(vote)
         return vote
     
+    def bulk_insert_votes(self, rows: list[dict]) -> list[int]:
+        """
+        Inserts many votes with multi-row INSERT ... RETURNING statements and returns
+        their ids in the order of `rows`. The caller commits.
+        """
+        if not rows:
+            return []
+        return self.db.scalars(insert(Vote).returning(Vote.id, sort_by_parameter_order=True), rows).all()
+
+    def _lock_election_status(self, election_id: int):
+        """
+        The election's status, with its row held FOR SHARE until the caller commits: ending an
+        election locks the row FOR UPDATE, so it waits for votes in flight and is counted with
+        them in its snapshot, and a vote that comes after it sees the completed status.
+        """
+        return self.db.query(Election.status).filter(Election.id == election_id).with_for_update(read=True).scalar()
+
+    def get_bulk_reference_data(self, rows: list[dict]) -> dict:
+        """Looks up what a chunk of bulk votes refers to, with one query per table."""
+        voter_ids = {row["voter_id"] for row in rows}
+        candidate_ids = {row["candidate_id"] for row in rows}
+        election_ids = {row["election_id"] for row in rows}
+        station_ids = {row["polling_station_id"] for row in rows if row["polling_station_id"] is not None}
+
+        # Held FOR SHARE until the chunk commits, like a single vote (see _lock_election_status)
+        statuses = dict(
+            self.db.query(Election.id, Election.status).filter(Election.id.in_(election_ids)).with_for_update(read=True).all()
+        )
+        return {
+            "voters": {voter_id for (voter_id,) in self.db.query(Voter.id).filter(Voter.id.in_(voter_ids))},
+            "elections": set(statuses),
+            "ended_elections": {election_id for election_id, status in statuses.items() if status == ElectionStatus.COMPLETED},
+            # candidate/polling station id -> the election it belongs to
+            "candidates": dict(self.db.query(Candidate.id, Candidate.election_id).filter(Candidate.id.in_(candidate_ids)).all()),
+            "polling_stations": dict(
+                self.db.query(PollingStation.id, PollingStation.election_id).filter(PollingStation.id.in_(station_ids)).all()
+            ) if station_ids else {},
+            "already_voted": set(
+                self.db.query(Vote.voter_id, Vote.election_id)
+                .filter(Vote.voter_id.in_(voter_ids), Vote.election_id.in_(election_ids))
+                .distinct()
+                .all()
+            ),
+        }
+
     def get_votes_by_election(self, election_id: int):
         return self.db.query(Vote).filter(Vote.election_id == election_id).all()
     
@@ -31,21 +85,12 @@ class VoteRepository:
                              .filter(Vote.election_id == election_id)\
                              .scalar() or 0
 
-        # Calculate average sentiment for observer feedback in the election
-        feedbacks = self.db.query(ObserverFeedback)\
-                           .filter(ObserverFeedback.election_id == election_id)\
-                           .all()
-        if feedbacks:
-            total_sentiment = 0
-            count = 0
-            for fb in feedbacks:
-                # Calculate the sentiment polarity from the feedback description
-                polarity = TextBlob(fb.description).sentiment.polarity
-                total_sentiment += polarity
-                count += 1
-            average_sentiment = total_sentiment / count
-        else:
-            average_sentiment = None
+        # Average of the sentiment scores stored with the observer feedback
+        average_sentiment = self.db.query(func.avg(ObserverFeedback.sentiment_score))\
+                                   .filter(ObserverFeedback.election_id == election_id)\
+                                   .scalar()
+        if average_sentiment is not None:
+            average_sentiment = float(average_sentiment)
 
         # Calculate average observer trust score based on reports per observer
         # For each observer, trust_score = min(100, (number_of_reports * 10))
@@ -69,51 +114,48 @@ class VoteRepository:
         }
     
     def get_sentiment_trend(self, election_id: int):
-        # Retrieve all feedback entries for the election.
-        feedbacks = self.db.query(ObserverFeedback)\
-                           .filter(ObserverFeedback.election_id == election_id)\
-                           .all()
-        
-        # Aggregate data by date.
-        trend_data = defaultdict(lambda: {"total_sentiment": 0.0, "count": 0})
-        for fb in feedbacks:
-            if fb.timestamp:
-                # Group by date in ISO format.
-                date_str = fb.timestamp.date().isoformat()
-            else:
-                date_str = "unknown"
-            
-            # Calculate sentiment polarity.
-            polarity = TextBlob(fb.description).sentiment.polarity
-            trend_data[date_str]["total_sentiment"] += polarity
-            trend_data[date_str]["count"] += 1
-
-        # Create a sorted list of daily sentiment trends.
-        trend_list = []
-        for date_str, data in trend_data.items():
-            average_sentiment = data["total_sentiment"] / data["count"] if data["count"] > 0 else None
-            trend_list.append({
-                "date": date_str,
-                "average_sentiment": average_sentiment,
-                "feedback_count": data["count"]
-            })
-        
-        trend_list.sort(key=lambda x: x["date"])
-        return trend_list
+        # Average stored sentiment and number of feedback entries per day.
+        day = func.date(ObserverFeedback.timestamp)
+        trend_data = self.db.query(day, func.avg(ObserverFeedback.sentiment_score), func.count(ObserverFeedback.id))\
+                            .filter(ObserverFeedback.election_id == election_id)\
+                            .group_by(day)\
+                            .order_by(day)\
+                            .all()
+
+        return [
+            {
+                "date": date.isoformat(),
+                "average_sentiment": float(average_sentiment) if average_sentiment is not None else None,
+                "feedback_count": count
+            }
+            for date, average_sentiment, count in trend_data
+        ]
     
-    def get_candidate_vote_distribution(self, election_id: int):
+    def get_candidate_vote_distribution(self, election_id: int, fresh: bool = False):
         # Retrieve vote counts for each candidate in the given election.
-        votes_data = (
-            self.db.query(
-                Candidate.id,
-                Candidate.name,
-                func.count(Vote.id).label("vote_count")
+        if not fresh and views_available(self.db):
+            votes_data = (
+                self.db.query(
+                    Candidate.id,
+                    Candidate.name,
+                    votes_by_candidate.c.vote_count.label("vote_count")
+                )
+                .join(votes_by_candidate, votes_by_candidate.c.candidate_id == Candidate.id)
+                .filter(votes_by_candidate.c.election_id == election_id)
+                .all()
+            )
+        else:
+            votes_data = (
+                self.db.query(
+                    Candidate.id,
+                    Candidate.name,
+                    func.count(Vote.id).label("vote_count")
+                )
+                .join(Vote, Vote.candidate_id == Candidate.id)
+                .filter(Vote.election_id == election_id)
+                .group_by(Candidate.id, Candidate.name)
+                .all()
             )
-            .join(Vote, Vote.candidate_id == Candidate.id)
-            .filter(Vote.election_id == election_id)
-            .group_by(Candidate.id, Candidate.name)
-            .all()
-        )
         
         # Calculate total votes in the election.
         total_votes = sum([item.vote_count for item in votes_data])
@@ -129,7 +171,12 @@ class VoteRepository:
             })
         return distribution
     
-    def get_time_based_voting_patterns(self, election_id: int, interval: str = "hourly"):
+    def get_time_based_voting_patterns(self, election_id: int, interval: str = "hourly", fresh: bool = False):
+        if not fresh:
+            # One row per bucket from the rollup tables instead of a pass over every vote
+            vote_data = RollupRepository(self.db).get_voting_pattern(election_id, interval)
+            return [{"time_period": bucket.isoformat(), "vote_count": int(vote_count)} for bucket, vote_count in vote_data]
+
         # Determine time grouping (hourly or daily)
         time_group = func.date_trunc("hour", Vote.timestamp) if interval == "hourly" else func.date_trunc("day", Vote.timestamp)
 
@@ -144,11 +191,11 @@ class VoteRepository:
     
     def get_turnout_trends(self, election_ids: list[int]):
         # Retrieve total voter turnout for each election
+        vote_counts = RollupRepository(self.db).vote_counts()
         turnout_data = (
-            self.db.query(Election.id, Election.name, func.count(Vote.id).label("vote_count"))
-            .join(Vote, Vote.election_id == Election.id)
+            self.db.query(Election.id, Election.name, vote_counts.c.vote_count)
+            .join(vote_counts, vote_counts.c.election_id == Election.id)
             .filter(Election.id.in_(election_ids))
-            .group_by(Election.id, Election.name)
             .order_by(Election.id)
             .all()
         )
@@ -177,10 +224,10 @@ class VoteRepository:
     
     def predict_turnout(self, election_id: int, lookback: int = 3):
         # Retrieve turnout data for previous elections
-        past_turnout = self.db.query(Election.id, func.count(Vote.id).label("vote_count")) \
-                              .join(Vote, Vote.election_id == Election.id) \
+        vote_counts = RollupRepository(self.db).vote_counts()
+        past_turnout = self.db.query(Election.id, vote_counts.c.vote_count) \
+                              .join(vote_counts, vote_counts.c.election_id == Election.id) \
                               .filter(Election.id < election_id) \
-                              .group_by(Election.id) \
                               .order_by(Election.id.desc()) \
                               .limit(lookback) \
                               .all()
@@ -200,9 +247,10 @@ class VoteRepository:
     
     def predict_turnout_with_seasonality(self, election_id: int, lookback: int = 5, weight_factor: float = 1.5):
         # Retrieve the first recorded vote timestamp for the election
-        election_timing = self.db.query(Vote.election_id, func.min(Vote.timestamp).label("start_date")) \
-                                 .filter(Vote.election_id == election_id) \
-                                 .group_by(Vote.election_id) \
+        rollups = RollupRepository(self.db)
+        first_votes = rollups.first_votes()
+        election_timing = self.db.query(first_votes.c.election_id, first_votes.c.start_date) \
+                                 .filter(first_votes.c.election_id == election_id) \
                                  .first()
 
         if not election_timing or not election_timing.start_date:
@@ -211,9 +259,10 @@ class VoteRepository:
         upcoming_month = election_timing.start_date.month
 
         # Retrieve past elections for comparison
-        past_turnout = self.db.query(Vote.election_id, func.min(Vote.timestamp).label("start_date"), func.count(Vote.id).label("vote_count")) \
-                              .group_by(Vote.election_id) \
-                              .order_by(Vote.election_id.desc()) \
+        vote_counts = rollups.vote_counts()
+        past_turnout = self.db.query(first_votes.c.election_id, first_votes.c.start_date, vote_counts.c.vote_count) \
+                              .join(vote_counts, vote_counts.c.election_id == first_votes.c.election_id) \
+                              .order_by(first_votes.c.election_id.desc()) \
                               .limit(lookback) \
                               .all()
 
@@ -238,10 +287,10 @@ class VoteRepository:
     
     def predict_turnout_with_confidence(self, election_id: int, lookback: int = 5):
         # Retrieve past turnout data
-        past_turnout = self.db.query(Election.id, func.count(Vote.id).label("vote_count")) \
-                              .join(Vote, Vote.election_id == Election.id) \
+        vote_counts = RollupRepository(self.db).vote_counts()
+        past_turnout = self.db.query(Election.id, vote_counts.c.vote_count) \
+                              .join(vote_counts, vote_counts.c.election_id == Election.id) \
                               .filter(Election.id < election_id) \
-                              .group_by(Election.id) \
                               .order_by(Election.id.desc()) \
                               .limit(lookback) \
                               .all()
@@ -272,16 +321,19 @@ class VoteRepository:
     
     def get_detailed_comparisons(self, election_ids: list[int]):
         # Retrieve election data with vote counts and earliest vote timestamp.
+        rollups = RollupRepository(self.db)
+        vote_counts = rollups.vote_counts()
+        first_votes = rollups.first_votes()
         data = (
             self.db.query(
                 Election.id,
                 Election.name,
-                func.count(Vote.id).label("vote_count"),
-                func.min(Vote.timestamp).label("start_date")
+                vote_counts.c.vote_count,
+                first_votes.c.start_date
             )
-            .join(Vote, Vote.election_id == Election.id)
+            .join(vote_counts, vote_counts.c.election_id == Election.id)
+            .join(first_votes, first_votes.c.election_id == Election.id)
             .filter(Election.id.in_(election_ids))
-            .group_by(Election.id, Election.name)
             .order_by(Election.id)
             .all()
         )
@@ -348,11 +400,8 @@ class VoteRepository:
     
     def get_dashboard_metrics(self, election_id: int) -> dict:
         # 1. Total votes for the specified election
-        total_votes = (
-            self.db.query(func.count(Vote.id))
-            .filter(Vote.election_id == election_id)
-            .scalar()
-        )
+        rollups = RollupRepository(self.db)
+        total_votes = rollups.get_total_votes(election_id)
 
         # 2. Vote distribution per candidate for the specified election
         candidate_distribution = (
@@ -370,11 +419,11 @@ class VoteRepository:
         observer_sentiment = {"positive": 70, "neutral": 20, "negative": 10}
 
         # 4. Historical turnout trends: average turnout of past elections and change percentage
+        vote_counts = rollups.vote_counts()
         past_elections_data = (
-            self.db.query(Election.id, func.count(Vote.id).label("vote_count"))
-            .join(Vote, Vote.election_id == Election.id)
+            self.db.query(Election.id, vote_counts.c.vote_count)
+            .join(vote_counts, vote_counts.c.election_id == Election.id)
             .filter(Election.id < election_id)
-            .group_by(Election.id)
             .all()
         )
         past_vote_counts = [row.vote_count for row in past_elections_data]
@@ -445,22 +494,34 @@ class VoteRepository:
             "observer_sentiment": observer_sentiment,
         }
     
-    def get_geolocation_metrics(self, election_id: int) -> list:
-        # Query total votes grouped by region.
-        region_votes = (
-            self.db.query(Vote.region, func.count(Vote.id).label("total_votes"))
-            .filter(Vote.election_id == election_id)
-            .group_by(Vote.region)
-            .all()
-        )
+    def get_geolocation_metrics(self, election_id: int, fresh: bool = False) -> list:
+        if not fresh and views_available(self.db):
+            # Region totals are the sums of the per-candidate rows of the view
+            candidate_distribution_query = (
+                self.db.query(votes_by_region.c.region, votes_by_region.c.candidate_id, votes_by_region.c.vote_count)
+                .filter(votes_by_region.c.election_id == election_id)
+                .all()
+            )
+            totals = {}
+            for region, _, votes in candidate_distribution_query:
+                totals[region] = totals.get(region, 0) + votes
+            region_votes = list(totals.items())
+        else:
+            # Query total votes grouped by region.
+            region_votes = (
+                self.db.query(Vote.region, func.count(Vote.id).label("total_votes"))
+                .filter(Vote.election_id == election_id)
+                .group_by(Vote.region)
+                .all()
+            )
 
-        # Query candidate distribution within each region.
-        candidate_distribution_query = (
-            self.db.query(Vote.region, Vote.candidate_id, func.count(Vote.id).label("votes"))
-            .filter(Vote.election_id == election_id)
-            .group_by(Vote.region, Vote.candidate_id)
-            .all()
-        )
+            # Query candidate distribution within each region.
+            candidate_distribution_query = (
+                self.db.query(Vote.region, Vote.candidate_id, func.count(Vote.id).label("votes"))
+                .filter(Vote.election_id == election_id)
+                .group_by(Vote.region, Vote.candidate_id)
+                .all()
+            )
 
         # Transform candidate distribution into a dict keyed by region.
         candidate_distribution = {}
@@ -490,35 +551,16 @@ class VoteRepository:
           - Average interval (in seconds) between consecutive votes.
           - Peak hour and the vote count during that hour.
         """
-        # Retrieve votes for the election that have a polling station assigned.
-        votes = (
-            self.db.query(Vote)
-            .filter(Vote.election_id == election_id, Vote.polling_station != None)
-            .all()
-        )
-
-        station_dict = defaultdict(list)
-        # Group vote timestamps by polling_station.
-        for vote in votes:
-            station_dict[vote.polling_station].append(vote.timestamp)
+        # Per-station totals, first/last vote and votes per hour come from the hourly rollup.
+        activity = RollupRepository(self.db).get_station_activity([election_id])
+        stations = reference_catalog.stations({station_id for _, station_id in activity}, self.db)
 
         results = []
-        for station, timestamps in station_dict.items():
-            total_votes = len(timestamps)
-            # Sort timestamps to calculate time differences.
-            timestamps_sorted = sorted(timestamps)
-            if len(timestamps_sorted) > 1:
-                intervals = [
-                    (t2 - t1).total_seconds()
-                    for t1, t2 in zip(timestamps_sorted, timestamps_sorted[1:])
-                ]
-                avg_interval = sum(intervals) / len(intervals)
-            else:
-                avg_interval = None  # Not enough data to compute an interval.
-
-            # Peak hour: count votes per hour.
-            hours = [timestamp.hour for timestamp in timestamps]
-            hour_counts = Counter(hours)
+        for (_, station_id), station_activity in activity.items():
+            station = stations.get(station_id)
+            if station is None:
+                continue
+            hour_counts = station_activity["hours"]
             if hour_counts:
                 peak_hour, peak_votes = hour_counts.most_common(1)[0]
             else:
@@ -532,8 +574,8 @@ class VoteRepository:
             }
             results.append({
                 "polling_station": polling_station_data,
-                "total_votes": total_votes,
-                "average_interval_seconds": avg_interval,
+                "total_votes": station_activity["total_votes"],
+                "average_interval_seconds": average_interval_seconds(station_activity),
                 "peak_hour": peak_hour,
                 "votes_in_peak_hour": peak_votes,
             })
@@ -550,49 +592,19 @@ class VoteRepository:
           - average_interval_seconds between consecutive votes
           - peak_hour and votes_in_peak_hour
         """
-        query = self.db.query(Vote).filter(
-            Vote.election_id.in_(election_ids),
-            Vote.polling_station_id.isnot(None)  # only consider votes with a polling station
-        )
-        if polling_station_id is not None:
-            query = query.filter(Vote.polling_station_id == polling_station_id)
-
-        votes = query.all()
-
-        # Group votes by (election_id, polling_station_id)
-        groups = defaultdict(list)
-        for vote in votes:
-            key = (vote.election_id, vote.polling_station_id)
-            groups[key].append(vote)
+        activity = RollupRepository(self.db).get_station_activity(election_ids, polling_station_id)
+        stations = reference_catalog.stations({station_id for _, station_id in activity}, self.db)
 
         results = []
-        for (election_id, polling_station_id), vote_group in groups.items():
-            # Extract timestamps and sort them
-            timestamps = sorted([v.timestamp for v in vote_group])
-            total_votes = len(timestamps)
-
-            # Calculate average interval (in seconds) between consecutive votes
-            if total_votes > 1:
-                intervals = [
-                    (t2 - t1).total_seconds()
-                    for t1, t2 in zip(timestamps, timestamps[1:])
-                ]
-                avg_interval = sum(intervals) / len(intervals)
-            else:
-                avg_interval = None
-
+        for (election_id, polling_station_id), station_activity in activity.items():
             # Determine peak hour
-            hours = [ts.hour for ts in timestamps]
-            hour_counts = Counter(hours)
+            hour_counts = station_activity["hours"]
             if hour_counts:
                 peak_hour, peak_votes = hour_counts.most_common(1)[0]
             else:
                 peak_hour, peak_votes = None, None
 
-            # We'll extract polling station details from one of the votes.
-            polling_station = vote_group[0].polling_station
-            # Assume polling_station is serialized as a dict when returned, or customize as needed.
-            # Here, we construct a simplified dict if needed.
+            polling_station = stations.get(polling_station_id)
             polling_station_data = {
                 "id": polling_station.id if polling_station else None,
                 "name": polling_station.name if polling_station else None,
@@ -604,8 +616,8 @@ class VoteRepository:
             results.append({
                 "election_id": election_id,
                 "polling_station": polling_station_data,
-                "total_votes": total_votes,
-                "average_interval_seconds": avg_interval,
+                "total_votes": station_activity["total_votes"],
+                "average_interval_seconds": average_interval_seconds(station_activity),
                 "peak_hour": peak_hour,
                 "votes_in_peak_hour": peak_votes,
             })
@@ -620,14 +632,11 @@ class VoteRepository:
           - historical_turnouts: a list of dictionaries for each past election with keys election_id and turnout.
         """
         # Query historical turnout grouped by election_id for elections before the upcoming one.
+        vote_counts = RollupRepository(self.db).vote_counts()
         historical_data = (
-            self.db.query(
-                Vote.election_id,
-                func.count(Vote.id).label("turnout")
-            )
-            .filter(Vote.election_id < upcoming_election_id)
-            .group_by(Vote.election_id)
-            .order_by(Vote.election_id)
+            self.db.query(vote_counts.c.election_id, vote_counts.c.vote_count)
+            .filter(vote_counts.c.election_id < upcoming_election_id)
+            .order_by(vote_counts.c.election_id)
             .all()
         )
 
@@ -681,7 +690,7 @@ class VoteRepository:
                 })
         return anomalies
     
-    def get_votes_by_region(self, election_id: int, region: str = None) -> list:
+    def get_votes_by_region(self, election_id: int, region: str = None, fresh: bool = False) -> list:
         """
         Aggregates vote data by region for the specified election.
         Optionally filter by a specific region.
@@ -691,17 +700,26 @@ class VoteRepository:
           - total_votes
           - (optionally, you can add more metrics like average vote interval or peak hour)
         """
-        query = self.db.query(
-            Vote.region,
-            func.count(Vote.id).label("total_votes")
-        ).filter(Vote.election_id == election_id)
-
-        # If a specific region filter is provided, add it.
-        if region:
-            query = query.filter(Vote.region == region)
-        
-        query = query.group_by(Vote.region)
-        results = query.all()
+        if not fresh and views_available(self.db):
+            query = self.db.query(
+                votes_by_region.c.region,
+                func.sum(votes_by_region.c.vote_count).label("total_votes")
+            ).filter(votes_by_region.c.election_id == election_id)
+            if region:
+                query = query.filter(votes_by_region.c.region == region)
+            results = [(region_val, int(total_votes)) for region_val, total_votes in query.group_by(votes_by_region.c.region).all()]
+        else:
+            query = self.db.query(
+                Vote.region,
+                func.count(Vote.id).label("total_votes")
+            ).filter(Vote.election_id == election_id)
+
+            # If a specific region filter is provided, add it.
+            if region:
+                query = query.filter(Vote.region == region)
+            
+            query = query.group_by(Vote.region)
+            results = query.all()
 
         # Convert results to a list of dictionaries.
         analytics = []
@@ -6,12 +6,14 @@ from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSock
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.application.commands import CreateAlertCommand, UpdateAlertCommand
 from app.application.queries import GetAlertsQuery, GetAlertsWSQuery
 from app.application.query_bus import query_bus
 from app.infrastructure.database import SessionLocal, get_db
 from app.application.handlers import command_bus
 from app.infrastructure.models import Alert, AlertResponse
+from app.interfaces.managers.alert_stream import alert_stream
 
 router = APIRouter(prefix="/alerts", tags=["Alerts"])
 templates = Jinja2Templates(directory="app/templates")
@@ -42,18 +44,35 @@ def update_alert(
     # command.alert_id = alert_id
     try:
         return command_bus.handle(command)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
     
 @router.websocket("/ws")
-async def alerts_ws(websocket: WebSocket):
+async def alerts_ws(
+    websocket: WebSocket,
+    election_id: int = Query(None, description="Only stream alerts of this election"),
+    alert_type: str = Query(None, description="Only stream alerts of this type")
+):
     await websocket.accept()
+    # Subscribe before reading the current alerts, so no change slips in between
+    subscriber = alert_stream.subscribe(election_id, alert_type)
+    sender = None
     try:
+        # The first message is every matching alert with status "new"
+        query = GetAlertsWSQuery(status="new", election_id=election_id, alert_type=alert_type)
+        data = await query_bus.handle_async(query)
+        await websocket.send_json(data)
+
+        # After that, only alerts that were created or changed are pushed
+        sender = asyncio.create_task(alert_stream.forward(subscriber, websocket))
         while True:
-            # Build the CQRS query with status filter "new"
-            query = GetAlertsWSQuery(status="new")
-            data = query_bus.handle(query)
-            await websocket.send_json(data)
-            await asyncio.sleep(5)
+            # Clients don't send anything; waiting for a message is how a disconnect shows up
+            await websocket.receive_text()
     except WebSocketDisconnect:
-        print("Client disconnected")
\ No newline at end of file
+        print("Client disconnected")
+    finally:
+        if sender is not None:
+            sender.cancel()
+        alert_stream.unsubscribe(subscriber)
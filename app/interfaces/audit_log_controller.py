@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.application.commands import CreateAuditLogCommand
 from app.application.queries import GetAuditLogsQuery
 from app.application.query_bus import query_bus
@@ -17,6 +18,8 @@ def create_audit_log(query: CreateAuditLogCommand, db: Session = Depends(get_db)
     
     try:
         return command_bus.handle(query)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
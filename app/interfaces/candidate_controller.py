@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.application.commands import CreateCandidateCommand, DeleteCandidateCommand, UpdateCandidateCommand
 from app.application.queries import GetCandidateByIdQuery, GetCandidatesQuery
 from app.application.query_bus import query_bus
@@ -15,6 +16,10 @@ templates = Jinja2Templates(directory="app/templates")
 def create_candidate(query: CreateCandidateCommand, db: Session = Depends(get_db)):
     try:
         return command_bus.handle(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
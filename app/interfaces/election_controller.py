@@ -1,10 +1,12 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from app.application.query_bus import query_bus
 from app.application.queries import CandidateSupportQuery, ElectionSummaryQuery, ElectionTurnoutQuery, ExportElectionResultsQuery, GetAllElectionsQuery, GetElectionDetailsQuery, GetElectionResultsQuery, GetTurnoutPredictionQuery, ParticipationByRoleQuery, ResultsBreakdownQuery, TopCandidateQuery
-from app.application.commands import CreateElectionCommand, EndElectionCommand
+from app.application.commands import ArchiveElectionVotesCommand, CreateElectionCommand, EndElectionCommand
 from app.infrastructure.models import ElectionResponse
 from app.application.commands import CreateElectionCommand
 from app.application.handlers import command_bus
+from app.interfaces.http_caching import not_modified, snapshot_response
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 router = APIRouter()  # Define the router object
 
@@ -17,6 +19,8 @@ def create_election(command: CreateElectionCommand):
         election = command_bus.handle(command)
         if election is None:
             print("Election creation failed")
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
@@ -34,6 +38,8 @@ def get_election_details(election_id: int):
         election = query_bus.handle(query)  # Dispatch the query
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
@@ -49,12 +55,35 @@ def end_election(election_id: int):
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
 
+@router.put("/elections/{election_id}/archive-votes/")
+def archive_election_votes(election_id: int):
+    """
+    Detaches a completed election's votes partition so it can be dumped and dropped.
+    Results keep working from the tallies; per-vote analytics for the election stop.
+    """
+    command = ArchiveElectionVotesCommand(election_id=election_id)
+
+    try:
+        return command_bus.handle(command)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/elections/{election_id}/results/")
-def get_election_results(election_id: int):
+def get_election_results(request: Request, response: Response, election_id: int):
+    cached = not_modified(request, response, election_id)
+    if cached is not None:
+        return cached
+    # Completed elections are served from the snapshot taken when they ended
+    snapshot = snapshot_response(request, election_id, "results")
+    if snapshot is not None:
+        return snapshot
     query = GetElectionResultsQuery(election_id)
 
     try:
@@ -62,6 +91,8 @@ def get_election_results(election_id: int):
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
     
@@ -76,6 +107,8 @@ def candidate_support(
         return {"candidates": result}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
     
@@ -90,6 +123,8 @@ def election_turnout(
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
 
@@ -100,6 +135,8 @@ def election_summary():
     try:
         result = query_bus.handle(query)
         return {"elections": result}
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
     
@@ -111,6 +148,8 @@ def top_candidate(election_id: int):
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
     
@@ -125,6 +164,8 @@ def participation_by_role(
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred.{str(e)}")
     
@@ -137,6 +178,8 @@ def results_breakdown(election_id: int):
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
     
@@ -0,0 +1,46 @@
+from fastapi import Request, Response
+from app.application.data_versions import election_versions
+from app.application.queries import GetElectionSnapshotQuery
+from app.application.query_bus import query_bus
+
+# A completed election's snapshot never changes, so clients and proxies may keep it for a year
+SNAPSHOT_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Live data may be kept, but must be revalidated (cheaply, see not_modified) before each use
+VERSIONED_CACHE_CONTROL = "no-cache"
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+def snapshot_response(request: Request, election_id: int, section: str):
+    """
+    The stored snapshot section of a completed election, with a strong ETag and an immutable
+    Cache-Control (304 when the client already has it). None while the election is running,
+    in which case the endpoint computes the data as usual.
+    """
+    snapshot = query_bus.handle(GetElectionSnapshotQuery(election_id=election_id, section=section))
+    if snapshot is None:
+        return None
+    etag, body = snapshot
+    headers = {"ETag": etag, "Cache-Control": SNAPSHOT_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def not_modified(request: Request, response: Response, election_id: int):
+    """
+    Conditional GET on the election's data version. Returns a 304 response when the client's
+    ETag is still current; otherwise sets the ETag on `response` and returns None so the
+    endpoint runs its query. Only the version is read, never the database.
+    """
+    etag = election_versions.etag(election_id)
+    headers = {"ETag": etag, "Cache-Control": VERSIONED_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
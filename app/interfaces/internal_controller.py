@@ -0,0 +1,87 @@
+from fastapi import APIRouter, Depends
+from starlette.concurrency import run_in_threadpool
+from app.application.query_cache import query_cache
+from app.application.single_flight import single_flight
+from app.infrastructure.analytics_views import analytics_refresher
+from app.infrastructure.broker import broker
+from app.infrastructure.database import get_pool_stats
+from app.infrastructure.model_registry import forecast_models
+from app.infrastructure.reference_catalog import reference_catalog
+from app.interfaces.managers.alert_stream import alert_stream
+from app.interfaces.managers.connection_manager import subscription_manager
+from app.interfaces.managers.summary_broadcaster import summary_broadcaster
+from app.security import get_current_admin
+from app.utils import lazy_imports
+
+# Operational stats and controls, for admins only
+router = APIRouter(prefix="/internal", tags=["Internal"], dependencies=[Depends(get_current_admin)])
+
+@router.get("/db/pool")
+def db_pool_stats():
+    """
+    Returns live connection pool usage: checked-out and idle connections,
+    overflow in use, checkout timeouts and a checkout wait-time histogram.
+    """
+    return get_pool_stats()
+
+@router.get("/analytics/views")
+def analytics_views_status():
+    """Materialized analytics views: whether they exist, pending votes and the last refresh."""
+    return analytics_refresher.status()
+
+@router.post("/analytics/views/refresh")
+async def refresh_analytics_views():
+    """Refreshes the materialized analytics views now."""
+    refreshed = await run_in_threadpool(analytics_refresher.refresh)
+    return {"refreshed": refreshed, **analytics_refresher.status()}
+
+@router.get("/cache")
+def query_cache_stats():
+    """QueryBus result cache: backend, entries, and hits/misses overall and per query type."""
+    return query_cache.stats()
+
+@router.post("/cache/clear")
+def clear_query_cache():
+    """Drops every cached query result and resets the counters."""
+    query_cache.clear()
+    return query_cache.stats()
+
+@router.get("/query_coalescing")
+def query_coalescing_stats():
+    """Queries in flight now, and how many callers ran a query (leaders) or shared one (followers)."""
+    return single_flight.status()
+
+@router.get("/lazy_modules")
+def lazy_modules_status():
+    """Heavy libraries imported on first use: whether this worker has loaded them, and how long it took."""
+    return lazy_imports.status()
+
+@router.get("/forecast_models")
+def forecast_models_status():
+    """Fitted forecast models: where they are stored, how many are loaded, hits/misses and evictions."""
+    return forecast_models.status()
+
+@router.get("/reference_catalog")
+def reference_catalog_status():
+    """In-memory elections, candidates and polling stations: version, row counts, hits/misses and reloads."""
+    return reference_catalog.status()
+
+@router.get("/realtime_summaries")
+def realtime_summaries_status():
+    """Elections with a real-time summary producer, their subscribers, and how often summaries were recomputed or skipped."""
+    return summary_broadcaster.status()
+
+@router.get("/alert_stream")
+def alert_stream_status():
+    """Alert change notifications: whether this worker listens for them, connected clients and alerts pushed."""
+    return alert_stream.status()
+
+@router.get("/subscription_connections")
+def subscription_connections_status():
+    """Subscription WebSocket queues: slow consumer policy, connections, queued messages, and messages sent or dropped."""
+    return subscription_manager.status()
+
+@router.get("/broker")
+def broker_status():
+    """Message broker fanning WebSocket updates out to every worker: backend, connection, channels and messages."""
+    return broker.status()
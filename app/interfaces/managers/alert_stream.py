@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from fastapi import WebSocket
+
+from app.infrastructure.alert_events import alert_events
+
+
+class AlertSubscriber:
+    def __init__(self, election_id: int = None, alert_type: str = None):
+        self.election_id = election_id
+        self.alert_type = alert_type
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    def wants(self, alert: dict) -> bool:
+        return (
+            (self.election_id is None or alert["election_id"] == self.election_id)
+            and (self.alert_type is None or alert["alert_type"] == self.alert_type)
+        )
+
+
+class AlertStreamManager:
+    """
+    Pushes created and changed alerts to /alerts/ws clients as they are committed, instead of
+    every client re-reading the alert list every few seconds. Each client picks the election and
+    alert type it cares about when it connects.
+    """
+    def __init__(self, events=alert_events):
+        self.events = events
+        self._subscribers: set[AlertSubscriber] = set()
+        self._lock = threading.Lock()
+        self._listening = False
+        self.stats = {"pushed": 0}
+
+    def subscribe(self, election_id: int = None, alert_type: str = None) -> AlertSubscriber:
+        subscriber = AlertSubscriber(election_id, alert_type)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if not self._listening:
+                self.events.add_listener(self._on_alerts)
+                self._listening = True
+        return subscriber
+
+    def unsubscribe(self, subscriber: AlertSubscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def _on_alerts(self, alerts: list):
+        # Called from the committing thread or the listener thread, not the subscribers' loop
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            matching = [alert for alert in alerts if subscriber.wants(alert)]
+            if not matching:
+                continue
+            try:
+                subscriber.loop.call_soon_threadsafe(subscriber.queue.put_nowait, matching)
+            except RuntimeError:
+                # Its event loop is gone
+                self.unsubscribe(subscriber)
+
+    async def forward(self, subscriber: AlertSubscriber, websocket: WebSocket):
+        while True:
+            alerts = await subscriber.queue.get()
+            # Whatever piled up while the previous send was in flight goes out in one message
+            while not subscriber.queue.empty():
+                alerts = alerts + subscriber.queue.get_nowait()
+            await websocket.send_json(alerts)
+            self.stats["pushed"] += len(alerts)
+
+    def status(self) -> dict:
+        with self._lock:
+            subscribers = len(self._subscribers)
+        return {**self.events.status(), "subscribers": subscribers, **self.stats}
+
+# Create a global instance
+alert_stream = AlertStreamManager()
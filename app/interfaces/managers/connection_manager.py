@@ -1,31 +1,160 @@
+from collections import deque
 from fastapi import WebSocket
 import asyncio
+import logging
+
+from app.config import SUBSCRIPTION_WS_QUEUE_SIZE, SUBSCRIPTION_WS_SLOW_CONSUMER_POLICY
+from app.infrastructure.broker import broker
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTIONS_CHANNEL = "subscriptions"
+
+# What happens when a client can't keep up and its queue is full:
+#   drop_oldest -> the oldest queued message is dropped to make room
+#   coalesce    -> everything queued is dropped; only the newest message is kept
+#   disconnect  -> the client is disconnected (it reconnects and gets the current state)
+SLOW_CONSUMER_POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+# Close code sent to clients disconnected for falling behind ("try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class ConnectionQueue:
+    """Outbound messages of one WebSocket, sent in order by its own writer task."""
+    def __init__(self, websocket: WebSocket, max_size: int):
+        self.websocket = websocket
+        self.loop = asyncio.get_running_loop()
+        self.max_size = max(max_size, 1)
+        self.messages = deque()
+        self.ready = asyncio.Event()
+        self.writer = None
+        self.dropped = 0
+
+    def put(self, message: dict, policy: str) -> bool:
+        """Queues `message`. Returns False if the client must be disconnected instead."""
+        if len(self.messages) >= self.max_size:
+            if policy == "disconnect":
+                return False
+            if policy == "coalesce":
+                self.dropped += len(self.messages)
+                self.messages.clear()
+            else:
+                self.messages.popleft()
+                self.dropped += 1
+        self.messages.append(message)
+        self.ready.set()
+        return True
+
 
 class SubscriptionConnectionManager:
-    def __init__(self):
-        # Dictionary mapping user_id to a list of active websocket connections.
-        self.active_connections: dict[int, list[WebSocket]] = {}
+    """
+    Subscription updates for a user's WebSocket connections. Broadcasts go through the broker,
+    so a connection is reached whichever worker handled the update; each worker then queues the
+    message for the connections it holds.
+    """
+    def __init__(self, max_queue: int = SUBSCRIPTION_WS_QUEUE_SIZE, policy: str = SUBSCRIPTION_WS_SLOW_CONSUMER_POLICY,
+                 broker=broker):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.max_queue = max_queue
+        self.policy = policy
+        self.broker = broker
+        self._subscribed = False
+        # Dictionary mapping user_id to the outbound queue of each of its active websocket connections.
+        self.active_connections: dict[int, dict[WebSocket, ConnectionQueue]] = {}
+        self.stats = {"sent": 0, "dropped": 0, "disconnected": 0, "failed": 0}
 
     async def connect(self, user_id: int, websocket: WebSocket):
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
         await websocket.accept()
+        connection = ConnectionQueue(websocket, self.max_queue)
+        connection.writer = asyncio.create_task(self._write(user_id, connection))
+        self.active_connections.setdefault(user_id, {})[websocket] = connection
+        if not self._subscribed:
+            self._subscribed = True
+            self.broker.subscribe(SUBSCRIPTIONS_CHANNEL, self._on_message)
 
     def disconnect(self, user_id: int, websocket: WebSocket):
-        if user_id in self.active_connections:
-            self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-
-    async def broadcast(self, user_id: int, message: dict):
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    # You might log the error or remove the faulty connection.
-                    print(f"Error sending message: {e}")
+        connections = self.active_connections.get(user_id)
+        if not connections or websocket not in connections:
+            return
+        connection = connections.pop(websocket)
+        self.stats["dropped"] += connection.dropped
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+        if not connections:
+            del self.active_connections[user_id]
+
+    def send(self, user_id: int, websocket: WebSocket, message: dict):
+        """Queues a message for one connection of the user."""
+        connection = self.active_connections.get(user_id, {}).get(websocket)
+        if connection is not None:
+            self._enqueue(user_id, connection, message)
+
+    def broadcast(self, user_id: int, message: dict):
+        """
+        Publishes a message for every connection of the user, in every worker. Never waits for
+        a client, but publishing may wait for the broker, so call it off the event loop.
+        """
+        try:
+            self.broker.publish(SUBSCRIPTIONS_CHANNEL, {"user_id": user_id, "message": message})
+        except Exception as e:
+            logger.warning("Could not publish subscriptions update: %s", e)
+
+    def _on_message(self, channel: str, payload: dict):
+        # Called on the broker's thread (or the publishing one); each connection is queued on its own loop
+        user_id = payload["user_id"]
+        for connection in list(self.active_connections.get(user_id, {}).values()):
+            try:
+                connection.loop.call_soon_threadsafe(self._enqueue, user_id, connection, payload["message"])
+            except RuntimeError:
+                # Its event loop is gone
+                self.disconnect(user_id, connection.websocket)
+
+    def _enqueue(self, user_id: int, connection: ConnectionQueue, message: dict):
+        if connection.put(message, self.policy):
+            return
+        print(f"Disconnecting slow subscriptions client of user {user_id}")
+        self.disconnect(user_id, connection.websocket)
+        self.stats["disconnected"] += 1
+        asyncio.create_task(self._close(connection.websocket))
+
+    async def _write(self, user_id: int, connection: ConnectionQueue):
+        try:
+            while True:
+                await connection.ready.wait()
+                while connection.messages:
+                    await connection.websocket.send_json(connection.messages.popleft())
+                    self.stats["sent"] += 1
+                connection.ready.clear()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The socket is gone; stop queueing for it
+            print(f"Error sending message: {e}")
+            self.stats["failed"] += 1
+            self.disconnect(user_id, connection.websocket)
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE)
+        except Exception:
+            pass
+
+    def status(self) -> dict:
+        connections = [connection for per_user in self.active_connections.values() for connection in per_user.values()]
+        depths = [len(connection.messages) for connection in connections]
+        return {
+            "policy": self.policy,
+            "max_queue": self.max_queue,
+            "users": len(self.active_connections),
+            "connections": len(connections),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            **self.stats,
+            # Dropped by connections that are still open, too
+            "dropped": self.stats["dropped"] + sum(connection.dropped for connection in connections),
+        }
 
 # Create a global instance
-subscription_manager = SubscriptionConnectionManager()
\ No newline at end of file
+subscription_manager = SubscriptionConnectionManager()
@@ -0,0 +1,228 @@
+import asyncio
+import json
+import time
+from fastapi import WebSocket
+
+from app.application.data_versions import ELECTION_CHANGES_CHANNEL, election_versions
+from app.application.queries import RealTimeElectionSummaryQuery
+from app.application.query_bus import query_bus
+from app.config import (
+    REALTIME_SUMMARY_INTERVAL_SECONDS, REALTIME_SUMMARY_MAX_AGE_SECONDS, REALTIME_SUMMARY_SEND_TIMEOUT_SECONDS,
+)
+from app.infrastructure.broker import broker
+from app.interfaces.managers.connection_manager import SLOW_CONSUMER_CLOSE_CODE
+
+# How a client receives summaries:
+#   full  -> the whole summary every time it changes
+#   delta -> a snapshot first, then only what changed; every message carries a sequence number
+SUMMARY_MODES = ("full", "delta")
+
+# Close code sent to clients whose send failed for any other reason ("internal error")
+SEND_ERROR_CLOSE_CODE = 1011
+
+
+class _Channel:
+    def __init__(self, election_id: int):
+        self.election_id = election_id
+        self.subscribers: dict[WebSocket, str] = {}  # websocket -> summary mode
+        self.summary = None  # Last summary computed
+        self.payload = None  # Last summary sent, serialized once for every subscriber
+        self.snapshot = None  # Delta mode snapshot of the last summary, serialized on first use
+        self.seq = 0  # Sequence number of the last summary, for delta mode
+        self.version = None  # Election data version the payload was computed at
+        self.computed_at = 0.0
+        self.task = None
+
+
+def summary_delta(previous: dict, summary: dict, seq: int) -> dict:
+    """What changed between two real-time summaries of an election, as a delta mode message."""
+    previous_votes = {entry["candidate_id"]: entry["votes"] for entry in previous["candidate_distribution"]}
+    votes = {entry["candidate_id"]: entry["votes"] for entry in summary["candidate_distribution"]}
+    previous_sentiment = {entry["feedback_id"]: entry for entry in previous["observer_sentiment"]}
+    feedback_ids = {entry["feedback_id"] for entry in summary["observer_sentiment"]}
+    return {
+        "type": "delta",
+        "seq": seq,
+        "election_id": summary["election_id"],
+        "total_votes": summary["total_votes"],
+        "last_update": summary["last_update"],
+        # Candidates whose count changed; one that lost all its votes is sent with 0
+        "candidate_distribution": [
+            {"candidate_id": candidate_id, "votes": count}
+            for candidate_id, count in votes.items() if previous_votes.get(candidate_id) != count
+        ] + [
+            {"candidate_id": candidate_id, "votes": 0}
+            for candidate_id in previous_votes if candidate_id not in votes
+        ],
+        "observer_sentiment": [
+            entry for entry in summary["observer_sentiment"]
+            if previous_sentiment.get(entry["feedback_id"]) != entry
+        ],
+        "removed_feedback_ids": [feedback_id for feedback_id in previous_sentiment if feedback_id not in feedback_ids],
+    }
+
+
+class ElectionSummaryBroadcaster:
+    """
+    One producer task per election with connected WebSocket clients. Every interval it checks
+    the election's data version and only recomputes the real-time summary when a command changed
+    the election, or another worker announced a change to it on the broker (max_age bounds the
+    staleness if such a notice is lost). A summary that differs from the last one is serialized once
+    and sent to every subscriber; new subscribers get the latest one right away.
+
+    Delta mode subscribers get {"type": "snapshot", "seq": n, ...summary} first, then for every
+    change {"type": "delta", "seq": n + 1, ...} carrying only the candidates whose vote counts
+    changed and the feedback sentiments that are new or changed (plus removed feedback ids).
+    A client that sees a gap in the sequence, or a delta before its first snapshot, sends
+    "resync" and gets a new snapshot.
+
+    A send that takes longer than send_timeout disconnects that client, so one slow client never
+    holds up the others. The producer stops when its last subscriber leaves. Producers belong to the event loop that
+    started them, since they can only write to that loop's WebSockets.
+    """
+    def __init__(self, interval: float = REALTIME_SUMMARY_INTERVAL_SECONDS, max_age: float = REALTIME_SUMMARY_MAX_AGE_SECONDS,
+                 broker=broker, send_timeout: float = REALTIME_SUMMARY_SEND_TIMEOUT_SECONDS):
+        self.interval = interval
+        self.max_age = max_age
+        self.send_timeout = send_timeout
+        self.broker = broker
+        self._subscribed = False
+        self._channels = {}  # (event loop, election_id) -> _Channel
+        self.stats = {"computed": 0, "skipped": 0, "sent": 0, "dropped": 0, "resyncs": 0}
+
+    async def subscribe(self, election_id: int, websocket: WebSocket, mode: str = "full"):
+        if mode not in SUMMARY_MODES:
+            raise ValueError(f"Unknown summary mode: {mode}")
+        key = (asyncio.get_running_loop(), election_id)
+        channel = self._channels.get(key)
+        if not self._subscribed:
+            self._subscribed = True
+            self.broker.subscribe(ELECTION_CHANGES_CHANNEL, self._on_election_changes)
+        if channel is None:
+            channel = self._channels[key] = _Channel(election_id)
+            channel.task = asyncio.create_task(self._produce(channel))
+        channel.subscribers[websocket] = mode
+        if channel.payload is not None:
+            await self._send(channel, websocket, channel.payload if mode == "full" else self._snapshot(channel))
+
+    async def resync(self, election_id: int, websocket: WebSocket):
+        """Sends a delta mode subscriber the snapshot of the latest summary."""
+        channel = self._channels.get((asyncio.get_running_loop(), election_id))
+        if channel is not None and websocket in channel.subscribers and channel.summary is not None:
+            self.stats["resyncs"] += 1
+            await self._send(channel, websocket, self._snapshot(channel))
+
+    def unsubscribe(self, election_id: int, websocket: WebSocket):
+        key = (asyncio.get_running_loop(), election_id)
+        channel = self._channels.get(key)
+        if channel is None:
+            return
+        channel.subscribers.pop(websocket, None)
+        if not channel.subscribers:
+            channel.task.cancel()
+            del self._channels[key]
+
+    def _on_election_changes(self, _channel: str, message: dict):
+        # Called on the broker's thread; the next tick of each changed election recomputes
+        election_ids = message.get("election_ids")
+        for (loop, election_id), channel in list(self._channels.items()):
+            if election_ids is None or election_id in election_ids:
+                try:
+                    loop.call_soon_threadsafe(self._mark_stale, channel)
+                except RuntimeError:
+                    # Its event loop is gone
+                    pass
+
+    def _mark_stale(self, channel: _Channel):
+        channel.version = None
+
+    async def _produce(self, channel: _Channel):
+        while True:
+            try:
+                await self._tick(channel)
+            except Exception as e:
+                # Keep the subscribers; the next tick tries again
+                print(f"Real-time summary for election {channel.election_id} failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def _tick(self, channel: _Channel):
+        # Read before the query, so a vote landing while it runs is picked up on the next tick
+        version = election_versions.current(channel.election_id)
+        if version == channel.version and time.monotonic() - channel.computed_at < self.max_age:
+            self.stats["skipped"] += 1
+            return
+
+        query = RealTimeElectionSummaryQuery(election_id=channel.election_id)
+        summary = await query_bus.handle_async(query)
+        channel.version = version
+        channel.computed_at = time.monotonic()
+        self.stats["computed"] += 1
+
+        payload = self._encode(summary)
+        if payload == channel.payload:
+            return
+        previous, channel.summary, channel.payload, channel.snapshot = channel.summary, summary, payload, None
+        channel.seq += 1
+
+        delta = None
+        sends = []
+        for websocket, mode in list(channel.subscribers.items()):
+            if mode == "full":
+                sends.append(self._send(channel, websocket, payload))
+            elif previous is None:
+                sends.append(self._send(channel, websocket, self._snapshot(channel)))
+            else:
+                if delta is None:
+                    delta = self._encode(summary_delta(previous, summary, channel.seq))
+                sends.append(self._send(channel, websocket, delta))
+        await asyncio.gather(*sends)
+
+    def _snapshot(self, channel: _Channel) -> str:
+        if channel.snapshot is None:
+            channel.snapshot = self._encode({"type": "snapshot", "seq": channel.seq, **channel.summary})
+        return channel.snapshot
+
+    @staticmethod
+    def _encode(message: dict) -> str:
+        # Same encoding as WebSocket.send_json
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    async def _send(self, channel: _Channel, websocket: WebSocket, payload: str):
+        try:
+            await asyncio.wait_for(websocket.send_text(payload), self.send_timeout)
+            self.stats["sent"] += 1
+        except asyncio.TimeoutError:
+            print(f"Disconnecting slow real-time summary client of election {channel.election_id}")
+            channel.subscribers.pop(websocket, None)
+            self.stats["dropped"] += 1
+            asyncio.create_task(self._close(websocket, SLOW_CONSUMER_CLOSE_CODE))
+        except Exception as e:
+            # Closed, so its endpoint notices and unsubscribes it
+            print(f"Error sending real-time summary: {e}")
+            channel.subscribers.pop(websocket, None)
+            self.stats["dropped"] += 1
+            asyncio.create_task(self._close(websocket, SEND_ERROR_CLOSE_CODE))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int):
+        try:
+            await websocket.close(code=code)
+        except Exception:
+            pass
+
+    def shutdown(self):
+        for channel in self._channels.values():
+            channel.task.cancel()
+        self._channels.clear()
+
+    def status(self) -> dict:
+        return {
+            "elections": [
+                {"election_id": channel.election_id, "subscribers": len(channel.subscribers)}
+                for channel in list(self._channels.values())
+            ],
+            **self.stats,
+        }
+
+# Create a global instance
+summary_broadcaster = ElectionSummaryBroadcaster()
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSock
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.application.commands import MarkAllNotificationsReadCommand, MarkNotificationReadCommand
 from app.application.queries import GetNotificationsQuery, GetNotificationsSummaryQuery
 from app.application.query_bus import query_bus
@@ -27,6 +28,8 @@ def mark_notification_as_read(notification_id: int):
     command = MarkNotificationReadCommand(notification_id=notification_id)
     try:
         return command_bus.handle(command)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
     
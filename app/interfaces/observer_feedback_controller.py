@@ -1,11 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, Response
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from app.application.commands import SubmitFeedbackCommand
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.application.commands import BackfillFeedbackSentimentCommand, SubmitFeedbackCommand
 from app.application.queries import GetFeedbackByElectionQuery, GetFeedbackBySeverityQuery, GetFeedbackCategoryAnalyticsQuery, GetFeedbackExportQuery, GetIntegrityScoreQuery, GetObserverByIdQuery, GetObserverTrustScoresQuery, GetSentimentAnalysisQuery, GetSeverityDistributionQuery, GetTimePatternsQuery, GetTopObserversQuery
 from app.application.query_bus import query_bus
 from app.infrastructure.database import get_db
 from app.application.handlers import command_bus
+from app.security import get_current_admin
 
 router = APIRouter(prefix="/observer_feedback", tags=["Feedback"])
 templates = Jinja2Templates(directory="app/templates")
@@ -21,6 +23,8 @@ def submit_feedback(query: SubmitFeedbackCommand):
     
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -60,6 +64,12 @@ def get_sentiment_analysis():
     query = GetSentimentAnalysisQuery()
     return query_bus.handle(query)
 
+@router.post("/sentiment_analysis/backfill", dependencies=[Depends(get_current_admin)])
+def backfill_sentiment(batch_size: int = Query(500, gt=0, le=5000)):
+    """Scores feedback that was saved before sentiment scores were stored."""
+    command = BackfillFeedbackSentimentCommand(batch_size=batch_size)
+    return command_bus.handle(command)
+
 @router.get("/reliability_scores")
 def get_observer_trust_scores():
     query = GetObserverTrustScoresQuery()
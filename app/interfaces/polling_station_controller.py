@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.application.commands import CreatePollingStationCommand, DeletePollingStationCommand, UpdatePollingStationCommand
 from app.application.queries import GetPollingStationQuery, GetPollingStationsByElectionQuery
 from app.application.query_bus import query_bus
@@ -17,6 +18,8 @@ templates = Jinja2Templates(directory="app/templates")
 def create_polling_station(query: CreatePollingStationCommand):
     try:
         return command_bus.handle(query)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -7,6 +7,7 @@ from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSock
 from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.application.commands import BulkUpdateSubscriptionsCommand, UpdateSubscriptionCommand
 from app.application.queries import CorrelationAnalyticsQuery, EnhancedNeuralNetworkPredictiveAnalyticsQuery, EnhancedPredictiveSubscriptionAnalyticsQuery, GetSubscriptionAnalyticsQuery, GetSubscriptionsQuery, PredictiveSubscriptionAnalyticsQuery, SegmentSubscriptionAnalyticsQuery, SubscriptionConversionMetricsQuery, TimeSeriesSubscriptionAnalyticsQuery
 from app.application.query_bus import query_bus
@@ -14,6 +15,7 @@ from app.infrastructure.database import SessionLocal, get_db
 from app.application.handlers import command_bus
 from app.infrastructure.models import BulkSubscriptionResponse, NotificationSubscription, SubscriptionResponse
 from app.interfaces.managers.connection_manager import subscription_manager
+from starlette.concurrency import run_in_threadpool
 
 
 router = APIRouter(prefix="/subscriptions", tags=["Subscriptions"])
@@ -29,16 +31,21 @@ def update_subscription(user_id: int, alert_type: str, is_subscribed: bool):
     command = UpdateSubscriptionCommand(user_id=user_id, alert_type=alert_type, is_subscribed=is_subscribed)
     try:
         return command_bus.handle(command)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
     
 @router.put("/bulk", response_model=List[BulkSubscriptionResponse])
 async def bulk_update_subscriptions(command: BulkUpdateSubscriptionsCommand):
     try:
-        result = command_bus.handle(command)
+        result = await command_bus.handle_async(command)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
-    asyncio.create_task(subscription_manager.broadcast(command.user_id, {"subscriptions": result}))
+    # Published to the user's connections in every worker; slow clients don't hold up the response
+    await run_in_threadpool(subscription_manager.broadcast, command.user_id, {"subscriptions": result})
     return result
 
 @router.get("/analytics")
@@ -65,6 +72,8 @@ def time_series_analytics(user_id: int = Query(...),
         )
         
         return query_bus.handle(query)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -134,14 +143,16 @@ async def subscriptions_ws(websocket: WebSocket, user_id: int = Query(...)):
                 }
                 for s in subscriptions
             ]
-        await websocket.send_json(data)
+        # Through the connection's queue, so it can't interleave with a broadcast
+        subscription_manager.send(user_id, websocket, data)
         # Keep connection open.
         while True:
-            # This connection now waits indefinitely. You can implement a ping/keepalive if needed.
-            await asyncio.sleep(60)
+            # Clients don't send anything; waiting for a message is how a disconnect shows up
+            await websocket.receive_text()
     except WebSocketDisconnect:
-        subscription_manager.disconnect(user_id, websocket)
         print("User disconnected from subscriptions WS")
+    finally:
+        subscription_manager.disconnect(user_id, websocket)
 
 @router.get("/analytics/correlate_feedback", tags=["Analytics"])
 def correlate_feedback_analytics(query: CorrelationAnalyticsQuery = Depends()):
@@ -2,6 +2,7 @@ from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from app.application.query_bus import query_bus
 from app.application.queries import GetUserByEmailQuery, GetUserByIdQuery, GetUserProfileQuery, ListAdminsQuery, ListUsersQuery, UserStatisticsQuery, UsersByRoleQuery
 from app.infrastructure.database import get_db
@@ -53,7 +54,7 @@ async def render_login_form(request: Request, current_user: User = Depends(get_c
     # Create query command instance
     query = GetUserByEmailQuery(email=current_user)
     try:
-        user_profile = query_bus.handle(query)
+        user_profile = await query_bus.handle_async(query)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     return templates.TemplateResponse("profile.html", {
@@ -69,7 +70,7 @@ async def render_edit_form(request: Request, current_user: User = Depends(get_cu
     # Create query command instance
     query = GetUserByEmailQuery(email=current_user)
     try:
-        user_edit = query_bus.handle(query)
+        user_edit = await query_bus.handle_async(query)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     return templates.TemplateResponse("edit_user.html", {
@@ -101,7 +102,7 @@ async def login(email: str = Form(...), password: str = Form(...)):
     # Dispatch the command via the handler
     try:
         command = LoginUserCommand(email=email, password=password)  # Create the command correctly
-        access_token = command_bus.handle(command)
+        access_token = await command_bus.handle_async(command)
         print("Token created")
     except ValueError as e:
         raise HTTPException(status_code=401, detail='Invalid email or password')
@@ -154,7 +155,7 @@ async def get_user_profile(current_user: User = Depends(get_current_complete_use
     # Create query command instance
     query = GetUserProfileQuery(user_id=current_user.id)
     try:
-        user_profile = query_bus.handle(query)
+        user_profile = await query_bus.handle_async(query)
         return {"user": user_profile}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -195,6 +196,8 @@ def list_admins(
     except ValueError as e:
         print(f"Error listing admins: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -215,5 +218,7 @@ def user_statistics():
     try:
         result = query_bus.handle(query)
         return result
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting user statistics: {str(e)}")
\ No newline at end of file
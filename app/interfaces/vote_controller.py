@@ -1,26 +1,77 @@
 import asyncio
 import csv
+import json
 from io import StringIO
-from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
-from app.application.commands import CastVoteCommand, CastVoteCommandv2
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app.application.commands import BulkCastVotesCommand, CastVoteCommand, CastVoteCommandv2
 from app.application.queries import AnomalyDetectionQuery, DashboardAnalyticsQuery, GeolocationAnalyticsQuery, GeolocationTrendsQuery, GetCandidateVoteDistributionQuery, GetDetailedHistoricalComparisonsQuery, GetDetailedHistoricalComparisonsWithExternalQuery, GetElectionSummaryQuery, GetHistoricalTurnoutTrendsQuery, GetSeasonalTurnoutPredictionQuery, GetSentimentTrendQuery, GetTimeBasedVotingPatternsQuery, GetTurnoutConfidenceQuery, GetTurnoutPredictionQuery, GetVotesByElectionQuery, GetVotesByVoterQuery, HistoricalPollingStationTrendsQuery, PollingStationAnalyticsQuery, PredictiveVoterTurnoutQuery, RealTimeElectionSummaryQuery
 from app.application.query_bus import query_bus
 from app.infrastructure.database import get_db
 from app.application.handlers import command_bus
+from app.interfaces.http_caching import not_modified, snapshot_response
+from app.interfaces.managers.summary_broadcaster import SUMMARY_MODES, summary_broadcaster
 
 router = APIRouter(prefix="/votes", tags=["Votes"])
 templates = Jinja2Templates(directory="app/templates")
 
 @router.post("/")
-def cast_vote(query: CastVoteCommandv2, db: Session = Depends(get_db)):
+async def cast_vote(query: CastVoteCommandv2):
     try:
-        return command_bus.handle(query)
+        return await command_bus.handle_async(query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+def parse_bulk_votes(body: bytes, content_type: str) -> tuple[list, list | None]:
+    """
+    Splits a bulk upload into rows and the number to report each row under. NDJSON
+    rows are numbered by their line in the body (counting from 0, blank lines included),
+    and lines that are not valid JSON are kept as text so the handler can report them.
+    JSON array rows are numbered by their index, so no numbers are returned for them.
+    """
+    if content_type.split(";")[0].strip().lower() in NDJSON_CONTENT_TYPES:
+        rows = []
+        line_numbers = []
+        for line_number, line in enumerate(body.decode("utf-8").splitlines()):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                rows.append(line)
+            line_numbers.append(line_number)
+        return rows, line_numbers
+
+    try:
+        rows = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON body: {e}")
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of votes")
+    return rows, None
+
+@router.post("/bulk")
+async def bulk_cast_votes(request: Request):
+    """
+    Casts many votes in one request, e.g. when a polling station syncs an offline batch.
+    Accepts a JSON array, or NDJSON (one vote per line) sent as application/x-ndjson.
+    Valid rows are stored; invalid ones are returned in `errors` with their row index.
+    """
+    try:
+        rows, row_numbers = parse_bulk_votes(await request.body(), request.headers.get("content-type", ""))
+        return await command_bus.handle_async(BulkCastVotesCommand(rows=rows, row_numbers=row_numbers))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/elections/{election_id}/votes")
 def get_votes_by_election(election_id: int, db: Session = Depends(get_db)):
     query = GetVotesByElectionQuery(election_id=election_id)
@@ -42,13 +93,16 @@ def get_sentiment_trend(election_id: int):
     return query_bus.handle(query)
 
 @router.get("/analytics/candidate_distribution")
-def candidate_distribution(election_id: int):
-    query = GetCandidateVoteDistributionQuery(election_id=election_id)
+def candidate_distribution(request: Request, election_id: int, fresh: bool = False):
+    snapshot = snapshot_response(request, election_id, "candidate_distribution")
+    if snapshot is not None:
+        return snapshot
+    query = GetCandidateVoteDistributionQuery(election_id=election_id, fresh=fresh)
     return query_bus.handle(query)
 
 @router.get("/analytics/voting_patterns")
-def get_time_based_voting_patterns(election_id: int, interval: str = "hourly"):
-    query = GetTimeBasedVotingPatternsQuery(election_id=election_id, interval=interval)
+def get_time_based_voting_patterns(election_id: int, interval: str = "hourly", fresh: bool = False):
+    query = GetTimeBasedVotingPatternsQuery(election_id=election_id, interval=interval, fresh=fresh)
     return query_bus.handle(query)
 
 @router.get("/analytics/turnout_trends")
@@ -93,25 +147,38 @@ def get_detailed_historical_comparisons_with_external(election_ids: str):
     return query_bus.handle(query)
 
 @router.get("/analytics/dashboard")
-def get_dashboard(election_id: int):
+def get_dashboard(request: Request, response: Response, election_id: int):
+    cached = not_modified(request, response, election_id)
+    if cached is not None:
+        return cached
     query = DashboardAnalyticsQuery(election_id=election_id)
     return query_bus.handle(query)
 
 @router.get("/analytics/real_time_summary")
-def real_time_election_summary(election_id: int):
+def real_time_election_summary(request: Request, response: Response, election_id: int):
+    cached = not_modified(request, response, election_id)
+    if cached is not None:
+        return cached
     query = RealTimeElectionSummaryQuery(election_id=election_id)
     return query_bus.handle(query)
 
 @router.get("/analytics/geolocation")
-def get_geolocation_analytics(election_id: int):
-    query = GeolocationAnalyticsQuery(election_id=election_id)
+def get_geolocation_analytics(request: Request, election_id: int, fresh: bool = False):
+    snapshot = snapshot_response(request, election_id, "geolocation")
+    if snapshot is not None:
+        return snapshot
+    query = GeolocationAnalyticsQuery(election_id=election_id, fresh=fresh)
     return query_bus.handle(query)
 
 @router.get("/analytics/polling_station")
-def get_polling_station_analytics(election_id: int):
+def get_polling_station_analytics(request: Request, election_id: int):
     """
     Returns basic performance metrics for polling stations for the specified election.
+    Completed elections are served from their snapshot.
     """
+    snapshot = snapshot_response(request, election_id, "polling_station")
+    if snapshot is not None:
+        return snapshot
     query = PollingStationAnalyticsQuery(election_id=election_id)
     return query_bus.handle(query)
 
@@ -193,29 +260,34 @@ def export_election_results(
 @router.get("/analytics/region_trends")
 def get_geolocation_trends(
     election_id: int = Query(..., description="Election ID to fetch regional trends for"),
-    region: str = Query(None, description="Optional: Filter by a specific region")
+    region: str = Query(None, description="Optional: Filter by a specific region"),
+    fresh: bool = Query(False, description="Aggregate raw votes instead of the periodically refreshed view")
 ):
-    query = GeolocationTrendsQuery(election_id=election_id, region=region)
+    query = GeolocationTrendsQuery(election_id=election_id, region=region, fresh=fresh)
     return query_bus.handle(query)
 
 @router.websocket("/ws/election/{election_id}")
-async def realtime_election_summary_ws(websocket: WebSocket, election_id: int):
+async def realtime_election_summary_ws(websocket: WebSocket, election_id: int, mode: str = Query("full")):
     """
     Establish a WebSocket connection that continuously sends real-time election summary updates.
+
+    With mode=delta the first message is a snapshot and later ones carry only what changed,
+    each with a sequence number; send "resync" to get a new snapshot after a gap.
     """
+    if mode not in SUMMARY_MODES:
+        await websocket.close(code=1008)
+        return
     await websocket.accept()
+    # The summary is computed once per election and pushed to every client watching it
+    await summary_broadcaster.subscribe(election_id, websocket, mode)
     try:
         while True:
-            # Use our existing handler to get the real-time summary.
-            query = RealTimeElectionSummaryQuery(election_id=election_id)
-            summary = query_bus.handle(query)
-            
-            # Send the updated summary to the client.
-            await websocket.send_json(summary)
-            
-            # Wait a few seconds before sending the next update.
-            await asyncio.sleep(5)
+            # Waiting for a message is also how a disconnect shows up
+            if await websocket.receive_text() == "resync":
+                await summary_broadcaster.resync(election_id, websocket)
     except WebSocketDisconnect:
         # Handle disconnection gracefully.
         print("Client disconnected from real-time updates")
+    finally:
+        summary_broadcaster.unsubscribe(election_id, websocket)
 
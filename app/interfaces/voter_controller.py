@@ -4,6 +4,7 @@ from app.application.commands import RegisterVoterCommand, CastVoteCommand
 from app.application.handlers import HasVotedHandler, command_bus
 from app.application.queries import HasVotedQuery, InactiveVotersQuery, PollingStationAnalyticsQuery, VoterDetailsQuery, VotingStatusQuery
 from app.infrastructure.models import VoterUploadQuery
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 
 
 router = APIRouter()
@@ -15,6 +16,8 @@ def register_voter(command: RegisterVoterCommand):
         new_voter = command_bus.handle(command)  # Dispatch the command to the handler
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(e)}")
 
@@ -28,6 +31,8 @@ def cast_vote(voter_id: int, election_id: int, command: CastVoteCommand):
         return {"message": f"Vote cast successfully for {result['candidate']}"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         print(f"Error casting vote: {e}")
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
@@ -61,6 +66,8 @@ def voter_details(voter_id: int):
         return result
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
     
@@ -70,6 +77,8 @@ def inactive_voters():
     try:
         result = query_bus.handle(query)
         return result
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred.")
     
@@ -77,6 +86,8 @@ def inactive_voters():
 def bulk_voter_upload(query: VoterUploadQuery):
     try:
         return command_bus.handle(query)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
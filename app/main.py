@@ -1,10 +1,18 @@
 from fastapi.responses import HTMLResponse
+import logging
+import time
 import uvicorn
 from app.application.commands import CastVoteCommand, RegisterVoterCommand
+from app.application.data_versions import ELECTION_CHANGES_CHANNEL
 from app.application.handlers import command_bus
 from app.application.query_bus import query_bus
 from app.application.queries import GetAllElectionsQuery, GetElectionDetailsQuery, GetElectionResultsQuery, GetVotingPageDataQuery
-from app.infrastructure.database import engine, Base
+from app.infrastructure.analytics_views import analytics_refresher
+from app.infrastructure.broker import broker
+from app.infrastructure.reference_catalog import reference_catalog
+from app.infrastructure.sentiment_engine import sentiment_engine
+from app.infrastructure.database import dispose_async_engines, engine, forget_async_connections, Base
+from app.infrastructure.replica_routing import primary_only, track_request_writes
 from fastapi import Depends, FastAPI, HTTPException, Request
 from app.interfaces.voter_controller import router as voter_router
 from app.interfaces.election_controller import router as election_router
@@ -18,10 +26,19 @@ from app.interfaces.observer_feedback_controller import router as observer_feedb
 from app.interfaces.alert_controller import router as alert_router
 from app.interfaces.notification_controller import router as notification_router
 from app.interfaces.subscription_controller import router as subscription_router
+from app.interfaces.internal_controller import router as internal_router
+from app.interfaces.managers.summary_broadcaster import summary_broadcaster
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from fastapi.templating import Jinja2Templates
 
+from app.config import PRELOAD_HEAVY_MODULES, READ_YOUR_WRITES_SECONDS
 from app.security import get_current_user
+from app.utils.lazy_imports import preload
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
@@ -41,15 +58,98 @@ app.include_router(observer_feedback_router)
 app.include_router(alert_router)
 app.include_router(notification_router)
 app.include_router(subscription_router)
+app.include_router(internal_router)
 
 
 # Create tables in the database
 Base.metadata.create_all(bind=engine)
 
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # Pool exhaustion is a capacity problem, not a server bug: tell clients to retry
+    return JSONResponse(status_code=503, content={"detail": "Database is busy, please retry"}, headers={"Retry-After": "1"})
+
+@app.on_event("startup")
+async def start_async_engine():
+    # This loop opens its own asyncpg connections
+    await forget_async_connections()
+
+@app.on_event("startup")
+def start_analytics_refresher():
+    analytics_refresher.start()
+
+@app.on_event("startup")
+def follow_reference_data_changes():
+    # Reference data changed by other workers reloads this worker's catalog
+    reference_catalog.follow(broker, ELECTION_CHANGES_CHANNEL)
+
+@app.on_event("startup")
+async def start_broker():
+    # Waits for the listener to connect, so messages published right after startup are received
+    await run_in_threadpool(broker.start)
+
+@app.on_event("startup")
+async def preload_heavy_modules():
+    if PRELOAD_HEAVY_MODULES:
+        failed = await run_in_threadpool(preload)
+        if failed:
+            logger.warning("Could not preload: %s", failed)
+
+@app.on_event("shutdown")
+def stop_analytics_refresher():
+    analytics_refresher.stop()
+
+@app.on_event("shutdown")
+def stop_sentiment_workers():
+    sentiment_engine.shutdown()
+
+@app.on_event("shutdown")
+def stop_summary_producers():
+    summary_broadcaster.shutdown()
+
+@app.on_event("shutdown")
+def stop_broker():
+    broker.close()
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    # Close pooled asyncpg connections on the loop that opened them
+    await dispose_async_engines()
+
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """
+    Pins a client to the primary for READ_YOUR_WRITES_SECONDS after it ran a command,
+    so replica lag never hides its own write. Disabled when the window is 0.
+    """
+    if not READ_YOUR_WRITES_SECONDS:
+        return await call_next(request)
+
+    try:
+        pinned_until = float(request.cookies.get("read_primary_until", 0))
+    except ValueError:
+        pinned_until = 0
+    with track_request_writes() as writes:
+        if pinned_until > time.time():
+            with primary_only():
+                response = await call_next(request)
+        else:
+            response = await call_next(request)
+
+    if writes["wrote"]:
+        response.set_cookie(
+            key="read_primary_until",
+            value=str(time.time() + READ_YOUR_WRITES_SECONDS),
+            max_age=int(READ_YOUR_WRITES_SECONDS) + 1,
+            httponly=True,
+            samesite="lax",
+        )
+    return response
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request, current_user: str = Depends(get_current_user)):
     query = GetAllElectionsQuery()
-    elections = query_bus.handle(query)  # Dispatch the query to the handler
+    elections = await query_bus.handle_async(query)  # Dispatch the query to the handler
     is_logged_in = request.cookies.get("access_token") is not None  # Check if token exists
     # Pass elections to the template
     return templates.TemplateResponse("home.html", {"request": request, "elections": elections, "is_logged_in": is_logged_in})
@@ -58,7 +158,9 @@ async def home(request: Request, current_user: str = Depends(get_current_user)):
 async def cast_vote_page(request: Request, current_user: str = Depends(get_current_user)):
     query = GetVotingPageDataQuery()
     try:
-        page_data = query_bus.handle(query)
+        page_data = await query_bus.handle_async(query)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
     is_logged_in = request.cookies.get("access_token") is not None  # Check if token exists
@@ -88,9 +190,11 @@ async def get_results(request: Request, election_id: int, current_user: str = De
     is_logged_in = request.cookies.get("access_token") is not None  # Check if token exists
     query = GetElectionResultsQuery(election_id=election_id)  # Now using dynamic election_id
     try:
-        results = query_bus.handle(query)
+        results = await query_bus.handle_async(query)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
@@ -103,9 +207,11 @@ async def get_results(request: Request, election_id: int, current_user: str = De
 async def election_details(election_id: int, request: Request, current_user: str = Depends(get_current_user)):
     query = GetElectionDetailsQuery(election_id)
     try:
-        election_data = query_bus.handle(query)  # Dispatch the query to the handler
+        election_data = await query_bus.handle_async(query)  # Dispatch the query to the handler
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
@@ -121,9 +227,11 @@ async def cast_vote(voter_id: int, election_id: int, request: Request):
     # Dispatch the command with both voter_id and election_id
     command = CastVoteCommand(voter_id=voter_id, election_id=election_id, candidate=candidate)
     try:
-        result = command_bus.handle(command)
+        result = await command_bus.handle_async(command)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail="An unexpected error occurred")
 
@@ -141,7 +249,7 @@ async def register_voter(request: Request):
 
     command = RegisterVoterCommand(voter_id=voter_id, name=name)
     try:
-        new_voter = command_bus.handle(command)
+        new_voter = await command_bus.handle_async(command)
     except ValueError as e:
         return templates.TemplateResponse(
             "register.html", {"request": request, "error": str(e)}
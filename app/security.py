@@ -5,10 +5,12 @@ from passlib.context import CryptContext
 from jose import JWTError, jwt
 from app.config import SECRET_KEY, ALGORITHM
 from app.infrastructure.database import SessionLocal
+from app.infrastructure.token_cache import CachedUser, token_cache
 from app.infrastructure.user_repo import UserRepository
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login")
+# Optional: browsers send the token in the access_token cookie instead of the header
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/login", auto_error=False)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -26,6 +28,14 @@ def create_access_token(data: dict, expires_delta=None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def verify_token(token: str) -> dict:
+    """Decoded claims of a "Bearer <jwt>" token, from the token cache when it was verified before."""
+    claims, _ = token_cache.get(token)
+    if claims is None:
+        claims = jwt.decode(token.split(" ")[1], SECRET_KEY, algorithms=[ALGORITHM])
+        token_cache.set(token, claims)
+    return claims
+
 def get_current_user(request: Request):
     try:
         # Check if the token is present in cookies
@@ -33,8 +43,7 @@ def get_current_user(request: Request):
         if not token:
             raise HTTPException(status_code=401, detail="Missing token")
 
-        # Decode the token
-        payload = jwt.decode(token.split(" ")[1], SECRET_KEY, algorithms=[ALGORITHM])
+        payload = verify_token(token)
         email = payload.get("sub")
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -43,29 +52,39 @@ def get_current_user(request: Request):
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
 def get_current_complete_user( request: Request,token: str = Depends(oauth2_scheme)):
-    with SessionLocal() as db:
-        try:
-            # Check if the token is present in cookies
-            print("Cookies received:", request.cookies)
-            cookie_token = request.cookies.get("access_token")
-            print(f"Cookie token: {cookie_token}")
-            auth_header_token = token if token else None 
-            print(f"Auth header token: {auth_header_token}")
-            final_token = cookie_token or auth_header_token
-            print(f"Final token: {final_token}")
-            if not final_token:
-                raise HTTPException(status_code=401, detail="Authentication required")
-
-            # Decode the token
-            payload = jwt.decode(final_token.split(" ")[1], SECRET_KEY, algorithms=[ALGORITHM])
-            email = payload.get("sub")
-            user_repository = UserRepository(db)
+    """
+    The logged-in user as a CachedUser (id, name, email, role, region). The user is read from
+    the database once per token and reused until the token expires or the user is edited.
+    """
+    try:
+        # The cookie wins over the Authorization header, whose scheme OAuth2PasswordBearer strips
+        final_token = request.cookies.get("access_token") or (f"Bearer {token}" if token else None)
+        if not final_token:
+            raise HTTPException(status_code=401, detail="Authentication required")
 
-            # Retrieve user by email
-            
-            if email is None:
-                raise HTTPException(status_code=401, detail="Invalid token")
-            user = user_repository.get_user_by_email(email)
+        claims, user = token_cache.get(final_token)
+        if user is not None:
             return user
-        except (JWTError, IndexError):
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
\ No newline at end of file
+        if claims is None:
+            claims = jwt.decode(final_token.split(" ")[1], SECRET_KEY, algorithms=[ALGORITHM])
+        email = claims.get("sub")
+        if email is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+        with SessionLocal() as db:
+            user = UserRepository(db).get_user_by_email(email)
+            if user is None:
+                return None
+            user = CachedUser.from_user(user)
+        token_cache.set(final_token, claims, user)
+        return user
+    except (JWTError, IndexError):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+def get_current_admin(current_user: CachedUser = Depends(get_current_complete_user)):
+    """The logged-in user, if they are an admin. For operational endpoints."""
+    if current_user is None:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
@@ -0,0 +1,72 @@
+import importlib
+import threading
+import time
+
+# Heavy libraries only a few analytics endpoints need. They are imported on first use, so
+# web workers that never serve those endpoints don't pay for them at startup or in memory.
+HEAVY_MODULES = ["numpy", "pandas", "sklearn.linear_model", "keras.models", "keras.layers", "keras.optimizers"]
+
+
+class LazyModule:
+    """
+    Stands in for a module and imports it on first attribute access:
+        np = lazy_import("numpy")
+        np.array([1, 2])  # numpy is imported here
+    """
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_load_seconds"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    started = time.perf_counter()
+                    module = importlib.import_module(self._name)
+                    self.__dict__["_load_seconds"] = round(time.perf_counter() - started, 3)
+                    self.__dict__["_module"] = module
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r} ({'loaded' if self.loaded else 'not loaded'})>"
+
+
+_registry = {}  # module name -> LazyModule
+_registry_lock = threading.Lock()
+
+def lazy_import(name: str) -> LazyModule:
+    """The (shared) lazy stand-in for module `name`."""
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = LazyModule(name)
+        return _registry[name]
+
+def preload(names=None) -> dict:
+    """
+    Imports the given modules (default: HEAVY_MODULES) now, e.g. at startup of a worker pool
+    dedicated to analytics. Modules that aren't installed are reported rather than raised.
+    """
+    failed = {}
+    for name in names or HEAVY_MODULES:
+        try:
+            lazy_import(name).load()
+        except ImportError as e:
+            failed[name] = str(e)
+    return failed
+
+def status() -> dict:
+    with _registry_lock:
+        modules = dict(_registry)
+    return {
+        name: {"loaded": module.loaded, "load_seconds": module._load_seconds}
+        for name, module in sorted(modules.items())
+    }
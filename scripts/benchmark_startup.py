@@ -0,0 +1,90 @@
+"""
+Startup time and memory of a web worker, with the heavy analytics libraries imported lazily
+(the default) and eagerly (PRELOAD_HEAVY_MODULES=true, which is what every worker paid
+before app/utils/lazy_imports.py).
+
+Each run is a fresh interpreter that imports the application modules a worker loads (the
+handlers and every controller), then reports the elapsed time and its peak RSS. app.main
+itself isn't imported because it creates the tables on import.
+
+Usage:
+    python -m scripts.benchmark_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import importlib, json, resource, sys, time
+started = time.perf_counter()
+import app.application.handlers
+for name in {controllers!r}:
+    importlib.import_module(name)
+failed = {{}}
+if {eager!r}:
+    from app.utils.lazy_imports import preload
+    failed = preload()
+elapsed = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+# ru_maxrss is in kilobytes on Linux and in bytes on macOS
+peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+print(json.dumps({{"seconds": elapsed, "rss_mb": peak_mb, "failed": failed}}))
+"""
+
+CONTROLLERS = [
+    "app.interfaces.alert_controller",
+    "app.interfaces.audit_log_controller",
+    "app.interfaces.candidate_controller",
+    "app.interfaces.election_controller",
+    "app.interfaces.internal_controller",
+    "app.interfaces.notification_controller",
+    "app.interfaces.observer_controller",
+    "app.interfaces.observer_feedback_controller",
+    "app.interfaces.polling_station_controller",
+    "app.interfaces.subscription_controller",
+    "app.interfaces.user_controller",
+    "app.interfaces.vote_controller",
+    "app.interfaces.voter_controller",
+]
+
+
+def run_once(eager: bool) -> dict:
+    code = CHILD.format(controllers=CONTROLLERS, eager=eager)
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "PRELOAD_HEAVY_MODULES": "false"},
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure(eager: bool, runs: int) -> dict:
+    results = [run_once(eager) for _ in range(runs)]
+    return {
+        "seconds": statistics.median(result["seconds"] for result in results),
+        "rss_mb": statistics.median(result["rss_mb"] for result in results),
+        "failed": results[-1]["failed"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per mode (the median is reported)")
+    args = parser.parse_args()
+
+    eager = measure(True, args.runs)
+    lazy = measure(False, args.runs)
+
+    print(f"{'':8} {'startup (s)':>12} {'peak RSS (MB)':>14}")
+    print(f"{'eager':8} {eager['seconds']:>12.3f} {eager['rss_mb']:>14.1f}")
+    print(f"{'lazy':8} {lazy['seconds']:>12.3f} {lazy['rss_mb']:>14.1f}")
+    print(f"{'saved':8} {eager['seconds'] - lazy['seconds']:>12.3f} {eager['rss_mb'] - lazy['rss_mb']:>14.1f}")
+    if eager["failed"]:
+        print(f"\nNot installed, so not part of the eager numbers: {', '.join(eager['failed'])}")
+
+
+if __name__ == "__main__":
+    main()
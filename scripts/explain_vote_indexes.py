@@ -0,0 +1,112 @@
+"""
+Before/after EXPLAIN benchmark for the analytics indexes (alembic revision a41f8c2d7b65).
+
+For every analytics access path this prints the plan and execution time twice:
+  before -> inside a transaction that drops the indexes (rolled back afterwards)
+  after  -> with the indexes in place
+
+Nothing is changed permanently, but DROP INDEX takes an exclusive lock on each table
+until the "before" transaction is rolled back, so run it against a copy or off-peak.
+
+Usage:
+    python -m scripts.explain_vote_indexes --election-id 1 --user-id 1
+"""
+import argparse
+import re
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql
+
+from app.infrastructure.database import SessionLocal, engine
+from app.infrastructure.models import Candidate, Notification, ObserverFeedback, SubscriptionEvent, Vote
+
+INDEXES = [
+    "ix_votes_election_candidate",
+    "ix_votes_election_timestamp",
+    "ix_votes_election_region",
+    "ix_observer_feedback_election_timestamp",
+    "ix_notifications_user_read_created",
+    "ix_subscription_events_user_type_created",
+]
+
+
+def access_paths(db, election_id: int, user_id: int):
+    """The queries the indexes were added for, as the repositories build them."""
+    hour = func.date_trunc("hour", Vote.timestamp)
+    day = func.date_trunc("day", ObserverFeedback.timestamp)
+    return {
+        "candidate vote distribution": db.query(Candidate.id, Candidate.name, func.count(Vote.id))
+            .join(Vote, Vote.candidate_id == Candidate.id)
+            .filter(Vote.election_id == election_id)
+            .group_by(Candidate.id, Candidate.name),
+        "votes per candidate (dashboard / real-time)": db.query(Vote.candidate_id, func.count(Vote.id))
+            .filter(Vote.election_id == election_id)
+            .group_by(Vote.candidate_id),
+        "hourly voting pattern": db.query(hour, func.count(Vote.id))
+            .filter(Vote.election_id == election_id)
+            .group_by(hour)
+            .order_by(hour),
+        "votes per region (geolocation)": db.query(Vote.region, func.count(Vote.id))
+            .filter(Vote.election_id == election_id)
+            .group_by(Vote.region),
+        "observer feedback per day": db.query(day, func.count(ObserverFeedback.id))
+            .filter(ObserverFeedback.election_id == election_id)
+            .group_by(day)
+            .order_by(day),
+        "unread notifications": db.query(Notification)
+            .filter(Notification.user_id == user_id, Notification.is_read == False)
+            .order_by(Notification.created_at.desc()),
+        "subscription events by type": db.query(SubscriptionEvent.alert_type, func.count(SubscriptionEvent.id))
+            .filter(SubscriptionEvent.user_id == user_id)
+            .group_by(SubscriptionEvent.alert_type),
+    }
+
+
+def to_sql(query) -> str:
+    return str(query.statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def explain(connection, sql: str):
+    plan = [row[0] for row in connection.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"))]
+    match = re.search(r"Execution Time: ([\d.]+) ms", plan[-1])
+    return plan, float(match.group(1)) if match else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--election-id", type=int, default=1)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--plans", action="store_true", help="print the full plans, not just the timings")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        queries = {name: to_sql(query) for name, query in access_paths(db, args.election_id, args.user_id).items()}
+
+    results = {}
+    with engine.connect() as connection:
+        # Before: same data, indexes dropped inside a transaction that is never committed
+        transaction = connection.begin()
+        for index in INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        for name, sql in queries.items():
+            results[name] = {"before": explain(connection, sql)}
+        transaction.rollback()
+
+        for name, sql in queries.items():
+            results[name]["after"] = explain(connection, sql)
+        connection.rollback()
+
+    for name, runs in results.items():
+        before_plan, before_ms = runs["before"]
+        after_plan, after_ms = runs["after"]
+        print(f"\n=== {name} ===")
+        print(f"before: {before_ms} ms    after: {after_ms} ms")
+        if args.plans:
+            print("--- before ---")
+            print("\n".join(before_plan))
+            print("--- after ---")
+            print("\n".join(after_plan))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+import pytest
+from app.application.query_cache import query_cache
+from app.infrastructure.reference_catalog import reference_catalog
+from app.infrastructure.database import SessionLocal, async_engine
+from app.infrastructure.models import User
+from app.infrastructure.token_cache import token_cache
+from app.security import create_access_token
+
+
+@pytest.fixture(autouse=True)
+def clear_query_cache():
+    # Every test builds its own data with the same ids, so cached results must not leak between tests
+    query_cache.clear()
+    token_cache.clear()
+    reference_catalog.clear()
+    # Tables are dropped and recreated around every test; statements prepared by pooled asyncpg
+    # connections still refer to the old ones
+    async_engine.dialect._invalidate_schema_cache()
+    yield
+
+@pytest.fixture
+def admin_cookies():
+    # Operational endpoints require an admin; ids and email stay clear of the tests' own users
+    with SessionLocal() as db:
+        db.add(User(id=9999, name="Ops Admin", email="ops-admin@example.com", password="unused", role="admin"))
+        db.commit()
+    return {"access_token": f"Bearer {create_access_token({'sub': 'ops-admin@example.com'})}"}
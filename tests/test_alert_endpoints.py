@@ -248,6 +248,28 @@ def test_alerts_ws_with_alert(client, test_db, create_test_elections):
         assert found_alert.get("message") == "Test alert for websocket"
         assert found_alert.get("status") == "new"
 
+def test_alerts_ws_pushes_matching_changes(client, test_db, create_test_elections):
+    create_test_elections([{"id": 1, "name": "Watched Election"}, {"id": 2, "name": "Other Election"}])
+
+    with client.websocket_connect("/alerts/ws?election_id=1&alert_type=fraud") as websocket:
+        assert websocket.receive_json() == []
+
+        # Only the alert matching the client's filters is pushed
+        client.post("/alerts", params={"election_id": 2, "alert_type": "fraud", "message": "Elsewhere"})
+        client.post("/alerts", params={"election_id": 1, "alert_type": "system", "message": "Other type"})
+        created = client.post("/alerts", params={"election_id": 1, "alert_type": "fraud", "message": "Ballot stuffing"}).json()
+        pushed = websocket.receive_json()
+        assert [alert["id"] for alert in pushed] == [created["id"]]
+        assert pushed[0]["status"] == "new"
+
+        # A status change is pushed as well, so clients can drop the alert from their list
+        client.put(f"/alerts/{created['id']}", json={"alert_id": created["id"], "status": "resolved"})
+        pushed = websocket.receive_json()
+        assert [(alert["id"], alert["status"]) for alert in pushed] == [(created["id"], "resolved")]
+
+    gc.collect()
+    test_db.rollback()
+
 # ---------------------------------------------------------------------------
 # Test GET /alerts Endpoint
 # ---------------------------------------------------------------------------
@@ -4,6 +4,7 @@ from fastapi.testclient import TestClient
 from app.infrastructure.models import AuditLog, Candidate, Election, Observer, PollingStation, User, Voter
 from app.main import app  # Import the FastAPI instance from main.py
 from app.infrastructure.database import Base, SessionLocal, engine
+from app.infrastructure.reference_catalog import reference_catalog
 import gc
 
 @pytest.fixture(scope="module")
@@ -172,4 +173,60 @@ def test_candidate_not_found(test_db, client):
     assert response.json()["detail"] == "Candidate with ID 999 not found."
 
     test_db.rollback()
-    gc.collect()
\ No newline at end of file
+    gc.collect()
+
+def test_reference_catalog_reloads_after_candidate_update(test_db, create_test_candidates, create_test_elections, client):
+    create_test_elections([{"id": 1, "name": "Presidential Election"}])
+    create_test_candidates([{"id": 1, "name": "Candidate F", "party": "Old Party", "bio": "Traditional values.", "election_id": 1}])
+
+    # Loaded once, then served from memory
+    assert [candidate.name for candidate in reference_catalog.candidates(1)] == ["Candidate F"]
+    reloads = reference_catalog.status()["reloads"]
+    assert reference_catalog.candidate_id(1, "Candidate F") == 1
+    assert reference_catalog.status()["reloads"] == reloads
+
+    response = client.patch("/candidates/1", json={"candidate_id": 1, "name": "Candidate G"})
+    assert response.status_code == 200
+
+    # The command bumped the catalog version, so the next lookup sees the new name
+    assert [candidate.name for candidate in reference_catalog.candidates(1)] == ["Candidate G"]
+    assert reference_catalog.status()["reloads"] == reloads + 1
+    assert reference_catalog.candidate_id(1, "Candidate F") is None
+
+    test_db.rollback()
+    gc.collect()
+
+def test_pool_timeout_answered_with_503(test_db, create_test_elections, client, monkeypatch):
+    from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+    from app.application.handlers import command_bus
+
+    create_test_elections([{"id": 1, "name": "Presidential Election"}])
+
+    def exhausted_pool(command):
+        raise PoolTimeoutError("QueuePool limit of size 10 overflow 20 reached")
+
+    monkeypatch.setattr(command_bus, "handle", exhausted_pool)
+
+    # The route's catch-all must not turn the pool timeout into a 500
+    response = client.post("/candidates", json={"name": "Candidate A", "party": "Party X", "bio": "Bio", "election_id": 1})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    test_db.rollback()
+    gc.collect()
+
+def test_create_duplicate_candidate_rejected(test_db, create_test_elections, client):
+    create_test_elections([{"id": 1, "name": "Presidential Election"}])
+    request_data = {"name": "Candidate One", "party": "Progressive Party", "bio": "Bio", "election_id": 1}
+
+    response = client.post("/candidates", json=request_data)
+    assert response.status_code == 200
+
+    # A second row with the same name would get its own tally
+    response = client.post("/candidates", json=request_data)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Candidate Candidate One is already standing in election 1"
+    assert test_db.query(Candidate).filter(Candidate.election_id == 1).count() == 1
+
+    test_db.rollback()
+    gc.collect()
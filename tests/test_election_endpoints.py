@@ -1,7 +1,9 @@
 import gc
+import threading
 import pytest
+from sqlalchemy import text
 from fastapi.testclient import TestClient
-from app.infrastructure.models import Candidate, Election, User, Vote, Voter
+from app.infrastructure.models import Candidate, Election, ElectionTally, User, Vote, Voter
 from app.main import app  # Import the FastAPI instance from main.py
 from app.infrastructure.database import SessionLocal, Base, engine
 from tests.test_vote_endpoints import create_test_user_and_voter
@@ -30,8 +32,19 @@ def create_test_elections(test_db):
     def _create_elections(elections_data):
         elections = []
         for election_data in elections_data:
+            election_data = dict(election_data)
+            # "A,B,C" / "1,2,3" describe the ballot: one candidate and tally per entry
+            candidates = election_data.pop("candidates", "")
+            votes = election_data.pop("votes", "")
             election = Election(**election_data)
             test_db.add(election)
+            test_db.flush()
+            counts = list(map(int, votes.split(","))) if votes else []
+            for position, name in enumerate(candidates.split(",") if candidates else []):
+                candidate = Candidate(name=name, election_id=election.id)
+                test_db.add(candidate)
+                test_db.flush()
+                test_db.add(ElectionTally(election_id=election.id, candidate_id=candidate.id, count=counts[position] if position < len(counts) else 0))
             elections.append(election)
         test_db.commit()
         return elections
@@ -144,6 +157,46 @@ def test_end_election():
     get_response = client.get(f"/elections/elections/{election_id}/")
     assert get_response.status_code == 200
 
+def test_completed_election_served_from_snapshot(test_db):
+    # Arrange: a finished election with one vote counted
+    create_response = client.post(
+        "/elections/elections/new",
+        json={"name": "Snapshot Election", "candidates": ["Alice", "Bob"]},
+    )
+    election_id = create_response.json()["election_id"]
+    client.post("/voters/voters", json={"voter_id": 1, "name": "John Doe", "email": "john.doe@example.com", "password": "password123"})
+    client.post(
+        f"/voters/voters/1/elections/{election_id}/cast_vote/",
+        json={"voter_id": 1, "election_id": election_id, "candidate": "Alice"},
+    )
+    running = client.get(f"/elections/elections/{election_id}/results/")
+    assert running.headers["etag"].startswith("W/")
+
+    client.put(f"/elections/elections/{election_id}/end/")
+
+    # Act
+    response = client.get(f"/elections/elections/{election_id}/results/")
+
+    # Assert: same data, now with a strong ETag and an immutable Cache-Control
+    assert response.status_code == 200
+    assert response.json() == {"Alice": 1, "Bob": 0}
+    etag = response.headers["etag"]
+    assert not etag.startswith("W/")
+    assert "immutable" in response.headers["cache-control"]
+
+    # The snapshot, not the tallies, is served from now on
+    test_db.execute(text("UPDATE election_tallies SET count = 5 WHERE election_id = :id"), {"id": election_id})
+    test_db.commit()
+    assert client.get(f"/elections/elections/{election_id}/results/").json() == {"Alice": 1, "Bob": 0}
+
+    not_modified = client.get(f"/elections/elections/{election_id}/results/", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["etag"] == etag
+
+    distribution = client.get(f"/votes/analytics/candidate_distribution?election_id={election_id}")
+    assert distribution.headers["etag"] != etag
+    assert distribution.json()[0]["vote_count"] == 1
+
 def test_get_election_results():
     # Create an election
     create_response = client.post(
@@ -773,4 +826,139 @@ def test_turnout_prediction_multiple_past_votes(test_db, create_test_elections,
 
     test_db.rollback()
     gc.collect()
-    
\ No newline at end of file
+    
+def test_archive_votes_requires_completed_election(test_db):
+    create_response = client.post(
+        "/elections/elections/new",
+        json={"name": "Running Election", "candidates": ["Alice", "Bob"]},
+    )
+    election_id = create_response.json()["election_id"]
+
+    # Act
+    response = client.put(f"/elections/elections/{election_id}/archive-votes/")
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Only completed elections can be archived"}
+
+def test_archive_votes_detaches_partition(test_db):
+    # Arrange: a finished election with one vote counted
+    create_response = client.post(
+        "/elections/elections/new",
+        json={"name": "Finished Election", "candidates": ["Alice", "Bob"]},
+    )
+    election_id = create_response.json()["election_id"]
+    client.post("/voters/voters", json={"voter_id": 1, "name": "John Doe", "email": "john.doe@example.com", "password": "password123"})
+    client.post(
+        f"/voters/voters/1/elections/{election_id}/cast_vote/",
+        json={"voter_id": 1, "election_id": election_id, "candidate": "Alice"},
+    )
+    client.put(f"/elections/elections/{election_id}/end/")
+
+    # Act
+    response = client.put(f"/elections/elections/{election_id}/archive-votes/")
+
+    # Assert: the partition is detached and the results still come from the tallies
+    assert response.status_code == 200
+    assert response.json()["table"] == f"votes_e{election_id}"
+    results = client.get(f"/elections/elections/{election_id}/results/")
+    assert results.json() == {"Alice": 1, "Bob": 0}
+
+    # The detached table is no longer dropped with votes
+    test_db.execute(text(f"DROP TABLE IF EXISTS votes_e{election_id}"))
+    test_db.commit()
+
+def test_create_election_does_not_block_votes_in_flight(test_db):
+    # Arrange: a vote for another election is written but not yet committed
+    first_id = client.post(
+        "/elections/elections/new",
+        json={"name": "Running Election", "candidates": ["Alice"]},
+    ).json()["election_id"]
+    client.post("/voters/voters", json={"voter_id": 1, "name": "John Doe", "email": "john.doe@example.com", "password": "password123"})
+    candidate_id = test_db.query(Candidate.id).filter(Candidate.election_id == first_id).scalar()
+    test_db.add(Vote(voter_id=1, candidate_id=candidate_id, election_id=first_id))
+    test_db.flush()
+
+    # Act: creating an election (and its partition) must not wait for that transaction
+    responses = []
+    worker = threading.Thread(target=lambda: responses.append(client.post(
+        "/elections/elections/new",
+        json={"name": "New Election", "candidates": ["Bob"]},
+    )))
+    worker.start()
+    worker.join(timeout=10)
+    blocked = worker.is_alive()
+    test_db.rollback()
+    worker.join()
+
+    # Assert
+    assert not blocked
+    election_id = responses[0].json()["election_id"]
+    assert test_db.execute(text(f"SELECT to_regclass('votes_e{election_id}') IS NOT NULL")).scalar()
+
+def test_sharded_tally_sums_every_shard(test_db, create_test_elections):
+    from app.infrastructure.tally_repo import TallyRepository
+
+    election_id = create_test_elections([{"name": "Sharded Election", "candidates": "Alice,Bob"}])[0].id
+    alice, bob = [candidate.id for candidate in test_db.query(Candidate).order_by(Candidate.id)]
+    test_db.rollback()
+
+    with SessionLocal() as db:
+        tallies = TallyRepository(db, shards=4, strategy="hash")
+        for voter_id in range(10):
+            tallies.increment(election_id, alice, shard_key=voter_id)
+        tallies.increment(election_id, bob, amount=3, shard_key=1)
+        db.commit()
+
+        # Alice's votes are spread over several counter rows and added up when read
+        assert db.query(ElectionTally).filter(ElectionTally.candidate_id == alice).count() > 1
+        assert tallies.get_results(election_id) == [("Alice", 10), ("Bob", 3)]
+        assert tallies.get_total_votes(election_id) == 13
+
+def test_sharded_tally_counts_concurrent_votes(test_db, create_test_elections):
+    from concurrent.futures import ThreadPoolExecutor
+    from app.infrastructure.tally_repo import TallyRepository
+
+    election_id = create_test_elections([{"name": "Busy Election", "candidates": "Alice"}])[0].id
+    alice = test_db.query(Candidate.id).filter(Candidate.election_id == election_id).scalar()
+    test_db.rollback()
+
+    def cast(worker):
+        for _ in range(25):
+            with SessionLocal() as db:
+                TallyRepository(db, shards=4).increment(election_id, alice)
+                db.commit()
+
+    # Every vote is an atomic count + 1, so none is lost however the workers interleave
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(cast, range(8)))
+
+    with SessionLocal() as db:
+        assert TallyRepository(db, shards=4).get_results(election_id) == [("Alice", 200)]
+
+def test_sharded_results_cache_cleared_after_commit(test_db, create_test_elections):
+    from app.infrastructure import tally_repo
+    from app.infrastructure.tally_repo import TallyRepository
+
+    election_id = create_test_elections([{"name": "Cached Election", "candidates": "Alice"}])[0].id
+    alice = test_db.query(Candidate.id).filter(Candidate.election_id == election_id).scalar()
+    test_db.rollback()
+    tally_repo.clear_results_cache()
+
+    with SessionLocal() as reader, SessionLocal() as writer:
+        readers = TallyRepository(reader, shards=4)
+        writers = TallyRepository(writer, shards=4)
+        assert readers.get_results(election_id) == [("Alice", 0)]
+
+        # A rolled back vote leaves the cached results alone
+        writers.increment(election_id, alice)
+        writer.rollback()
+        assert election_id in tally_repo._results_cache
+
+        # Until the vote commits, the cache keeps the committed count instead of being refilled early
+        writers.increment(election_id, alice)
+        assert election_id in tally_repo._results_cache
+        writer.commit()
+        assert election_id not in tally_repo._results_cache
+        reader.rollback()
+        assert readers.get_results(election_id) == [("Alice", 1)]
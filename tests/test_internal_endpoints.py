@@ -0,0 +1,477 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+from app.application.queries import AnomalyDetectionQuery, GetElectionResultsQuery
+from app.application.query_bus import QueryBus
+from app.application.query_cache import query_cache
+from app.application.single_flight import SingleFlight
+from app.infrastructure.broker import InProcessBroker, PostgresBroker, RedisBroker
+from app.infrastructure.models import Election, User
+from app.infrastructure.replica_routing import ReplicaRouter, primary_only, reads_pinned_to_primary, replica_reads, routing_session_class
+from sqlalchemy import insert, select
+from app.main import app  # Import the FastAPI instance from main.py
+from app.security import create_access_token
+from app.infrastructure.database import Base, SessionLocal, engine
+
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown_db():
+    # Create tables for the test database
+    Base.metadata.create_all(bind=engine)
+    yield
+    # Drop all tables after the test
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+def test_db_pool_stats(client, admin_cookies):
+    # Act
+    response = client.get("/internal/db/pool", cookies=admin_cookies)
+
+    # Assert
+    assert response.status_code == 200
+    data = response.json()
+    assert "primary" in data
+    primary = data["primary"]
+    for key in ("pool_size", "checked_out", "idle", "overflow_in_use", "totals", "wait_ms"):
+        assert key in primary
+    assert primary["checked_out"] >= 0
+    assert "histogram" in primary["wait_ms"]
+
+def test_db_pool_stats_counts_checkouts(client, admin_cookies):
+    # Arrange: use a connection from the primary pool
+    before = client.get("/internal/db/pool", cookies=admin_cookies).json()["primary"]["totals"]["checkouts"]
+    with SessionLocal() as db:
+        db.connection()
+
+    # Act
+    after = client.get("/internal/db/pool", cookies=admin_cookies).json()["primary"]
+
+    # Assert
+    assert after["totals"]["checkouts"] > before
+    assert after["wait_ms"]["count"] > 0
+
+def test_analytics_views_fall_back_without_views(client, admin_cookies):
+    # The test schema comes from create_all, so the materialized views don't exist
+    # Act
+    response = client.post("/internal/analytics/views/refresh", cookies=admin_cookies)
+
+    # Assert: nothing to refresh, and analytics keep reading raw votes
+    assert response.status_code == 200
+    data = response.json()
+    assert data["refreshed"] is False
+    assert data["available"] is False
+    assert client.get("/votes/analytics/candidate_distribution?election_id=1").json() == []
+
+def test_internal_endpoints_require_admin(client):
+    # Act / Assert: anonymous callers and non-admins can't read the stats or trigger a refresh
+    assert client.get("/internal/cache").status_code == 401
+    assert client.post("/internal/analytics/views/refresh").status_code == 401
+
+    with SessionLocal() as db:
+        db.add(User(id=9998, name="Voter", email="refresh-voter@example.com", password="unused", role="voter"))
+        db.commit()
+    cookies = {"access_token": f"Bearer {create_access_token({'sub': 'refresh-voter@example.com'})}"}
+    assert client.get("/internal/cache", cookies=cookies).status_code == 403
+    assert client.post("/internal/analytics/views/refresh", cookies=cookies).status_code == 403
+
+def test_query_cache_hits_and_vote_invalidation(client, admin_cookies):
+    # Arrange: an election, a voter and one cached read of its results
+    election_id = client.post("/elections/elections/new", json={"name": "Cached Election", "candidates": ["Alice", "Bob"]}).json()["election_id"]
+    client.post("/voters/voters", json={"voter_id": 1, "name": "John Doe", "email": "john.doe@example.com", "password": "password123"})
+    assert client.get(f"/elections/elections/{election_id}/results/").json() == {"Alice": 0, "Bob": 0}
+
+    # Act: the second read is served from the cache, then a vote invalidates it
+    assert client.get(f"/elections/elections/{election_id}/results/").json() == {"Alice": 0, "Bob": 0}
+    stats = client.get("/internal/cache", cookies=admin_cookies).json()
+    client.post(
+        f"/voters/voters/1/elections/{election_id}/cast_vote/",
+        json={"voter_id": 1, "election_id": election_id, "candidate": "Alice"},
+    )
+
+    # Assert
+    assert stats["queries"]["GetElectionResultsQuery"] == {"hits": 1, "misses": 1}
+    assert client.get(f"/elections/elections/{election_id}/results/").json() == {"Alice": 1, "Bob": 0}
+    assert client.get("/internal/cache", cookies=admin_cookies).json()["queries"]["GetElectionResultsQuery"]["misses"] == 2
+
+def test_query_result_not_cached_when_invalidated_while_running():
+    class CastVote:
+        def invalidates(self):
+            return ["election:1:results"]
+
+    class ResultsHandler:
+        def __init__(self):
+            self.calls = 0
+
+        def handle(self, query):
+            self.calls += 1
+            result = {"Alice": self.calls - 1}
+            if self.calls == 1:
+                # A vote commits and invalidates after the read, before the bus caches the result
+                query_cache.invalidate(CastVote())
+            return result
+
+    handler = ResultsHandler()
+    bus = QueryBus()
+    bus.register_handler(GetElectionResultsQuery, handler)
+
+    # The stale read is returned to its caller but not cached; the next read sees the vote
+    assert bus.handle(GetElectionResultsQuery(election_id=1)) == {"Alice": 0}
+    assert bus.handle(GetElectionResultsQuery(election_id=1)) == {"Alice": 1}
+    assert bus.handle(GetElectionResultsQuery(election_id=1)) == {"Alice": 1}
+    assert handler.calls == 2
+
+def test_concurrent_identical_queries_share_one_execution(client, admin_cookies):
+    # Arrange: a slow handler on its own bus, counting how often it runs
+    calls = []
+    lock = threading.Lock()
+
+    class SlowAnomalyHandler:
+        def handle(self, query):
+            with lock:
+                calls.append(query.election_id)
+            time.sleep(0.2)
+            return {"election_id": query.election_id, "anomalies": []}
+
+    bus = QueryBus()
+    bus.register_handler(AnomalyDetectionQuery, SlowAnomalyHandler())
+    before = client.get("/internal/query_coalescing", cookies=admin_cookies).json()
+
+    # Act: 20 concurrent callers, asking about two elections
+    with ThreadPoolExecutor(max_workers=20) as executor:
+        results = list(executor.map(lambda i: bus.handle(AnomalyDetectionQuery(election_id=i % 2)), range(20)))
+
+    # Assert: one execution per distinct query, every caller gets its own copy of the result
+    assert sorted(calls) == [0, 1]
+    assert results[0] == {"election_id": 0, "anomalies": []}
+    assert results[1] == {"election_id": 1, "anomalies": []}
+    assert results[0] is not results[2]
+    after = client.get("/internal/query_coalescing", cookies=admin_cookies).json()
+    assert after["followers"] - before["followers"] == 18
+    assert after["in_flight"] == 0
+
+def test_cancelled_leader_does_not_fail_followers():
+    flight = SingleFlight()
+    key = ("query", 1)
+    runs = []
+
+    async def slow_query():
+        runs.append(1)
+        await asyncio.sleep(0.1)
+        return {"answer": 42}
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do_async(key, slow_query))
+        await asyncio.sleep(0)
+        followers = [asyncio.create_task(flight.do_async(key, slow_query)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        # The leader's client goes away, and so does one follower's
+        leader.cancel()
+        followers[0].cancel()
+        return await followers[1]
+
+    # The shared call still completes once, for the follower that is still waiting
+    assert asyncio.run(scenario()) == {"answer": 42}
+    assert runs == [1]
+    assert flight.status()["in_flight"] == 0
+
+def test_lazy_modules_loaded_on_first_use(client, admin_cookies):
+    # Arrange: numpy stands behind a lazy module until someone uses it
+    from app.utils.lazy_imports import lazy_import
+    np = lazy_import("numpy")
+
+    # Act
+    assert np.std([1, 1, 1]) == 0
+    response = client.get("/internal/lazy_modules", cookies=admin_cookies)
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json()["numpy"]["loaded"] is True
+    assert "pandas" in response.json()
+
+def test_in_process_broker_delivers_to_subscribers(client, admin_cookies):
+    # Arrange
+    broker = InProcessBroker()
+    received = []
+    broker.subscribe("votes", lambda channel, message: received.append((channel, message)))
+
+    # Act
+    broker.publish("votes", {"election_id": 1})
+    broker.publish("alerts", {"ids": [2]})
+
+    # Assert: only the subscribed channel, and bad channel names are refused
+    assert received == [("votes", {"election_id": 1})]
+    with pytest.raises(ValueError):
+        broker.subscribe("votes; DROP TABLE votes", lambda channel, message: None)
+
+    response = client.get("/internal/broker", cookies=admin_cookies)
+    assert response.status_code == 200
+    assert "channels" in response.json()
+
+class FakeRedis:
+    """Just enough of redis-py's publish/pubsub for RedisBroker, shared by every 'worker'."""
+    def __init__(self):
+        self.subscribers = []
+
+    def publish(self, channel, data):
+        for pubsub in list(self.subscribers):
+            if channel in pubsub.channels:
+                pubsub.messages.put({"type": "message", "channel": channel.encode(), "data": data.encode()})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        pubsub = FakePubSub()
+        self.subscribers.append(pubsub)
+        return pubsub
+
+class FakePubSub:
+    def __init__(self):
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, *channels):
+        self.channels.update(channels)
+
+    def get_message(self, timeout=0.0):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+def test_redis_broker_reaches_every_worker():
+    # Arrange: two workers' brokers on one (fake) Redis
+    redis = FakeRedis()
+    workers = [RedisBroker(client=redis, poll_seconds=0.05) for _ in range(2)]
+    received = [queue.Queue() for _ in workers]
+    for broker, inbox in zip(workers, received):
+        broker.subscribe("subscriptions", lambda channel, message, inbox=inbox: inbox.put(message))
+        broker.start()
+
+    try:
+        # Act: one worker publishes
+        workers[0].publish("subscriptions", {"user_id": 7, "message": {"subscriptions": []}})
+
+        # Assert: both workers deliver it, the publisher included
+        for inbox in received:
+            assert inbox.get(timeout=2) == {"user_id": 7, "message": {"subscriptions": []}}
+        assert workers[0].status()["connected"] is True
+    finally:
+        for broker in workers:
+            broker.close()
+
+def test_postgres_broker_notifies_with_the_transaction():
+    broker = PostgresBroker(engine, poll_seconds=0.05)
+    received = queue.Queue()
+    broker.subscribe("alerts", lambda channel, message: received.put(message))
+    broker.start()
+
+    try:
+        with SessionLocal() as db:
+            # A rolled back NOTIFY is never delivered; a committed one is
+            broker.publish_on_commit(db, "alerts", {"ids": [1]})
+            db.rollback()
+            broker.publish_on_commit(db, "alerts", {"ids": [2]})
+            db.commit()
+        assert received.get(timeout=2) == {"ids": [2]}
+        time.sleep(0.2)
+        assert received.empty()
+    finally:
+        broker.close()
+
+def test_postgres_broker_carries_messages_too_large_for_notify():
+    broker = PostgresBroker(engine, poll_seconds=0.05)
+    received = queue.Queue()
+    broker.subscribe("subscriptions", lambda channel, message: received.put(message))
+    broker.start()
+    large = {"user_id": 7, "message": {"subscriptions": ["x" * 100] * 200}}
+
+    try:
+        # Stored in broker_messages and notified by id, on its own and with a transaction
+        broker.publish("subscriptions", large)
+        with SessionLocal() as db:
+            broker.publish_on_commit(db, "subscriptions", large)
+            db.commit()
+        assert received.get(timeout=2) == large
+        assert received.get(timeout=2) == large
+    finally:
+        broker.close()
+
+def test_incomplete_broker_backend_cannot_be_created():
+    from app.infrastructure.broker import _ListenerThreadBroker
+
+    class SendOnlyBroker(_ListenerThreadBroker):
+        def _send(self, channel, payload):
+            pass
+
+    with pytest.raises(TypeError):
+        SendOnlyBroker()
+
+def test_broker_subscribe_does_not_start_the_listener():
+    redis = FakeRedis()
+    broker = RedisBroker(client=redis, poll_seconds=0.05)
+
+    # Subscribing before startup neither connects nor waits
+    broker.subscribe("alerts", lambda channel, message: None)
+    assert broker.status()["connected"] is False
+    assert redis.subscribers == []
+
+    # The startup hook's start() listens on every channel subscribed so far
+    try:
+        broker.start()
+        assert broker.status()["connected"] is True
+        assert redis.subscribers[0].channels == {"alerts"}
+    finally:
+        broker.close()
+
+def test_async_commands_publish_changes_off_the_event_loop(monkeypatch):
+    from app.application.handlers import CommandBus, election_versions
+
+    class ChangeElection:
+        def changes_elections(self):
+            return [1]
+
+    class AsyncHandler:
+        async def handle_async(self, command):
+            return "done"
+
+    published_on = []
+    monkeypatch.setattr(election_versions, "bump", lambda election_ids=None, announce=True: published_on.append(threading.get_ident()))
+    bus = CommandBus()
+    bus.register_handler(ChangeElection, AsyncHandler())
+
+    async def handle():
+        return threading.get_ident(), await bus.handle_async(ChangeElection())
+
+    loop_thread, result = asyncio.run(handle())
+
+    # The broker publish ran on a worker thread, not on the event loop
+    assert result == "done"
+    assert len(published_on) == 1
+    assert published_on[0] != loop_thread
+
+def test_election_changes_announced_once_per_burst():
+    from app.application.data_versions import ELECTION_CHANGES_CHANNEL, ElectionVersions
+    from app.infrastructure.version_store import InMemoryVersionStore
+
+    broker = InProcessBroker()
+    received = queue.Queue()
+    broker.subscribe(ELECTION_CHANGES_CHANNEL, lambda channel, message: received.put(message))
+    versions = ElectionVersions(InMemoryVersionStore(), broker, coalesce_seconds=0.05)
+
+    # A burst of votes is one message; a failed command moves the version without announcing it
+    before = versions.current(3)
+    versions.bump([1])
+    versions.bump([2, 1])
+    versions.bump([3], announce=False)
+    assert versions.current(3) != before
+    assert received.get(timeout=2) == {"election_ids": [1, 2]}
+    time.sleep(0.2)
+    assert received.empty()
+
+def test_reference_data_changes_clear_other_workers_catalogs():
+    from app.application.data_versions import ELECTION_CHANGES_CHANNEL, ElectionVersions
+    from app.infrastructure.reference_catalog import ReferenceCatalog
+    from app.infrastructure.version_store import InMemoryVersionStore
+
+    class UpdateCandidate:
+        changes_reference_data = True
+
+    # Two workers, each with its own version store, sharing a broker
+    broker = InProcessBroker()
+    versions = ElectionVersions(InMemoryVersionStore(), broker, coalesce_seconds=0.05)
+    other_catalog = ReferenceCatalog(InMemoryVersionStore())
+    other_catalog.follow(broker, ELECTION_CHANGES_CHANNEL)
+    received = queue.Queue()
+    broker.subscribe(ELECTION_CHANGES_CHANNEL, lambda channel, message: received.put(message))
+    other_catalog.elections()
+    assert other_catalog.status()["loaded"]
+
+    versions.bump_for(UpdateCandidate())
+
+    assert received.get(timeout=2) == {"election_ids": [], "reference_data": True}
+    assert not other_catalog.status()["loaded"]
+
+def test_replica_router_sends_reads_to_replicas():
+    primary, replica_a, replica_b = object(), object(), object()
+    router = ReplicaRouter(primary, [replica_a, replica_b])
+    session = routing_session_class(router)()
+
+    # Outside the QueryBus nothing asked for a replica
+    assert session.get_bind(clause=select(Election)) is primary
+
+    with replica_reads():
+        # A session keeps reading from one replica; the next session gets the other
+        assert session.get_bind(clause=select(Election)) is replica_a
+        assert session.get_bind(clause=select(Election)) is replica_a
+        assert session.get_bind(clause=insert(Election)) is primary
+        other_session = routing_session_class(router)()
+        assert other_session.get_bind(clause=select(Election)) is replica_b
+        other_session.close()
+        session.close()
+        assert session.get_bind(clause=select(Election)) is replica_a
+
+        # Commands (and read-your-writes windows) pin the primary, even for queries they dispatch
+        with primary_only():
+            assert session.get_bind(clause=select(Election)) is primary
+            with replica_reads():
+                assert session.get_bind(clause=select(Election)) is primary
+    session.close()
+
+def test_replica_router_keeps_writing_sessions_on_primary():
+    primary, replica = object(), object()
+    router = ReplicaRouter(primary, [replica])
+    session = routing_session_class(router)()
+
+    with replica_reads():
+        session.add(Election(name="Pending Election"))
+        # Pending changes would be autoflushed, so the read goes where they are
+        assert session.get_bind(clause=select(Election)) is primary
+
+        session.info.clear()
+        session.expunge_all()
+        assert session.get_bind(clause=select(Election)) is replica
+
+        # A session that has flushed keeps reading its own writes from the primary
+        session.dispatch.before_flush(session, None, None)
+        assert session.get_bind(clause=select(Election)) is primary
+    session.close()
+
+def test_read_your_writes_cookie_pins_the_primary(client, monkeypatch):
+    import app.main as main_module
+    from app.interfaces import candidate_controller
+
+    monkeypatch.setattr(main_module, "READ_YOUR_WRITES_SECONDS", 5)
+    seen = []
+
+    def record_role(query):
+        seen.append(reads_pinned_to_primary())
+        return {"id": query.candidate_id}
+
+    monkeypatch.setattr(candidate_controller.query_bus, "handle", record_role)
+    client.cookies.clear()
+
+    # A plain read is not pinned and sets no cookie
+    response = client.get("/candidates/1")
+    assert response.status_code == 200
+    assert "read_primary_until" not in response.cookies
+
+    # Running a command opens the read-your-writes window
+    response = client.post("/elections/elections/new", json={"name": "Window Election", "candidates": ["Candidate A"]})
+    assert response.status_code == 200
+    assert float(response.cookies["read_primary_until"]) > time.time()
+
+    # Later reads from that client go to the primary
+    response = client.get("/candidates/1")
+    assert response.status_code == 200
+    assert seen == [False, True]
+    client.cookies.clear()
@@ -3,9 +3,11 @@ from datetime import datetime
 import io
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import update
 from app.infrastructure.models import Candidate, Election, Observer, ObserverFeedback, User, Voter
 from app.main import app  # Import the FastAPI instance from main.py
 from app.infrastructure.database import Base, SessionLocal, engine
+from app.infrastructure.sentiment_engine import SentimentEngine
 import gc
 
 @pytest.fixture(scope="module")
@@ -666,6 +668,42 @@ def test_negative_sentiment_detection(test_db, create_test_feedback, create_test
     test_db.rollback()
     gc.collect()
 
+def test_sentiment_stored_on_insert_and_backfilled(test_db, create_test_feedback, create_test_elections, create_test_observers, client, admin_cookies):
+    create_test_elections([{"id": 1, "name": "Presidential Election"}])
+    create_test_observers([
+        {"id": 1, "name": "Observer A", "email": "observerA@example.com", "election_id": 1, "organization": "Group X"},
+    ])
+    create_test_feedback([
+        {"id": 1, "observer_id": 1, "election_id": 1, "description": "The voting process was smooth and well-managed.", "severity": "LOW"},
+        {"id": 2, "observer_id": 1, "election_id": 1, "description": "Suspected bad ballot tampering at multiple locations.", "severity": "HIGH"},
+    ])
+
+    # The score is saved with the feedback
+    stored = test_db.query(ObserverFeedback).order_by(ObserverFeedback.id).all()
+    assert [feedback.sentiment_category for feedback in stored] == ["Positive", "Negative"]
+
+    # Arrange: simulate a row saved before scores were stored
+    test_db.execute(update(ObserverFeedback).where(ObserverFeedback.id == 2).values(sentiment_score=None, sentiment_category=None))
+    test_db.commit()
+
+    # Act
+    response = client.post("/observer_feedback/sentiment_analysis/backfill", cookies=admin_cookies)
+
+    # Assert
+    assert response.status_code == 200
+    assert response.json() == {"scored": 1}
+    test_db.expire_all()
+    assert test_db.get(ObserverFeedback, 2).sentiment_category == "Negative"
+    assert client.post("/observer_feedback/sentiment_analysis/backfill", cookies=admin_cookies).json() == {"scored": 0}
+
+    # Only admins may start a backfill, in batches of at most 5000
+    assert client.post("/observer_feedback/sentiment_analysis/backfill").status_code == 401
+    assert client.post("/observer_feedback/sentiment_analysis/backfill?batch_size=0", cookies=admin_cookies).status_code == 422
+    assert client.post("/observer_feedback/sentiment_analysis/backfill?batch_size=5001", cookies=admin_cookies).status_code == 422
+
+    test_db.rollback()
+    gc.collect()
+
 def test_sentiment_analysis_no_feedback(test_db, client):
     # Act: Call the endpoint with an empty dataset
     response = client.get("/observer_feedback/sentiment_analysis")
@@ -1004,4 +1042,55 @@ def test_feedback_category_analytics_no_feedback( test_db, client, create_test_e
     assert data == []
 
     test_db.rollback()
-    gc.collect()
\ No newline at end of file
+    gc.collect()
+def test_sentiment_engine_scores_large_batches_in_worker_processes():
+    # len is picklable, so it can run in the spawned workers; chunks of 2 make 3 chunks here
+    sentiment = SentimentEngine(scorer=len, workers=2, chunk_size=2)
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    try:
+        assert sentiment.score_batch(texts) == [1, 2, 3, 4, 5]
+        assert sentiment.stats["parallel_batches"] == 1
+
+        # Small batches are scored in the calling thread
+        assert sentiment.score_batch(["ffffff"]) == [6]
+        assert sentiment.stats["parallel_batches"] == 1
+    finally:
+        sentiment.shutdown()
+
+def test_sentiment_engine_memoizes_identical_texts():
+    calls = []
+
+    def scorer(text):
+        calls.append(text)
+        return 0.5 if "good" in text else -0.5
+
+    sentiment = SentimentEngine(scorer=scorer, workers=1, memo_size=2)
+
+    # Duplicates within a batch and across batches are scored once
+    assert sentiment.score_batch(["good", "bad", "good"]) == [0.5, -0.5, 0.5]
+    assert sentiment.score("bad") == -0.5
+    assert calls == ["good", "bad"]
+    assert sentiment.stats["memo_hits"] == 1
+
+    # The memo keeps the most recently used texts only
+    sentiment.score("neutral")
+    sentiment.score("good")
+    assert calls == ["good", "bad", "neutral", "good"]
+
+def test_sentiment_engine_falls_back_when_pool_breaks(monkeypatch):
+    from concurrent.futures.process import BrokenProcessPool
+
+    class BrokenPool:
+        def map(self, *args):
+            raise BrokenProcessPool("A worker process terminated abruptly")
+
+        def shutdown(self, wait=True, cancel_futures=False):
+            pass
+
+    sentiment = SentimentEngine(scorer=len, workers=2, chunk_size=1)
+    sentiment._pool = BrokenPool()
+
+    # The batch is scored in the calling thread and the broken pool is dropped
+    assert sentiment.score_batch(["a", "bb", "ccc"]) == [1, 2, 3]
+    assert sentiment._pool is None
+    assert sentiment.stats["parallel_batches"] == 0
@@ -579,6 +579,30 @@ def test_realtime_subscription_update(client, test_db, create_test_voters):
         subs = updated_msg["subscriptions"]
         assert any(s["alert_type"] == "fraud" and s["is_subscribed"] is False for s in subs)
 
+def test_subscription_broadcast_queued_per_connection(client, test_db, create_test_voters, admin_cookies):
+    create_test_voters(
+        [{"id": 1, "name": "Active Voter 1", "email": "active1@example.com", "role": "voter"}],
+        [{"user_id": 1, "has_voted": False}],
+    )
+
+    with client.websocket_connect("/subscriptions/ws?user_id=1") as first, client.websocket_connect("/subscriptions/ws?user_id=1") as second:
+        first.receive_json()
+        second.receive_json()
+        stats = client.get("/internal/subscription_connections", cookies=admin_cookies).json()
+        assert stats["connections"] == 2
+        assert stats["queued"] == 0
+
+        payload = {"user_id": 1, "updates": [{"alert_type": "fraud", "is_subscribed": True}]}
+        assert client.put("/subscriptions/bulk", json=payload).status_code == 200
+
+        # Each connection gets the broadcast from its own queue
+        for websocket in (first, second):
+            subs = websocket.receive_json()["subscriptions"]
+            assert any(s["alert_type"] == "fraud" and s["is_subscribed"] is True for s in subs)
+
+    gc.collect()
+    test_db.rollback()
+
 def test_subscription_analytics_empty(client, test_db, create_test_voters):
 
     gc.collect()
@@ -959,6 +983,29 @@ def test_arima_predictive_endpoint(client, test_db, create_conversion_test_event
         assert "predicted_changes" in item
         assert isinstance(item["predicted_changes"], float)
 
+def test_arima_forecast_reuses_fitted_model(client, test_db, create_conversion_test_event, admin_cookies):
+    # Arrange: ten days of events
+    user_id = 1
+    alert_type = "anomaly"
+    now = datetime.now(timezone.utc)
+    for day in range(10):
+        for _ in range(day + 1):
+            create_conversion_test_event(user_id, alert_type, new_value=True, created_at=now - timedelta(days=10 - day), old_value=False)
+    params = {"user_id": user_id, "alert_type": alert_type, "forecast_days": 3}
+
+    # Act: the same forecast twice
+    first = client.get("/subscriptions/analytics/predict/arima", params=params)
+    hits = client.get("/internal/forecast_models", cookies=admin_cookies).json()["hits"]
+    second = client.get("/subscriptions/analytics/predict/arima", params=params)
+
+    gc.collect()
+    test_db.rollback()
+
+    # Assert: the second forecast comes from the stored model
+    assert first.status_code == 200
+    assert second.json() == first.json()
+    assert client.get("/internal/forecast_models", cookies=admin_cookies).json()["hits"] == hits + 1
+
 def test_neural_network_predictive_endpoint(client, test_db, create_conversion_test_event):
 
     gc.collect()
@@ -5,6 +5,7 @@ from fastapi.testclient import TestClient
 from app.main import app  # Import the FastAPI instance from main.py
 from app.infrastructure.database import Base, SessionLocal, engine
 from app.infrastructure.models import User, Voter
+from app.infrastructure.token_cache import token_cache
 from app.security import hash_password
 
 # Create a TestClient for the FastAPI app
@@ -351,6 +352,40 @@ def test_get_user_profile(test_db):
     test_db.rollback()
     gc.collect()
 
+def test_verified_token_cached_until_role_update(test_db):
+    user = User(
+        name="Cached User",
+        email="cached@example.com",
+        password=hash_password("securepassword")
+    )
+    test_db.add(user)
+    test_db.commit()
+
+    client.post("/users/login", data={"email": "cached@example.com", "password": "securepassword"})
+    cookies = {"access_token": client.cookies.get("access_token")}
+    # The cookie jar keeps the value quoted (it contains a space); the server caches it unquoted
+    access_token = cookies["access_token"].strip('"')
+
+    # The first request verifies the token and loads the user; the second reuses both
+    assert client.get("users/users/profile", cookies=cookies).status_code == 200
+    _, cached_user = token_cache.get(access_token)
+    assert cached_user.id == user.id
+    assert cached_user.role == "voter"
+    hits = token_cache.stats["hits"]
+    assert client.get("users/users/profile", cookies=cookies).status_code == 200
+    assert token_cache.stats["hits"] > hits
+
+    # Changing the role drops the cached user, so the next request sees the new role
+    response = client.put(f"/users/{user.id}/role", json={"user_id": user.id, "role": "admin"})
+    assert response.status_code == 200
+    assert token_cache.get(access_token) == (None, None)
+    assert client.get("users/users/profile", cookies=cookies).status_code == 200
+    _, cached_user = token_cache.get(access_token)
+    assert cached_user.role == "admin"
+
+    test_db.rollback()
+    gc.collect()
+
 def test_get_user_by_id_success(test_db):
     # Arrange: Create a test user
     user = User(
@@ -3,9 +3,10 @@ from datetime import datetime, timedelta, timezone
 import io
 import pytest
 from fastapi.testclient import TestClient
-from app.infrastructure.models import Candidate, Election, Observer, ObserverFeedback, PollingStation, User, Vote, Voter
+from app.infrastructure.models import Candidate, Election, Observer, ObserverFeedback, PollingStation, User, Vote, Voter, VoteRollupHourly
 from app.main import app  # Import the FastAPI instance from main.py
 from app.infrastructure.database import Base, SessionLocal, engine
+from app.infrastructure.rollup_repo import as_stored_timestamp
 import gc
 
 # Use a fresh test database
@@ -992,6 +993,59 @@ def test_voting_patterns_daily( test_db, create_test_elections, create_test_vote
     test_db.rollback()
     gc.collect()
 
+def test_voting_patterns_rollups_match_raw_votes(test_db, create_test_elections, create_test_votes, create_test_voters, create_test_candidates, client):
+    users_data = [{"id": i, "name": f"Voter {i}", "email": f"rollup{i}@example.com", "role": "voter"} for i in range(1, 5)]
+    voters_data = [{"user_id": i, "has_voted": True} for i in range(1, 5)]
+    create_test_voters(users_data, voters_data)
+    create_test_elections([{"id": 1, "name": "Election 1"}])
+    create_test_candidates([
+        {"id": 1, "name": "Candidate A", "party": "Group X", "bio": "Experienced leader.", "election_id": 1},
+        {"id": 2, "name": "Candidate B", "party": "Group Y", "bio": "Visionary thinker.", "election_id": 1},
+    ])
+    create_test_votes([
+        {"id": 1, "election_id": 1, "voter_id": 1, "candidate_id": 1, "region": "North", "timestamp": datetime(2025, 5, 8, 14, 5, 0)},
+        {"id": 2, "election_id": 1, "voter_id": 2, "candidate_id": 1, "region": "North", "timestamp": datetime(2025, 5, 8, 14, 40, 0)},
+        {"id": 3, "election_id": 1, "voter_id": 3, "candidate_id": 2, "timestamp": datetime(2025, 5, 8, 15, 10, 0)},
+        {"id": 4, "election_id": 1, "voter_id": 4, "candidate_id": 1, "timestamp": datetime(2025, 5, 9, 9, 0, 0)},
+    ])
+
+    # Saving the votes filled in the rollups: two votes share the (14:00, candidate A, North) bucket
+    hourly = test_db.query(VoteRollupHourly).order_by(VoteRollupHourly.bucket).all()
+    assert [(row.bucket.hour, row.candidate_id, row.region, row.polling_station_id, row.count) for row in hourly] == [
+        (14, 1, "North", 0, 2), (15, 2, "", 0, 1), (9, 1, "", 0, 1),
+    ]
+    assert hourly[0].first_vote_at == datetime(2025, 5, 8, 14, 5, 0)
+    assert hourly[0].last_vote_at == datetime(2025, 5, 8, 14, 40, 0)
+
+    for interval in ("hourly", "daily"):
+        rolled_up = client.get(f"/votes/analytics/voting_patterns?election_id=1&interval={interval}")
+        raw = client.get(f"/votes/analytics/voting_patterns?election_id=1&interval={interval}&fresh=true")
+        assert rolled_up.status_code == 200
+        assert rolled_up.json() == raw.json()
+
+    test_db.rollback()
+    gc.collect()
+
+def test_vote_timestamps_with_offset_stored_as_utc(test_db, create_test_elections, create_test_voters, create_test_candidates, client):
+    create_test_voters([{"id": 1, "name": "Voter 1", "email": "offset1@example.com", "role": "voter"}], [{"id": 1, "user_id": 1, "has_voted": False}])
+    create_test_elections([{"id": 1, "name": "Election 1"}])
+    create_test_candidates([{"id": 1, "name": "Candidate A", "party": "Group X", "bio": "Experienced leader.", "election_id": 1}])
+
+    assert as_stored_timestamp(datetime(2025, 5, 8, 15, 30, tzinfo=timezone(timedelta(hours=5)))) == datetime(2025, 5, 8, 10, 30)
+
+    # 15:30 at +05:00 is 10:30 UTC, for the vote and for its rollup bucket alike
+    response = client.post("/votes/bulk", json=[{"voter_id": 1, "candidate_id": 1, "election_id": 1, "timestamp": "2025-05-08T15:30:00+05:00"}])
+    assert response.json()["inserted"] == 1
+
+    vote = test_db.query(Vote).one()
+    assert vote.timestamp == datetime(2025, 5, 8, 10, 30)
+    hourly = test_db.query(VoteRollupHourly).one()
+    assert hourly.bucket == datetime(2025, 5, 8, 10, 0)
+    assert hourly.first_vote_at == vote.timestamp
+
+    test_db.rollback()
+    gc.collect()
+
 def test_historical_turnout_trends( test_db, create_test_elections, create_test_votes, create_test_voters, create_test_candidates, client):
 
     users_data = [
@@ -1,8 +1,9 @@
 import pytest
 from fastapi.testclient import TestClient
-from app.infrastructure.models import AuditLog, Candidate, Election, Observer, PollingStation, User, Vote, Voter
+from app.infrastructure.models import AuditLog, Candidate, Election, ElectionStatus, Observer, PollingStation, User, Vote, Voter
 from app.main import app  # Import the FastAPI instance from main.py
 from app.infrastructure.database import Base, SessionLocal, engine
+from app.interfaces.managers.summary_broadcaster import summary_broadcaster
 import gc
 
 @pytest.fixture(scope="module")
@@ -118,6 +119,168 @@ def test_cast_vote_success(test_db, create_test_elections, create_test_candidate
     test_db.rollback()
     gc.collect()
 
+def test_cast_vote_rejected_after_election_ended(test_db, create_test_elections, create_test_candidates, create_test_voters, create_test_users, client):
+    # Arrange: an election that has already ended
+    create_test_users([{"id": 1, "name": "Late Voter", "email": "late@example.com"}])
+    create_test_elections([{"id": 1, "name": "Closed Election", "status": ElectionStatus.COMPLETED}])
+    create_test_candidates([{"id": 1, "name": "Candidate A", "party": "Independent", "bio": "Leader for change.", "election_id": 1}])
+    create_test_voters([{"id": 1, "user_id": 1, "has_voted": False}])
+
+    # Act
+    response = client.post("/votes", json={"voter_id": 1, "candidate_id": 1, "election_id": 1})
+
+    # Assert: its snapshot stays the final result
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Election 1 has ended"
+    assert test_db.query(Vote).filter(Vote.election_id == 1).count() == 0
+
+    test_db.rollback()
+    gc.collect()
+
+def test_real_time_summary_not_modified_until_next_vote(test_db, create_test_elections, create_test_candidates, create_test_voters, create_test_users, client):
+    # Arrange: one vote cast through the API
+    create_test_users([{"id": 1, "name": "Voter 1", "email": "voter1@example.com"}, {"id": 2, "name": "Voter 2", "email": "voter2@example.com"}])
+    create_test_elections([{"id": 1, "name": "Polled Election"}])
+    create_test_candidates([{"id": 1, "name": "Candidate A", "party": "Independent", "bio": "Leader for change.", "election_id": 1}])
+    create_test_voters([{"id": 1, "user_id": 1, "has_voted": False}, {"id": 2, "user_id": 2, "has_voted": False}])
+    client.post("/votes", json={"voter_id": 1, "candidate_id": 1, "election_id": 1})
+
+    first = client.get("/votes/analytics/real_time_summary?election_id=1")
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+    assert first.json()["total_votes"] == 1
+
+    # Act / Assert: nothing changed, so the client's copy is still good
+    unchanged = client.get("/votes/analytics/real_time_summary?election_id=1", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+
+    # A new vote moves the version on
+    client.post("/votes", json={"voter_id": 2, "candidate_id": 1, "election_id": 1})
+    changed = client.get("/votes/analytics/real_time_summary?election_id=1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["total_votes"] == 2
+
+    test_db.rollback()
+    gc.collect()
+
+def test_realtime_summary_ws_shared_by_viewers(test_db, create_test_elections, create_test_candidates, create_test_voters, create_test_users, client, monkeypatch):
+    create_test_users([{"id": 1, "name": "Voter 1", "email": "voter1@example.com"}])
+    create_test_elections([{"id": 1, "name": "Watched Election"}])
+    create_test_candidates([{"id": 1, "name": "Candidate A", "party": "Independent", "bio": "Leader for change.", "election_id": 1}])
+    create_test_voters([{"id": 1, "user_id": 1, "has_voted": False}])
+    monkeypatch.setattr(summary_broadcaster, "interval", 0.1)
+    computed = summary_broadcaster.stats["computed"]
+
+    with client.websocket_connect("/votes/ws/election/1") as first, client.websocket_connect("/votes/ws/election/1") as second:
+        # Both viewers get the summary of a single computation
+        assert first.receive_json()["total_votes"] == 0
+        assert second.receive_json()["total_votes"] == 0
+        assert summary_broadcaster.stats["computed"] == computed + 1
+        assert summary_broadcaster.status()["elections"] == [{"election_id": 1, "subscribers": 2}]
+
+        # A vote changes the election's data version, and the new summary is pushed to both
+        client.post("/votes", json={"voter_id": 1, "candidate_id": 1, "election_id": 1})
+        assert first.receive_json()["total_votes"] == 1
+        assert second.receive_json()["total_votes"] == 1
+
+    test_db.rollback()
+    gc.collect()
+
+def test_realtime_summary_ws_delta_mode(test_db, create_test_elections, create_test_candidates, create_test_voters, create_test_users, client, monkeypatch):
+    create_test_users([{"id": 1, "name": "Voter 1", "email": "voter1@example.com"}])
+    create_test_elections([{"id": 1, "name": "Watched Election"}])
+    create_test_candidates([
+        {"id": 1, "name": "Candidate A", "party": "Independent", "bio": "Leader for change.", "election_id": 1},
+        {"id": 2, "name": "Candidate B", "party": "Democratic", "bio": "Protects the American people.", "election_id": 1},
+    ])
+    create_test_voters([{"id": 1, "user_id": 1, "has_voted": False}])
+    monkeypatch.setattr(summary_broadcaster, "interval", 0.1)
+
+    with client.websocket_connect("/votes/ws/election/1?mode=delta") as websocket:
+        # The first message is a full snapshot
+        snapshot = websocket.receive_json()
+        assert snapshot["type"] == "snapshot"
+        assert snapshot["total_votes"] == 0
+
+        # A vote sends only the candidate whose count changed, with the next sequence number
+        client.post("/votes", json={"voter_id": 1, "candidate_id": 2, "election_id": 1})
+        delta = websocket.receive_json()
+        assert delta["type"] == "delta"
+        assert delta["seq"] == snapshot["seq"] + 1
+        assert delta["candidate_distribution"] == [{"candidate_id": 2, "votes": 1}]
+        assert delta["observer_sentiment"] == []
+
+        # A client that missed a message asks for a new snapshot
+        websocket.send_text("resync")
+        resync = websocket.receive_json()
+        assert resync["type"] == "snapshot"
+        assert resync["seq"] == delta["seq"]
+        assert resync["candidate_distribution"] == [{"candidate_id": 2, "votes": 1}]
+
+    test_db.rollback()
+    gc.collect()
+
+def test_realtime_summary_slow_client_disconnected():
+    import asyncio
+    from app.interfaces.managers.summary_broadcaster import ElectionSummaryBroadcaster, _Channel
+
+    class StalledSocket:
+        closed_with = None
+        async def send_text(self, payload):
+            await asyncio.sleep(60)
+        async def close(self, code):
+            self.closed_with = code
+
+    class FastSocket:
+        received = None
+        async def send_text(self, payload):
+            self.received = payload
+
+    async def broadcast():
+        broadcaster = ElectionSummaryBroadcaster(send_timeout=0.05)
+        channel = _Channel(1)
+        stalled, fast = StalledSocket(), FastSocket()
+        channel.subscribers = {stalled: "full", fast: "full"}
+        # One stalled client delays the broadcast by the send timeout at most
+        await asyncio.wait_for(asyncio.gather(
+            broadcaster._send(channel, stalled, "{}"), broadcaster._send(channel, fast, "{}")
+        ), 1)
+        await asyncio.sleep(0)
+        return broadcaster, channel, stalled, fast
+
+    broadcaster, channel, stalled, fast = asyncio.run(broadcast())
+    assert fast.received == "{}"
+    assert list(channel.subscribers) == [fast]
+    assert stalled.closed_with == 1013
+    assert broadcaster.stats["dropped"] == 1
+
+def test_realtime_summary_failed_client_closed():
+    import asyncio
+    from app.interfaces.managers.summary_broadcaster import ElectionSummaryBroadcaster, _Channel
+
+    class BrokenSocket:
+        closed_with = None
+        async def send_text(self, payload):
+            raise RuntimeError("Cannot call send once a close message has been sent")
+        async def close(self, code):
+            self.closed_with = code
+
+    async def broadcast():
+        broadcaster = ElectionSummaryBroadcaster()
+        channel = _Channel(1)
+        broken = BrokenSocket()
+        channel.subscribers = {broken: "full"}
+        await broadcaster._send(channel, broken, "{}")
+        await asyncio.sleep(0)
+        return broadcaster, channel, broken
+
+    broadcaster, channel, broken = asyncio.run(broadcast())
+    assert channel.subscribers == {}
+    assert broken.closed_with == 1011
+    assert broadcaster.stats["dropped"] == 1
+
 def test_get_votes_by_election(test_db, create_test_votes, create_test_elections, create_test_candidates, create_test_users, create_test_voters, client):
     # Arrange: Create votes linked to an election
     users_data = [{"id": 1, "name": "Admin User", "email": "admin@example.com"}, {"id": 2, "name": "Voter User 1", "email": "voter1@example.com"}]
@@ -171,4 +334,109 @@ def test_get_votes_by_voter(test_db, create_test_votes, create_test_elections, c
     assert response.json()[0]["election_id"] == 1
 
     test_db.rollback()
-    gc.collect()
\ No newline at end of file
+    gc.collect()
+def test_bulk_cast_votes_json(test_db, create_test_elections, create_test_candidates, create_test_voters, create_test_users, client):
+    # Arrange
+    users_data = [{"id": 1, "name": "Voter 1", "email": "voter1@example.com"}, {"id": 2, "name": "Voter 2", "email": "voter2@example.com"}]
+    elections_data = [{"id": 1, "name": "Presidential Election"}]
+    candidates_data = [{"id": 1, "name": "Candidate A", "election_id": 1}, {"id": 2, "name": "Candidate B", "election_id": 1}]
+    voters_data = [{"id": 1, "user_id": 1, "has_voted": False}, {"id": 2, "user_id": 2, "has_voted": False}]
+
+    create_test_users(users_data)
+    create_test_elections(elections_data)
+    create_test_candidates(candidates_data)
+    create_test_voters(voters_data)
+
+    request_data = [
+        {"voter_id": 1, "candidate_id": 1, "election_id": 1, "region": "North"},
+        {"voter_id": 2, "candidate_id": 2, "election_id": 1, "timestamp": "2025-05-10T01:00:00"},
+        {"voter_id": 1, "candidate_id": 2, "election_id": 1},  # Same voter again
+        {"voter_id": 99, "candidate_id": 1, "election_id": 1},  # Unknown voter
+    ]
+
+    # Act
+    response = client.post("/votes/bulk", json=request_data)
+
+    # Assert: valid rows stored, invalid rows reported by index
+    assert response.status_code == 200
+    data = response.json()
+    assert data["received"] == 4
+    assert data["inserted"] == 2
+    assert [vote["row"] for vote in data["votes"]] == [0, 1]
+    assert [error["row"] for error in data["errors"]] == [2, 3]
+    assert data["errors"][1]["errors"] == ["Voter 99 not found"]
+    assert len(client.get("/votes/elections/1/votes").json()) == 2
+    assert client.get("/elections/1/candidate-support").json() == {
+        "candidates": [
+            {"candidate_name": "Candidate A", "votes": 1},
+            {"candidate_name": "Candidate B", "votes": 1}
+        ]
+    }
+
+    test_db.rollback()
+    gc.collect()
+
+def test_bulk_cast_votes_ndjson(test_db, create_test_elections, create_test_candidates, create_test_voters, create_test_users, client):
+    # Arrange
+    users_data = [{"id": 1, "name": "Voter 1", "email": "voter1@example.com"}]
+    elections_data = [{"id": 1, "name": "Presidential Election"}]
+    candidates_data = [{"id": 1, "name": "Candidate A", "election_id": 1}]
+    voters_data = [{"id": 1, "user_id": 1, "has_voted": False}]
+
+    create_test_users(users_data)
+    create_test_elections(elections_data)
+    create_test_candidates(candidates_data)
+    create_test_voters(voters_data)
+
+    # Rows are reported by their line in the body, blank lines included
+    body = '{"voter_id": 1, "candidate_id": 1, "election_id": 1}\n\n{not json\n'
+
+    # Act
+    response = client.post("/votes/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+
+    # Assert
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 1
+    assert data["votes"][0]["row"] == 0
+    assert data["errors"][0]["row"] == 2
+
+    test_db.rollback()
+    gc.collect()
+
+def test_bulk_cast_votes_rejects_ended_election(test_db, create_test_elections, create_test_candidates, create_test_voters, create_test_users, client):
+    # Arrange: one running and one ended election
+    create_test_users([{"id": 1, "name": "Voter 1", "email": "voter1@example.com"}, {"id": 2, "name": "Voter 2", "email": "voter2@example.com"}])
+    create_test_elections([
+        {"id": 1, "name": "Open Election"},
+        {"id": 2, "name": "Closed Election", "status": ElectionStatus.COMPLETED},
+    ])
+    create_test_candidates([
+        {"id": 1, "name": "Candidate A", "party": "Independent", "bio": "Leader for change.", "election_id": 1},
+        {"id": 2, "name": "Candidate B", "party": "Independent", "bio": "Leader for change.", "election_id": 2},
+    ])
+    create_test_voters([{"id": 1, "user_id": 1, "has_voted": False}, {"id": 2, "user_id": 2, "has_voted": False}])
+
+    # Act
+    response = client.post("/votes/bulk", json=[
+        {"voter_id": 1, "candidate_id": 1, "election_id": 1},
+        {"voter_id": 2, "candidate_id": 2, "election_id": 2},
+    ])
+
+    # Assert: only the vote for the running election is recorded
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inserted"] == 1
+    assert data["errors"] == [{"row": 1, "errors": ["Election 2 has ended"]}]
+    assert test_db.query(Vote).filter(Vote.election_id == 2).count() == 0
+
+    test_db.rollback()
+    gc.collect()
+
+def test_bulk_cast_votes_rejects_non_array(client):
+    # Act
+    response = client.post("/votes/bulk", json={"voter_id": 1})
+
+    # Assert
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Expected a JSON array of votes"